@@ -0,0 +1,201 @@
+import os
+import csv
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# pyarrow (requirements.txt) writes the Parquet / Arrow exports; on an install
+# without it the aggregates and CSV export still work and the columnar formats 501
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# --- Configuration ---
+ANALYTICS_TOP_DOMAINS = int(os.getenv("ANALYTICS_TOP_DOMAINS", "20"))
+ANALYTICS_MAX_DOMAINS = int(os.getenv("ANALYTICS_MAX_DOMAINS", "200"))
+# Rows per record batch (Parquet row groups are written a batch at a time)
+ANALYTICS_EXPORT_BATCH = int(os.getenv("ANALYTICS_EXPORT_BATCH", "50000"))
+ANALYTICS_EXPORT_COMPRESSION = os.getenv("ANALYTICS_EXPORT_COMPRESSION", "zstd")
+
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+    "csv": ("text/csv", "csv"),
+}
+
+logger = logging.getLogger(__name__)
+
+
+class ExportUnavailable(Exception):
+    """The requested export format needs pyarrow, which is missing from this install."""
+
+
+def export_formats() -> List[str]:
+    """Formats this install can export, as reported to the Dashboard."""
+    return [fmt for fmt in EXPORT_FORMATS if fmt == "csv" or pyarrow is not None]
+
+
+def window_start(days: Optional[int]) -> str:
+    """Lower bound on created_at for a window of `days` (empty string = all time)."""
+    return (datetime.utcnow() - timedelta(days=days)).isoformat() if days else ""
+
+
+def window_first_id(conn, days: Optional[int]) -> Optional[int]:
+    """
+    Oldest claim inside the window. It moves as claims age out of a rolling
+    window, so together with MAX(id) it identifies the window's contents.
+    """
+    row = conn.execute("SELECT id FROM claims INDEXED BY idx_claims_created_at_verdict WHERE created_at >= ? "
+                       "ORDER BY created_at, id LIMIT 1", (window_start(days),)).fetchone()
+    return row[0] if row else None
+
+
+# Both aggregates read only idx_claims_created_at_verdict and
+# idx_sources_claim_domain (database migration 7): no claim text, explanation
+# or snippet pages are touched, however large the archive gets.
+VERDICTS_SQL = '''
+    SELECT verdict, COUNT(*) AS claims, SUM(credibility_score) AS score_sum
+    FROM claims INDEXED BY idx_claims_created_at_verdict
+    WHERE created_at >= ? GROUP BY verdict ORDER BY claims DESC
+'''
+# Claims citing a domain several times count once for it; `citations` counts every source
+DOMAINS_SQL = '''
+    SELECT domain_id, verdict, COUNT(*) AS claims, SUM(citations) AS citations, SUM(credibility_score) AS score_sum
+    FROM (
+        SELECT s.domain_id, c.verdict, c.credibility_score, COUNT(*) AS citations
+        FROM claims c INDEXED BY idx_claims_created_at_verdict
+        JOIN sources s INDEXED BY idx_sources_claim_domain ON s.claim_id = c.id
+        WHERE c.created_at >= ? AND s.domain_id IS NOT NULL
+        GROUP BY c.id, s.domain_id
+    )
+    GROUP BY domain_id, verdict
+'''
+
+
+def _avg(total: float, count: int) -> Optional[float]:
+    return round(total / count, 1) if count and total is not None else None
+
+
+def archive_stats(conn, days: Optional[int] = None, top: int = ANALYTICS_TOP_DOMAINS) -> Dict[str, Any]:
+    """
+    Verdict distribution overall and for the `top` most-cited source domains,
+    over the last `days` days (all time when None).
+    """
+    since = window_start(days)
+    verdicts = [{"verdict": row["verdict"], "claims": row["claims"], "avg_credibility": _avg(row["score_sum"], row["claims"])}
+                for row in conn.execute(VERDICTS_SQL, (since,))]
+
+    domains: Dict[int, Dict[str, Any]] = {}
+    for row in conn.execute(DOMAINS_SQL, (since,)):
+        entry = domains.setdefault(row["domain_id"], {"claims": 0, "citations": 0, "score_sum": 0, "verdicts": {}})
+        entry["claims"] += row["claims"]
+        entry["citations"] += row["citations"]
+        entry["score_sum"] += row["score_sum"] or 0
+        entry["verdicts"][row["verdict"]] = row["claims"]
+    ranked = sorted(domains.items(), key=lambda item: (-item[1]["claims"], item[0]))[:max(1, min(top, ANALYTICS_MAX_DOMAINS))]
+    ids = [domain_id for domain_id, _ in ranked]
+    names = dict(conn.execute(f"SELECT id, name FROM domains WHERE id IN ({','.join('?' * len(ids))})", ids).fetchall()) if ids else {}
+
+    return {
+        "since": since or None,
+        "claims": sum(v["claims"] for v in verdicts),
+        "domains_cited": len(domains),
+        "citations": sum(entry["citations"] for entry in domains.values()),
+        "export_formats": export_formats(),
+        "verdicts": verdicts,
+        "domains": [{"domain": names.get(domain_id), "claims": entry["claims"], "citations": entry["citations"],
+                     "avg_credibility": _avg(entry["score_sum"], entry["claims"]), "verdicts": entry["verdicts"]}
+                    for domain_id, entry in ranked],
+    }
+
+
+# --- Export ---
+# One row per cited source (claims without sources appear once, with empty
+# source columns), in archive order. Join back to /archive/{claim_id} for text.
+EXPORT_COLUMNS = ("claim_id", "created_at", "verdict", "credibility_score", "position", "domain", "source_name", "url")
+EXPORT_SQL = '''
+    SELECT c.id, c.created_at, c.verdict, c.credibility_score, s.position, d.name, s.name, s.url
+    FROM claims c INDEXED BY idx_claims_created_at_verdict
+    LEFT JOIN sources s ON s.claim_id = c.id
+    LEFT JOIN domains d ON d.id = s.domain_id
+    WHERE c.created_at >= ?
+    ORDER BY c.created_at, c.id, s.position
+'''
+
+
+def export_rows(conn, days: Optional[int] = None, batch: int = ANALYTICS_EXPORT_BATCH) -> Iterator[List[Tuple]]:
+    cursor = conn.execute(EXPORT_SQL, (window_start(days),))
+    while True:
+        rows = cursor.fetchmany(batch)
+        if not rows:
+            return
+        yield [tuple(row) for row in rows]
+
+
+def export_schema():
+    pa = pyarrow
+    return pa.schema([
+        ("claim_id", pa.int64()), ("created_at", pa.timestamp("us")), ("verdict", pa.string()),
+        ("credibility_score", pa.int16()), ("position", pa.int16()), ("domain", pa.string()),
+        ("source_name", pa.string()), ("url", pa.string()),
+    ])
+
+
+def _record_batch(rows: List[Tuple], schema):
+    columns = list(zip(*rows))
+    arrays = [pyarrow.array(values, type=pyarrow.string() if field.name == "created_at" else field.type)
+              for field, values in zip(schema, columns)]
+    # created_at is ISO 8601 text in SQLite; Arrow parses it into a timestamp column
+    arrays[1] = arrays[1].cast(schema.field("created_at").type)
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_export(conn, fmt: str, path: str, days: Optional[int] = None) -> int:
+    """
+    Writes the archive's source-level rows to `path` as Parquet (dictionary
+    encoded, compressed row groups), an Arrow IPC file or CSV. Returns the
+    number of rows written. Memory is bounded by ANALYTICS_EXPORT_BATCH.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}.")
+    if fmt != "csv" and pyarrow is None:
+        raise ExportUnavailable(f"{fmt} export needs pyarrow (pip install -r requirements.txt); use format=csv instead.")
+
+    count = 0
+    if fmt == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            for rows in export_rows(conn, days):
+                writer.writerows(rows)
+                count += len(rows)
+        return count
+
+    schema = export_schema()
+    if fmt == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(path, schema, compression=ANALYTICS_EXPORT_COMPRESSION)
+    else:
+        options = pyarrow.ipc.IpcWriteOptions(compression=ANALYTICS_EXPORT_COMPRESSION)
+        writer = pyarrow.ipc.new_file(path, schema, options=options)
+    with writer:
+        for rows in export_rows(conn, days):
+            writer.write_batch(_record_batch(rows, schema))
+            count += len(rows)
+    return count
+
+
+def export_file(conn, fmt: str, days: Optional[int] = None) -> Tuple[str, int]:
+    """write_export into a new temporary file; the caller deletes it. Returns (path, rows)."""
+    fd, path = tempfile.mkstemp(prefix="veripress-export-", suffix=f".{EXPORT_FORMATS.get(fmt, ('', 'bin'))[1]}")
+    os.close(fd)
+    try:
+        rows = write_export(conn, fmt, path, days)
+    except BaseException:
+        os.unlink(path)
+        raise
+    logger.info(f"Archive export: {rows} rows as {fmt} ({os.path.getsize(path) / 2 ** 20:.1f} MB)")
+    return path, rows
@@ -0,0 +1,194 @@
+import os
+import re
+import json
+import base64
+import hashlib
+import binascii
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import db_connection
+
+# --- Configuration ---
+ARCHIVE_PAGE_SIZE = int(os.getenv("ARCHIVE_PAGE_SIZE", "50"))
+ARCHIVE_MAX_PAGE_SIZE = int(os.getenv("ARCHIVE_MAX_PAGE_SIZE", "200"))
+
+SUMMARY_COLUMNS = "id, claim_text, verdict, credibility_score, hash, created_at"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: str, claim_id: int) -> str:
+    """Opaque keyset cursor: the (created_at, id) of the last row on a page."""
+    raw = json.dumps([created_at, claim_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        created_at, claim_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(created_at), int(claim_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor("Malformed archive cursor.")
+
+
+def archive_etag(conn, *params: Any) -> str:
+    """
+    Claims are append-only, so the newest id plus the query parameters
+    identifies a page's content. MAX(id) is a single rowid b-tree seek.
+    """
+    max_id = conn.execute("SELECT MAX(id) FROM claims").fetchone()[0] or 0
+    digest = hashlib.sha1(json.dumps(params, default=str).encode()).hexdigest()[:12]
+    return f'W/"{max_id}-{digest}"'
+
+
+def list_claims(conn, limit: int = ARCHIVE_PAGE_SIZE, cursor: Optional[str] = None, verdict: Optional[str] = None,
+                min_score: Optional[int] = None, max_score: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of the archive, newest first, without sources. Returns the rows
+    and the cursor for the next page (None on the last page).
+    """
+    limit = max(1, min(limit, ARCHIVE_MAX_PAGE_SIZE))
+    clauses, params = [], []
+    if cursor:
+        clauses.append("(created_at, id) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+    if verdict:
+        clauses.append("verdict = ?")
+        params.append(verdict)
+    if min_score is not None:
+        clauses.append("credibility_score >= ?")
+        params.append(min_score)
+    if max_score is not None:
+        clauses.append("credibility_score <= ?")
+        params.append(max_score)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    # Fetch one extra row to know whether another page exists
+    rows = conn.execute(f"SELECT {SUMMARY_COLUMNS} FROM claims {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+                        (*params, limit + 1)).fetchall()
+    next_cursor = encode_cursor(rows[limit - 1]["created_at"], rows[limit - 1]["id"]) if len(rows) > limit else None
+    return [dict(row) for row in rows[:limit]], next_cursor
+
+
+def get_claim(claim_id: int) -> Optional[Dict[str, Any]]:
+    with db_connection() as conn:
+        row = conn.execute("SELECT * FROM claims WHERE id = ?", (claim_id,)).fetchone()
+        if row is None:
+            return None
+        return decode_claim(row, load_sources(conn, [claim_id]).get(claim_id, []))
+
+
+def load_sources(conn, claim_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """Sources of the given claims in citation order, keyed by claim id (a range scan per claim)."""
+    sources: Dict[int, List[Dict[str, Any]]] = {}
+    for i in range(0, len(claim_ids), 500):
+        chunk = claim_ids[i:i + 500]
+        for row in conn.execute(
+                f"""SELECT claim_id, name, url, snippet FROM sources
+                    WHERE claim_id IN ({','.join('?' * len(chunk))}) ORDER BY claim_id, position""", chunk):
+            sources.setdefault(row["claim_id"], []).append({"name": row["name"], "url": row["url"], "snippet": row["snippet"]})
+    return sources
+
+
+def decode_claim(row, sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """A claims row as a dict, with its rows from the sources table attached."""
+    item = dict(row)
+    item["sources"] = sources
+    return item
+
+
+# --- Full-text search (claims_fts, see database migration 6) ---
+ARCHIVE_SEARCH_LIMIT = int(os.getenv("ARCHIVE_SEARCH_LIMIT", "20"))
+RELATED_CLAIMS_LIMIT = int(os.getenv("RELATED_CLAIMS_LIMIT", "3"))
+# Related-verdict lookups OR together at most this many of the claim's terms
+RELATED_MAX_TERMS = 5
+# bm25() column weights: a match in the claim outranks one in the explanation
+BM25_WEIGHTS = (10.0, 1.0)
+
+_TOKEN_RE = re.compile(r"\w+\*?", re.UNICODE)
+STOPWORDS = frozenset(
+    "a about after all also an and any are as at be been before but by can could did do does for from had has "
+    "have he her his how i if in into is it its just more most no not now of on one only or other our out over "
+    "said she so some than that the their them then there these they this to up was we were what when which "
+    "who will with would you".split())
+
+
+def _terms(text: str) -> List[str]:
+    terms = _TOKEN_RE.findall(text.lower())
+    content = [t for t in terms if t.rstrip("*") not in STOPWORDS]
+    # A query made only of stopwords is still searched as typed
+    return content or terms
+
+
+def _quote(term: str) -> str:
+    """FTS5 string literal; a trailing * stays outside the quotes as a prefix query."""
+    prefix = term.endswith("*")
+    return f'"{term.rstrip("*")}"' + ("*" if prefix else "")
+
+
+def build_match_query(text: str, prefix_last: bool = True) -> Optional[str]:
+    """
+    Turns free text into a safe FTS5 query: every content word must match,
+    quoted so FTS5 operators in user input are inert. The last word (or any
+    word the user ended with *) is a prefix query, so search-as-you-type works.
+    """
+    terms = _terms(text)
+    if not terms:
+        return None
+    if prefix_last and not terms[-1].endswith("*") and len(terms[-1]) >= 2:
+        terms[-1] += "*"
+    return " ".join(_quote(t) for t in terms)
+
+
+def related_match_query(claim_text: str) -> Optional[str]:
+    """OR of the claim's longest content words, for finding similar prior claims."""
+    terms = sorted({t.rstrip("*") for t in _terms(claim_text) if len(t) > 2}, key=len, reverse=True)
+    return " OR ".join(_quote(t) for t in terms[:RELATED_MAX_TERMS]) if terms else None
+
+
+def search_claims(conn, match: str, limit: int = ARCHIVE_SEARCH_LIMIT, verdict: Optional[str] = None) -> List[Dict[str, Any]]:
+    """BM25-ranked archive hits for an FTS5 `match` expression, with highlighted snippets."""
+    limit = max(1, min(limit, ARCHIVE_MAX_PAGE_SIZE))
+    # Every match is scored and the top `limit` kept in SQL (a top-N sort), so
+    # an old claim that matches best is found however many newer ones match.
+    # bm25() is lower-is-better; ties go to the newer claim.
+    if verdict:
+        ranked = conn.execute(
+            '''SELECT f.rowid AS id, bm25(claims_fts, ?, ?) AS rank
+               FROM claims_fts f JOIN claims c ON c.id = f.rowid
+               WHERE claims_fts MATCH ? AND c.verdict = ? ORDER BY rank, f.rowid DESC LIMIT ?''',
+            (*BM25_WEIGHTS, match, verdict, limit)).fetchall()
+    else:
+        ranked = conn.execute(
+            '''SELECT rowid AS id, bm25(claims_fts, ?, ?) AS rank
+               FROM claims_fts WHERE claims_fts MATCH ? ORDER BY rank, rowid DESC LIMIT ?''',
+            (*BM25_WEIGHTS, match, limit)).fetchall()
+    if not ranked:
+        return []
+
+    # Snippets and row details only for the page that is returned
+    ids = [row["id"] for row in ranked]
+    placeholders = ",".join("?" * len(ids))
+    snippets = dict(conn.execute(
+        f"""SELECT rowid, snippet(claims_fts, -1, '<mark>', '</mark>', '…', 16) FROM claims_fts
+            WHERE claims_fts MATCH ? AND rowid IN ({placeholders})""", (match, *ids)).fetchall())
+    rows = {row["id"]: row for row in conn.execute(
+        f"SELECT {SUMMARY_COLUMNS} FROM claims WHERE id IN ({placeholders})", ids).fetchall()}
+    # Expose a positive relevance score
+    return [{**dict(rows[row["id"]]), "snippet": snippets.get(row["id"]), "score": round(-row["rank"], 3)}
+            for row in ranked]
+
+
+def optimize_search_index(conn):
+    """Merges the FTS index into a single segment. Run after bulk imports; it holds the write lock."""
+    with conn:
+        conn.execute("INSERT INTO claims_fts(claims_fts) VALUES ('optimize')")
+
+
+def find_related_claims(claim_text: str, limit: int = RELATED_CLAIMS_LIMIT) -> List[Dict[str, Any]]:
+    match = related_match_query(claim_text)
+    if match is None:
+        return []
+    with db_connection() as conn:
+        return search_claims(conn, match, limit)
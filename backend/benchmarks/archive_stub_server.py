@@ -0,0 +1,122 @@
+"""
+Local stand-in for a Wayback-style archive (CDX index + raw snapshot replay).
+
+Every URL gets a deterministic capture history: `captures` monthly captures,
+the article text revised every `change_every` captures (a paragraph edited,
+one added), and, for URLs containing "deleted", 404 captures at the end. Each
+route sleeps for a configurable delay, and requests are counted per route so
+benchmarks can check how many a trace actually sent.
+"""
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.stub_server import StubServer
+
+FIRST_CAPTURE = datetime(2019, 1, 15, 8, 30)
+
+
+def page_version(url: str, version: int) -> bytes:
+    paragraphs = [f"<p>Paragraph {i} of the original report on {url}.</p>" for i in range(40)]
+    for v in range(1, version + 1):
+        paragraphs[(v * 7) % len(paragraphs)] = f"<p>Paragraph {(v * 7) % 40} as corrected in revision {v}.</p>"
+        paragraphs.append(f"<p>Update {v}: new statement added to the story.</p>")
+    return (f"<html><head><title>Report (rev {version})</title><style>p {{ margin: 0 }}</style></head><body>"
+            f"<script>var tracker = {version};</script><article>{''.join(paragraphs)}</article></body></html>").encode()
+
+
+def capture_history(url: str, captures: int, change_every: int):
+    """(timestamp, status, body) per capture, oldest first."""
+    gone = captures - 3 if "deleted" in url else captures
+    history = []
+    for i in range(captures):
+        timestamp = (FIRST_CAPTURE + timedelta(days=30 * i, minutes=i)).strftime("%Y%m%d%H%M%S")
+        if i >= gone:
+            history.append((timestamp, "404", b"<html><body>Not Found</body></html>"))
+        else:
+            history.append((timestamp, "200", page_version(url, i // change_every)))
+    return history
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    delays = {"cdx": 0.05, "snapshot": 0.05}
+    captures = 40
+    change_every = 4
+    counts = None
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, route: str, status: int, body: bytes, content_type: str):
+        time.sleep(self.delays.get(route, 0))
+        with self.counts_lock:
+            self.counts[route] = self.counts.get(route, 0) + 1
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == "/cdx/search/cdx":
+            query = parse_qs(parsed.query)
+            url = query.get("url", [""])[0]
+            rows, last_digest = [["timestamp", "original", "statuscode", "digest", "length"]], None
+            for timestamp, status, body in capture_history(url, self.captures, self.change_every):
+                digest = hashlib.sha1(body).hexdigest().upper()
+                if query.get("collapse") == ["digest"] and digest == last_digest:
+                    continue
+                last_digest = digest
+                rows.append([timestamp, url, status, digest, str(len(body))])
+            # Like the real index, a negative limit keeps the newest rows
+            limit = int(query.get("limit", ["100000"])[0])
+            rows = rows[:1] + (rows[1:][limit:] if limit < 0 else rows[1:limit + 1])
+            self._reply("cdx", 200, json.dumps(rows if len(rows) > 1 else []).encode(), "application/json")
+        elif parsed.path.startswith("/web/"):
+            # /web/<timestamp>id_/<original url>
+            stamp, _, url = self.path[len("/web/"):].partition("/")
+            timestamp = stamp[:-3] if stamp.endswith("id_") else stamp
+            for captured, status, body in capture_history(url, self.captures, self.change_every):
+                if captured == timestamp:
+                    self._reply("snapshot", int(status), body, "text/html")
+                    return
+            self._reply("snapshot", 404, b"", "text/html")
+        else:
+            self.send_error(404)
+
+
+def start_archive_server(port: int = 0, delays: dict = None, captures: int = 40, change_every: int = 4) -> StubServer:
+    """Starts the stand-in archive on a background thread; `server.counts` holds requests per route."""
+    counts = {}
+    handler = type("ConfiguredArchiveHandler", (ArchiveHandler,), {
+        "delays": {**ArchiveHandler.delays, **(delays or {})}, "captures": captures, "change_every": change_every,
+        "counts": counts, "counts_lock": threading.Lock()})
+    server = StubServer(("127.0.0.1", port), handler)
+    server.counts = counts
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def archive_env(server: StubServer) -> dict:
+    """Environment variables that point wayback.py at the stand-in archive."""
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    return {"WAYBACK_CDX_URL": f"{base}/cdx/search/cdx", "WAYBACK_SNAPSHOT_URL": f"{base}/web"}
+
+
+if __name__ == "__main__":
+    srv = start_archive_server(8902)
+    print("Stand-in archive listening on http://127.0.0.1:8902")
+    for key, value in archive_env(srv).items():
+        print(f"  {key}={value}")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
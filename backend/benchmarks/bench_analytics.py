@@ -0,0 +1,134 @@
+"""
+Normalized sources (database migration 7) on a synthetic archive seeded in the
+old format, with sources as a JSON blob per claim: migration time, file size,
+archive-item reads, per-domain verdict statistics in SQL (analytics.py) versus
+the previous approach of parsing every blob in Python, and export per format
+(Parquet / Arrow are skipped if pyarrow is missing).
+
+    cd backend && python -m benchmarks.bench_analytics
+    cd backend && python -m benchmarks.bench_analytics --claims 200000 --domains 2000
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import database
+from benchmarks.bench_verify_claim import report
+
+VERDICTS = ("True", "False", "Unverified", "Misleading")
+
+
+def legacy_rows(claims: int, domains: int, seed: int = 7):
+    """Claims rows as the pre-migration schema stored them (sources as JSON)."""
+    rng = random.Random(seed)
+    hosts = [f"{'www.' if i % 2 else ''}outlet{i}.example.com" for i in range(domains)]
+    start = datetime.utcnow() - timedelta(days=365)
+    for i in range(claims):
+        created = (start + timedelta(seconds=i * 365 * 86400 // claims)).isoformat()
+        # A few outlets get most of the citations, like the real archive
+        sources = [{"name": f"Live: Outlet {j}", "url": f"https://{hosts[min(int(rng.paretovariate(1.2)) - 1, domains - 1)]}/story/{i}-{j}",
+                    "snippet": "Officials confirmed the report on Tuesday, according to a statement..." * 2}
+                   for j in range(rng.randint(1, 8))]
+        yield (f"Benchmark claim {i} about the city budget", rng.choice(VERDICTS),
+               "The claim matches the published council minutes. " * 4, json.dumps(sources),
+               rng.randint(0, 100), f"{i:064x}", created, created)
+
+
+def seed_legacy(path: str, claims: int, domains: int):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    for version, migrate in database.MIGRATIONS:
+        if version < 7:
+            migrate(conn)
+    conn.execute("PRAGMA user_version = 6")
+    conn.executemany("INSERT INTO claims (claim_text, verdict, explanation, sources, credibility_score, hash, created_at, expires_at) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", legacy_rows(claims, domains))
+    conn.execute("INSERT INTO archive (claim_id, hash, archived_at) SELECT id, hash, created_at FROM claims")
+    conn.commit()
+    conn.close()
+
+
+def file_size(path: str) -> float:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("VACUUM")
+    conn.close()
+    return os.path.getsize(path) / 2 ** 20
+
+
+def python_domain_stats(conn):
+    """What per-domain statistics cost with the blob: read and parse every row."""
+    stats = defaultdict(Counter)
+    for verdict, blob in conn.execute("SELECT verdict, sources FROM claims"):
+        for domain in {database.source_domain(s.get("url")) for s in json.loads(blob or "[]")}:
+            stats[domain][verdict] += 1
+    return stats
+
+
+def timed(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=100_000)
+    parser.add_argument("--domains", type=int, default=500, help="distinct source hostnames")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    import analytics
+    from archive import decode_claim, load_sources
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "analytics.db")
+        seed_legacy(path, args.claims, args.domains)
+        legacy_mb = file_size(path)
+
+        ids = random.Random(1).sample(range(1, args.claims + 1), 200)
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        print(f"{args.claims} claims, {args.domains} domains, old format: {legacy_mb:.1f} MB")
+        report("blob stats (Python)", timed(lambda: python_domain_stats(conn), max(1, args.repeat // 2)))
+        report("blob item x200", timed(lambda: [json.loads(conn.execute("SELECT * FROM claims WHERE id = ?", (i,)).fetchone()["sources"])
+                                                for i in ids], args.repeat))
+        conn.close()
+
+        database.DB_NAME = path
+        start = time.perf_counter()
+        database.init_db(force=True)
+        database.get_pool().close()
+        print(f"migration 7: {time.perf_counter() - start:.1f}s, normalized: {file_size(path):.1f} MB")
+
+        with database.db_connection() as conn:
+            report("table item x200", timed(lambda: [decode_claim(conn.execute("SELECT * FROM claims WHERE id = ?", (i,)).fetchone(),
+                                                                  load_sources(conn, [i]).get(i, [])) for i in ids], args.repeat))
+            report("SQL stats", timed(lambda: analytics.archive_stats(conn), args.repeat))
+            report("SQL stats 30 days", timed(lambda: analytics.archive_stats(conn, days=30), args.repeat))
+            stats = analytics.archive_stats(conn)
+            print(f"  {stats['domains_cited']} domains cited, {stats['citations']} citations; top: "
+                  f"{stats['domains'][0]['domain']} ({stats['domains'][0]['claims']} claims)")
+
+            formats = ["csv"] + (["parquet", "arrow"] if analytics.pyarrow is not None else [])
+            for fmt in formats:
+                out = os.path.join(tmp, f"export.{fmt}")
+                start = time.perf_counter()
+                rows = analytics.write_export(conn, fmt, out)
+                print(f"export {fmt:<8} {rows} rows in {time.perf_counter() - start:.2f}s, {os.path.getsize(out) / 2 ** 20:.1f} MB")
+            if analytics.pyarrow is None:
+                print("export parquet/arrow skipped: pyarrow is not installed")
+        database.get_pool().close()
+
+
+if __name__ == "__main__":
+    main()
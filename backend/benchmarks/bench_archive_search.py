@@ -0,0 +1,90 @@
+"""
+Archive full-text search latency on a large synthetic archive.
+
+Seeds a scratch database (through the normal migrations, so the FTS triggers
+do the indexing) with claims drawn from a Zipf-distributed vocabulary, merges
+the index as after any bulk import, then times /archive/search-style queries and the related-verdict lookup that
+/verify-claim runs.
+
+    cd backend && python -m benchmarks.bench_archive_search --rows 3000000
+"""
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import time
+
+import archive
+import database
+from benchmarks.bench_verify_claim import report
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "pra", "sto", "gle", "dri", "mon", "tel", "bar"]
+
+
+def vocabulary(size: int, rng: random.Random):
+    """Zipf rank order: stopwords first (as in real text), then random content words."""
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    content = sorted(words - archive.STOPWORDS)
+    rng.shuffle(content)
+    return sorted(archive.STOPWORDS) + content
+
+
+def seed(rows: int, words, rng: random.Random):
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    batch = []
+    with database.db_connection() as conn:
+        for i in range(rows):
+            claim = " ".join(rng.choices(words, cum_weights=cumulative, k=rng.randint(6, 16)))
+            explanation = " ".join(rng.choices(words, cum_weights=cumulative, k=rng.randint(15, 40)))
+            batch.append({"claim_text": claim, "verdict": rng.choice(("True", "False", "Misleading", "Unverified")),
+                          "explanation": explanation, "sources": [], "credibility_score": rng.randint(0, 100),
+                          "hash": f"{i:064x}", "created_at": f"2026-01-01T00:00:{i % 60:02d}"})
+            if len(batch) == 20_000:
+                with conn: database.insert_claims(conn, batch)
+                batch.clear()
+        if batch:
+            with conn: database.insert_claims(conn, batch)
+        archive.optimize_search_index(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--vocab", type=int, default=50_000)
+    parser.add_argument("--db", help="keep the seeded archive at this path (reused if it exists)")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = args.db or os.path.join(tmp, "bench.db")
+        reuse = os.path.exists(database.DB_NAME)
+        database.init_db()
+        if not reuse:
+            start = time.perf_counter()
+            seed(args.rows, vocabulary(args.vocab, rng), rng)
+            print(f"seeded {args.rows} claims in {time.perf_counter() - start:.1f}s")
+
+        with database.db_connection() as conn:
+            samples = [row[0] for row in
+                       conn.execute("SELECT claim_text FROM claims ORDER BY random() LIMIT ?", (args.queries,))]
+            for label, make_query in (
+                ("2 words", lambda text: archive.build_match_query(" ".join(text.split()[:2]), prefix_last=False)),
+                ("prefix", lambda text: archive.build_match_query(text.split()[0] + " " + text.split()[1][:3])),
+                ("related", archive.related_match_query),
+            ):
+                timings = []
+                for text in samples:
+                    match = make_query(text)
+                    t0 = time.perf_counter()
+                    archive.search_claims(conn, match, archive.RELATED_CLAIMS_LIMIT if label == "related" else 20)
+                    timings.append(time.perf_counter() - t0)
+                report(label, timings)
+        database.get_pool().close()
+
+
+if __name__ == "__main__":
+    main()
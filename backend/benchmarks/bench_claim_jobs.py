@@ -0,0 +1,75 @@
+"""
+Batch claim verification throughput (/verify-claims).
+
+Submits a wire-feed sized job (with duplicate headlines) through the real app
+against the offline stub providers and a scratch database, streams the NDJSON
+results and reports wall time, claims/s and rows written. For comparison it
+first verifies a sample one claim at a time, the way the single-claim
+endpoint has to be driven.
+
+    cd backend && python -m benchmarks.bench_claim_jobs --claims 10000
+    cd backend && python -m benchmarks.bench_claim_jobs --claims 10000 --rate 10   # real provider quota
+    cd backend && python -m benchmarks.bench_claim_jobs --claims 10000 --mock-llm  # Groq verdicts from the mock
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=10000)
+    parser.add_argument("--duplicates", type=float, default=0.2, help="fraction of repeated headlines")
+    parser.add_argument("--sequential", type=int, default=50, help="claims verified one by one for the baseline")
+    parser.add_argument("--latency-ms", type=float, default=50, help="stub provider latency")
+    parser.add_argument("--rate", type=float, default=1000000, help="per-provider requests/second quota")
+    parser.add_argument("--mock-llm", action="store_true", help="answer Groq calls from benchmarks.mock_llm_server")
+    args = parser.parse_args()
+
+    if args.mock_llm:
+        from benchmarks.mock_llm_server import mock_llm_env, start_mock_llm_server
+        os.environ.update(mock_llm_env(start_mock_llm_server()))
+
+    tmp = tempfile.mkdtemp()
+    os.environ.update({
+        "ATLAS_DB": os.path.join(tmp, "claim-jobs.db"), "EVIDENCE_OFFLINE": "1",
+        "STUB_LATENCY_MS": str(args.latency_ms), "PROVIDER_CACHE_TTL": "0",
+        "PROVIDER_RATE": str(args.rate), "PROVIDER_BURST": str(int(max(args.rate, 1))),
+    })
+    from fastapi.testclient import TestClient
+    import main as app_module  # imported after the environment is set
+    from database import db_connection
+    from verification import verify_claim_text
+
+    unique = max(1, int(args.claims * (1 - args.duplicates)))
+    claims = [f"Wire headline {i % unique}: officials confirm budget vote in region {(i % unique) % 97}" for i in range(args.claims)]
+
+    with TestClient(app_module.app) as client:
+        start = time.perf_counter()
+        for i in range(args.sequential):
+            client.portal.call(verify_claim_text, f"Sequential headline {i}")
+        per_claim = (time.perf_counter() - start) / max(1, args.sequential)
+        print(f"one at a time: {1 / per_claim:8.1f} claims/s -> {args.claims * per_claim / 60:6.1f} min for {args.claims}")
+
+        start = time.perf_counter()
+        job = client.post("/verify-claims", json=claims).json()
+        lines = 0
+        with client.stream("GET", f"/verify-claims/{job['job_id']}/results") as response:
+            for line in response.iter_lines():
+                if line:
+                    lines += 1
+                    last = json.loads(line)
+        elapsed = time.perf_counter() - start
+
+        with db_connection() as conn:
+            rows = conn.execute("SELECT COUNT(*) FROM claims").fetchone()[0] - args.sequential
+        print(f"batch job:     {args.claims / elapsed:8.1f} claims/s -> {elapsed / 60:6.1f} min for {args.claims} "
+              f"({last['unique']} unique, {lines - 1} result lines)")
+        print(f"  rows written {rows}, saved {last['saved']}, cached {last['cached']}, failed {last['failed']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
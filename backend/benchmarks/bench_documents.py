@@ -0,0 +1,207 @@
+"""
+Document forensics on large synthetic PDFs and DOCX files.
+
+Writes a PDF of `--pages` pages (a JPEG photo per page, subset fonts, an
+incremental update that rewrites the Info dictionary, optionally JavaScript)
+padded with incompressible image streams to `--mb` megabytes, and a DOCX with
+tracked changes and embedded media. Reports the structure pass throughput,
+peak RSS and what was found, then (with --api) the time to the first NDJSON
+event and to the result through /scan-document/stream.
+
+    cd backend && python -m benchmarks.bench_documents --mb 300 --pages 400
+    cd backend && python -m benchmarks.bench_documents --mb 50 --api
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+from PIL import Image
+
+from documents import analyze_document, EmbeddedImage
+
+
+class PDFWriter:
+    """Minimal PDF writer with classic xref tables and incremental updates."""
+
+    def __init__(self, f):
+        self.f = f
+        self.offsets = {}
+        self.f.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def obj(self, num: int, body: bytes, stream: bytes = None):
+        self.offsets[num] = self.f.tell()
+        self.f.write(b"%d 0 obj\n" % num + body)
+        if stream is not None:
+            self.f.write(b"\nstream\n" + stream + b"\nendstream")
+        self.f.write(b"\nendobj\n")
+
+    def finish(self, root: int, info: int, prev: int = None, nums=None) -> int:
+        nums = sorted(nums if nums is not None else self.offsets)
+        xref = self.f.tell()
+        self.f.write(b"xref\n")
+        for num in nums:
+            self.f.write(b"%d 1\n%010d 00000 n \n" % (num, self.offsets[num]))
+        size = max(self.offsets) + 1
+        extra = b" /Prev %d" % prev if prev is not None else b""
+        self.f.write(b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R%s >>\nstartxref\n%d\n%%%%EOF\n"
+                     % (size, root, info, extra, xref))
+        return xref
+
+
+def jpeg(seed: int, size=(320, 240)) -> bytes:
+    rng = np.random.default_rng(seed)
+    coarse = Image.fromarray(rng.integers(0, 256, (6, 8, 3), dtype=np.uint8)).resize(size, Image.BICUBIC)
+    out = io.BytesIO()
+    coarse.save(out, "JPEG", quality=85)
+    return out.getvalue()
+
+
+def write_pdf(path: str, pages: int, megabytes: int, javascript: bool):
+    padding_bytes = max(0, megabytes * 2 ** 20 - pages * 20_000) // max(1, pages)
+    rng = np.random.default_rng(0)
+    with open(path, "wb") as f:
+        w = PDFWriter(f)
+        w.obj(1, b"<< /Type /Catalog /Pages 2 0 R" + (b" /OpenAction 5 0 R" if javascript else b"") + b" >>")
+        kids = b" ".join(b"%d 0 R" % (10 + 5 * i) for i in range(pages))
+        w.obj(2, b"<< /Type /Pages /Count %d /Kids [%s] >>" % (pages, kids))
+        w.obj(3, b"<< /Producer (Microsoft Word 2016) /Creator (Word) /Author (Desk A) "
+                 b"/CreationDate (D:20240301101500+01'00') /ModDate (D:20240301103000+01'00') >>")
+        w.obj(4, b"<< /Type /Font /Subtype /TrueType /BaseFont /ABCDEF+Calibri /FontDescriptor 6 0 R >>")
+        if javascript:
+            w.obj(5, b"<< /S /JavaScript /JS (app.alert\\(1\\)) >>")
+        w.obj(6, b"<< /Type /FontDescriptor /FontName /ABCDEF+Calibri /FontFile2 7 0 R >>")
+        w.obj(7, b"<< /Length 4 >>", b"font")
+        for i in range(pages):
+            base = 10 + 5 * i
+            photo = jpeg(i)
+            padding = rng.bytes(padding_bytes)
+            w.obj(base, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+                        b"/Resources << /Font << /F1 4 0 R >> /XObject << /Im1 %d 0 R /Pad %d 0 R >> >> >>"
+                  % (base + 1, base + 2, base + 3))
+            content = b"BT /F1 12 Tf 72 720 Td (Page %d) Tj ET q 320 0 0 240 72 400 cm /Im1 Do Q" % i
+            w.obj(base + 1, b"<< /Length %d >>" % len(content), content)
+            w.obj(base + 2, b"<< /Type /XObject /Subtype /Image /Width 320 /Height 240 /ColorSpace /DeviceRGB "
+                            b"/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>" % len(photo), photo)
+            # Incompressible filler standing in for scans in a leaked dump (too small to be scanned)
+            w.obj(base + 3, b"<< /Type /XObject /Subtype /Image /Width 8 /Height 8 /ColorSpace /DeviceGray "
+                            b"/BitsPerComponent 8 /Filter /FlateDecode /Length %d >>" % len(padding), padding)
+        prev = w.finish(root=1, info=3)
+        # Incremental update: a different tool rewrites the Info dictionary and adds a page font subset
+        first = dict(w.offsets)
+        w.obj(3, b"<< /Producer (iLovePDF) /Creator (Word) /Author (Desk B) "
+                 b"/CreationDate (D:20240301101500+01'00') /ModDate (D:20240305090000Z) >>")
+        w.obj(8, b"<< /Type /Font /Subtype /TrueType /BaseFont /QWERTY+Calibri /FontDescriptor 6 0 R >>")
+        w.obj(10, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 11 0 R "
+                  b"/Resources << /Font << /F1 4 0 R /F2 8 0 R >> /XObject << /Im1 12 0 R >> >> >>")
+        w.finish(root=1, info=3, prev=prev, nums=[n for n in w.offsets if w.offsets[n] != first.get(n)])
+
+
+def write_docx(path: str, paragraphs: int):
+    w = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml", '<?xml version="1.0"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>')
+        z.writestr("docProps/core.xml", (
+            '<?xml version="1.0"?><cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/">'
+            '<dc:title>Memo</dc:title><dc:creator>Desk A</dc:creator><cp:lastModifiedBy>Desk B</cp:lastModifiedBy>'
+            '<cp:revision>7</cp:revision><dcterms:created>2024-03-05T10:00:00Z</dcterms:created>'
+            '<dcterms:modified>2024-03-01T09:00:00Z</dcterms:modified></cp:coreProperties>'))
+        z.writestr("docProps/app.xml", (
+            '<?xml version="1.0"?><Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+            '<Template>Normal.dotm</Template><TotalTime>0</TotalTime><Pages>12</Pages>'
+            '<Application>Microsoft Office Word</Application><AppVersion>16.0000</AppVersion></Properties>'))
+        z.writestr("word/settings.xml", f'<?xml version="1.0"?><w:settings xmlns:w="{w}"><w:rsids>'
+                   + "".join(f'<w:rsid w:val="00{i:06X}"/>' for i in range(40)) + "</w:rsids></w:settings>")
+        with z.open("word/document.xml", "w") as part:
+            part.write(f'<?xml version="1.0"?><w:document xmlns:w="{w}"><w:body>'.encode())
+            for i in range(paragraphs):
+                change = (f'<w:ins w:author="Desk B" w:date="2024-03-0{1 + i % 5}T10:00:00Z"><w:r><w:t>added</w:t></w:r></w:ins>'
+                          if i % 500 == 0 else "")
+                part.write(f'<w:p w:rsidR="00{i % 40:06X}"><w:r><w:t>Paragraph {i} of the leaked memo.</w:t></w:r>{change}</w:p>'.encode())
+            part.write(b"</w:body></w:document>")
+        z.writestr("word/media/image1.jpeg", jpeg(1))
+        z.writestr("word/media/image2.jpeg", jpeg(2))
+
+
+def run_scan(path: str):
+    start = time.perf_counter()
+    first = None
+    images, report = [], None
+    for event in analyze_document(lambda: open(path, "rb"), os.path.getsize(path)):
+        first = first or time.perf_counter() - start
+        if isinstance(event, EmbeddedImage):
+            images.append(event)
+        elif event["type"] == "document":
+            report = event
+    return time.perf_counter() - start, first, images, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=int, default=300, help="PDF size")
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--paragraphs", type=int, default=500_000, help="DOCX body size")
+    parser.add_argument("--javascript", action="store_true", help="add an OpenAction JavaScript to the PDF")
+    parser.add_argument("--api", action="store_true", help="also time /scan-document/stream under uvicorn")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="veripress-docs-")
+    pdf, docx = os.path.join(tmp, "dump.pdf"), os.path.join(tmp, "memo.docx")
+    write_pdf(pdf, args.pages, args.mb, args.javascript)
+    write_docx(docx, args.paragraphs)
+
+    for path in (pdf, docx):
+        size = os.path.getsize(path)
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        elapsed, first, images, report = run_scan(path)
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"{os.path.basename(path)}: {size / 2 ** 20:.0f} MB in {elapsed:.2f} s "
+              f"({size / 2 ** 20 / elapsed:.0f} MB/s), first event {first * 1000:.0f} ms, "
+              f"peak RSS {rss_after:.0f} MB (+{max(0.0, rss_after - rss_before):.0f} MB)")
+        print(f"  pages={report.get('pages')} images found={report.get('images_found')} queued={len(images)} "
+              f"tool chain={report.get('tool_chain')}")
+        for text, penalty in report["findings"]:
+            print(f"  -{penalty:>2}  {text}")
+
+    if args.api:
+        from benchmarks.bench_startup import BACKEND, free_port, probe
+        from benchmarks.suite import STAND_INS
+        port = free_port()
+        env = dict(os.environ, ATLAS_DB=os.path.join(tmp, "docs.db"),
+                   PYTHONPATH=os.pathsep.join(filter(None, [STAND_INS, os.environ.get("PYTHONPATH")])))
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                                  cwd=BACKEND, env=env)
+        import httpx
+        try:
+            while probe(f"http://127.0.0.1:{port}/health/ready")[0] != 200:
+                time.sleep(0.05)
+            for path in (pdf, docx):
+                start, first, events = time.perf_counter(), None, 0
+                with open(path, "rb") as f, httpx.stream("POST", f"http://127.0.0.1:{port}/scan-document/stream",
+                                                         files={"file": (os.path.basename(path), f)}, timeout=600) as response:
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        events += 1
+                        first = first or time.perf_counter() - start
+                        event = json.loads(line)
+                        if event["type"] in ("result", "error"):
+                            result = event
+                print(f"API {os.path.basename(path)}: first event {first:.2f} s, result {time.perf_counter() - start:.2f} s, "
+                      f"{events} events, integrity {result.get('integrity_score')}, "
+                      f"{sum(i['type'] == 'image' for i in result.get('images', []))} images scanned")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
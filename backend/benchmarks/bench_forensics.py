@@ -0,0 +1,78 @@
+"""
+Per-megapixel cost guard for the Layer 3 forensics engine.
+
+Builds synthetic JPEG-like images at several sizes, runs `analyze_forensics`
+on each and reports ms per megapixel plus the peak NumPy allocation, then the
+RSS growth of the CPU pool entry point (run_forensics on the JPEG bytes, so
+decoding included). Exits non-zero when any size exceeds the budget, so it
+can gate CI.
+
+    cd backend && python -m benchmarks.bench_forensics --sizes 1 4 12 40 --budget 400
+"""
+import argparse
+import io
+import multiprocessing
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from forensics import analyze_forensics, run_forensics
+from ingest import measured
+
+
+def synthetic_photo(megapixels: float, seed: int = 0) -> Tuple[Image.Image, bytes]:
+    """Smooth random scene plus sensor noise, round-tripped through JPEG; the decoded image and the file."""
+    rng = np.random.default_rng(seed)
+    width = int(np.sqrt(megapixels * 1e6 * 4 / 3))
+    height = int(width * 3 / 4)
+    scene = Image.fromarray((rng.random((height // 8, width // 8, 3)) * 255).astype(np.uint8))
+    scene = scene.resize((width, height), Image.BICUBIC).filter(ImageFilter.GaussianBlur(3))
+    noisy = np.asarray(scene, dtype=np.int16) + rng.integers(-6, 7, (height, width, 3), dtype=np.int16)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(noisy, 0, 255).astype(np.uint8)).save(buffer, "JPEG", quality=88)
+    image = Image.open(io.BytesIO(buffer.getvalue()))
+    image.load()
+    return image, buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 12])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=400.0, help="max ms per megapixel")
+    args = parser.parse_args()
+
+    failed = False
+    for mp in args.sizes:
+        image, jpeg = synthetic_photo(mp)
+        analyze_forensics(image)  # warm-up
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            analyze_forensics(image, heatmap=True)
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        analyze_forensics(image, heatmap=True)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # A fresh worker per size, so pages freed by earlier runs do not hide the growth
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            _, memory = pool.submit(measured, run_forensics, jpeg).result()
+
+        actual_mp = image.width * image.height / 1e6
+        per_mp = min(timings) * 1000 / actual_mp
+        status = "ok" if per_mp <= args.budget else "OVER BUDGET"
+        failed |= per_mp > args.budget
+        print(f"{actual_mp:6.1f} MP   {min(timings) * 1000:8.1f} ms   {per_mp:6.1f} ms/MP   "
+              f"peak numpy {peak / 2 ** 20:7.1f} MiB   decode+analysis RSS +{(memory['peak'] - memory['start']) / 2 ** 20:6.1f} MiB   {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Near-duplicate lookup latency of the perceptual-hash index as it grows.
+
+Seeds a scratch database with random 64-bit hashes, then times lookups for
+hashes a few bits away from a stored one (hits) and for unrelated hashes
+(misses). --skew biases every bit towards 0 or 1, as pHashes of real photos
+are, which crowds the index's band buckets.
+
+    cd backend && python -m benchmarks.bench_image_index --rows 1000000
+    cd backend && python -m benchmarks.bench_image_index --rows 1000000 --skew 0.6
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import database
+import image_index
+
+
+def random_hash(rng: random.Random, ones: list) -> int:
+    """64-bit hash whose bit i is set with probability ones[i]."""
+    value = 0
+    for p in ones:
+        value = (value << 1) | (rng.random() < p)
+    return value
+
+
+def seed(conn, rows: int, rng: random.Random, ones: list):
+    batch = []
+    for i in range(rows):
+        phash = random_hash(rng, ones)
+        batch.append((f"{i:064x}", image_index._to_signed(phash), *image_index._bands(phash), "{}", ""))
+        if len(batch) == 10_000:
+            conn.executemany('''INSERT INTO image_scans (sha256, phash, band0, band1, band2, result, created_at)
+                                VALUES (?, ?, ?, ?, ?, ?, ?)''', batch)
+            batch.clear()
+    if batch:
+        conn.executemany('''INSERT INTO image_scans (sha256, phash, band0, band1, band2, result, created_at)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)''', batch)
+    conn.commit()
+
+
+def flip_bits(value: int, count: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--threshold", type=int, default=image_index.PHASH_MATCH_THRESHOLD)
+    parser.add_argument("--skew", type=float, default=0.0, help="0 = uniform bits, towards 1 = every bit nearly fixed")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    ones = [0.5 + args.skew * (rng.random() - 0.5) for _ in range(64)]
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.init_db()
+        conn = database.get_db_connection()
+
+        start = time.perf_counter()
+        seed(conn, args.rows, rng, ones)
+        print(f"seeded {args.rows} hashes in {time.perf_counter() - start:.1f}s")
+
+        stored = [image_index._to_unsigned(r[0]) for r in
+                  conn.execute("SELECT phash FROM image_scans ORDER BY random() LIMIT ?", (args.lookups,))]
+        for label, queries in (
+            ("near-dup", [flip_bits(h, args.threshold, rng) for h in stored]),
+            ("miss", [random_hash(rng, ones) for _ in stored]),
+        ):
+            timings, found = [], 0
+            for phash in queries:
+                t0 = time.perf_counter()
+                match = image_index.find_match({"sha256": "", "phash": phash}, args.threshold, conn=conn)
+                timings.append(time.perf_counter() - t0)
+                found += match is not None
+            timings.sort()
+            print(f"{label:<9} found={found:4d}/{len(queries)}   p50={statistics.median(timings) * 1000:6.2f} ms   "
+                  f"p99={timings[int(0.99 * (len(timings) - 1))] * 1000:6.2f} ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
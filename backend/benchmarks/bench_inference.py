@@ -0,0 +1,77 @@
+"""
+Throughput of the micro-batching inference scheduler versus one-at-a-time
+calls, plus the worst event-loop stall observed while images are in flight.
+
+    cd backend && python -m benchmarks.bench_inference --images 128 --concurrency 16
+    cd backend && python -m benchmarks.bench_inference --real   # uses the HF detector
+"""
+import argparse
+import asyncio
+import time
+
+from PIL import Image
+
+from inference import BatchInferenceScheduler, pipeline_batches
+
+
+def synthetic_classifier(per_call_ms: float, per_image_ms: float):
+    """Stand-in whose cost has a fixed per-call part, like a real forward pass."""
+    def classify(images):
+        time.sleep((per_call_ms + per_image_ms * len(images)) / 1000)
+        return [[{"label": "artificial", "score": 0.1}, {"label": "human", "score": 0.9}] for _ in images]
+    return classify
+
+
+async def loop_lag_probe(stop: asyncio.Event, interval: float = 0.005) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run(scheduler: BatchInferenceScheduler, images, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(img):
+        async with semaphore:
+            await scheduler.predict(img)
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(loop_lag_probe(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(img) for img in images))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await probe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=96)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--real", action="store_true", help="benchmark the real transformers pipeline")
+    args = parser.parse_args()
+
+    if args.real:
+        from transformers import pipeline
+        model_fn = pipeline_batches(pipeline("image-classification", model="umm-maybe/AI-image-detector"))
+    else:
+        model_fn = synthetic_classifier(per_call_ms=20, per_image_ms=4)
+
+    images = [Image.new("RGB", (512, 512), (i % 255, 80, 160)) for i in range(args.images)]
+    for label, batch_size in (("unbatched", 1), ("batched", args.batch_size)):
+        scheduler = BatchInferenceScheduler(model_fn, batch_size=batch_size, workers=args.workers,
+                                            queue_size=args.images)
+        elapsed, lag = asyncio.run(run(scheduler, images, args.concurrency))
+        stats = scheduler.stats()
+        scheduler.stop()
+        print(f"{label:<10} {args.images / elapsed:8.1f} img/s   avg batch={stats['avg_batch_size']:5.2f}   "
+              f"worst loop stall={lag * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
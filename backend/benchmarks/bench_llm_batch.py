@@ -0,0 +1,80 @@
+"""
+Batched vs one-per-claim Groq verdicts, against the local mock LLM server.
+
+single: every claim is its own completion (analyze_with_ai), `--concurrency`
+in flight. batched: claims are submitted one by one to llm.llm_batcher, which
+packs concurrent submissions into completions of up to LLM_BATCH_SIZE claims.
+Both runs check that every claim got the verdict the mock assigns to it, so a
+result mapped back to the wrong index shows up as a mismatch.
+
+    cd backend && python -m benchmarks.bench_llm_batch --claims 2000
+    cd backend && python -m benchmarks.bench_llm_batch --claims 2000 --drop-rate 0.05 --corrupt-rate 0.05
+    cd backend && python -m benchmarks.bench_llm_batch --batch-size 32 --token-budget 8000
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.mock_llm_server import expected_verdict, mock_llm_env, start_mock_llm_server
+
+EVIDENCE = "\n".join(
+    f"- [HIGH AUTHORITY SOURCE] Reuters: Officials confirmed the report on Tuesday, item {i}. (1 day ago)"
+    for i in range(6)
+)
+
+
+def check(claims, results) -> int:
+    return sum(1 for claim, result in zip(claims, results) if result["verdict"] != expected_verdict(claim)[0])
+
+
+def run(label, fn, claims, server):
+    before = dict(requests=server.stats["requests"], claims=server.stats["claims"])
+    start = time.perf_counter()
+    results = fn(claims)
+    elapsed = time.perf_counter() - start
+    requests = server.stats["requests"] - before["requests"]
+    print(f"{label:8} {len(claims) / elapsed:8.1f} claims/s  {elapsed:6.1f} s  {requests:5d} completions  "
+          f"{len(claims) / max(1, requests):5.1f} claims/completion  {check(claims, results)} mismatched")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8, help="completions in flight (both modes)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--token-budget", type=int, default=12000)
+    parser.add_argument("--base-ms", type=float, default=300, help="mock latency per completion")
+    parser.add_argument("--per-token-ms", type=float, default=2, help="mock latency per output token")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="batched entries the mock leaves out")
+    parser.add_argument("--corrupt-rate", type=float, default=0.0, help="batched entries the mock garbles")
+    args = parser.parse_args()
+
+    server = start_mock_llm_server(base_ms=args.base_ms, per_token_ms=args.per_token_ms,
+                                   drop_rate=args.drop_rate, corrupt_rate=args.corrupt_rate)
+    os.environ.update(mock_llm_env(server))
+    os.environ.update({"LLM_BATCH_SIZE": str(args.batch_size), "LLM_BATCH_TOKEN_BUDGET": str(args.token_budget),
+                       "LLM_BATCH_WORKERS": str(args.concurrency)})
+    import llm  # imported after the environment points at the mock
+
+    claims = [f"Wire headline {i}: the council approved budget line {i * 7919 % 1000}" for i in range(args.claims)]
+
+    def single(items):
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            return list(pool.map(lambda claim: llm.analyze_with_ai(claim, EVIDENCE), items))
+
+    def batched(items):
+        futures = [llm.llm_batcher.submit((claim, EVIDENCE)) for claim in items]
+        return [future.result() for future in futures]
+
+    print(f"{args.claims} claims, mock latency {args.base_ms:.0f} ms + {args.per_token_ms} ms/token, "
+          f"{args.concurrency} completions in flight")
+    run("single", single, claims, server)
+    run("batched", batched, claims, server)
+    print(f"  batch stats: {llm.batch_stats}")
+    llm.llm_batcher.stop()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Does image scanning stall the rest of the API? Runs uvicorn (stand-in
+classifier, mock Groq) once per CPU-pool setting and probes the cheap
+GET /archive at a fixed rate: first idle, then while `--scanners` clients keep
+posting large photos to /scan-image. With the layers on threads they share
+the event loop's GIL; in the process pool /archive should stay flat.
+
+    cd backend && python -m benchmarks.bench_loop_isolation
+    cd backend && python -m benchmarks.bench_loop_isolation --workers 0,2 --scanners 8 --size 4000x3000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_startup import BACKEND, free_port, probe
+from benchmarks.bench_verify_claim import percentile
+from benchmarks.mock_llm_server import mock_llm_env, start_mock_llm_server
+from benchmarks.suite import STAND_INS, jpeg_bytes, photo_like, seed_archive
+
+
+async def probe_archive(client, stop: asyncio.Event, interval: float):
+    timings = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/archive", params={"limit": 20})
+        response.raise_for_status()
+        timings.append(time.perf_counter() - start)
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - start)))
+    return timings
+
+
+async def scan_loop(client, stop: asyncio.Event, images, offset: int, done: list):
+    i = offset
+    while not stop.is_set():
+        response = await client.post("/scan-image", files={"file": (f"photo-{i}.jpg", images[i % len(images)], "image/jpeg")})
+        response.raise_for_status()
+        done.append(time.perf_counter())
+        i += 1
+
+
+async def measure(base: str, images, scanners: int, seconds: float, interval: float):
+    async with httpx.AsyncClient(base_url=base, timeout=120) as client:
+        stop = asyncio.Event()
+        idle = asyncio.create_task(probe_archive(client, stop, interval))
+        await asyncio.sleep(seconds / 2)
+        stop.set()
+        idle_timings = await idle
+
+        stop = asyncio.Event()
+        done = []
+        scans = [asyncio.create_task(scan_loop(client, stop, images, n * 7, done)) for n in range(scanners)]
+        await asyncio.sleep(2)  # let the scanners reach steady state
+        started, first_done = time.perf_counter(), len(done)
+        loaded = asyncio.create_task(probe_archive(client, stop, interval))
+        await asyncio.sleep(seconds)
+        stop.set()
+        loaded_timings = await loaded
+        scan_rate = (len(done) - first_done) / (time.perf_counter() - started)
+        await asyncio.gather(*scans)
+    return idle_timings, loaded_timings, scan_rate
+
+
+def row(label: str, timings):
+    return (f"{label:<8} p50={percentile(timings, 50) * 1000:7.1f} ms  p99={percentile(timings, 99) * 1000:7.1f} ms  "
+            f"max={max(timings) * 1000:7.1f} ms  ({len(timings)} probes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="0,default", help="FORENSICS_WORKERS settings to compare (0 = threads)")
+    parser.add_argument("--scanners", type=int, default=4, help="concurrent /scan-image clients")
+    parser.add_argument("--size", default="3000x2000", help="photo size")
+    parser.add_argument("--seconds", type=float, default=15, help="probe time under load")
+    parser.add_argument("--interval-ms", type=float, default=50, help="time between /archive probes")
+    parser.add_argument("--llm-ms", type=float, default=300, help="mock Groq latency (forensics report)")
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    width, height = (int(v) for v in args.size.split("x"))
+    images = [jpeg_bytes(photo_like(width, height, seed=400 + i)) for i in range(8)]
+    tmp = tempfile.mkdtemp(prefix="veripress-isolation-")
+    os.environ["ATLAS_DB"] = os.path.join(tmp, "isolation.db")
+    import database
+    database.DB_NAME = os.environ["ATLAS_DB"]
+    seed_archive(5000)
+    llm_server = start_mock_llm_server(base_ms=args.llm_ms, per_token_ms=0)
+
+    print(f"{args.scanners} scanners, {width}x{height} JPEGs ({len(images[0]) / 2 ** 20:.1f} MB), "
+          f"/archive every {args.interval_ms:.0f} ms, {os.cpu_count()} CPU(s)")
+    try:
+        for workers in args.workers.split(","):
+            port = free_port()
+            env = dict(os.environ, **mock_llm_env(llm_server), PHASH_INDEX_ENABLED="0", WARMUP_ON_BOOT="1",
+                       PYTHONPATH=os.pathsep.join(filter(None, [STAND_INS, os.environ.get("PYTHONPATH")])))
+            if workers != "default":
+                env["FORENSICS_WORKERS"] = workers
+            server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                                      cwd=BACKEND, env=env, stderr=subprocess.DEVNULL)
+            try:
+                while probe(f"http://127.0.0.1:{port}/health/ready")[0] != 200:
+                    if server.poll() is not None:
+                        raise RuntimeError("API server did not start")
+                    time.sleep(0.1)
+                idle, loaded, scan_rate = asyncio.run(measure(f"http://127.0.0.1:{port}", images, args.scanners,
+                                                              args.seconds, args.interval_ms / 1000))
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+            label = "threads" if workers == "0" else f"process pool ({workers} workers)"
+            print(f"\n{label}: {scan_rate:.2f} scans/s")
+            print("  " + row("idle", idle))
+            print("  " + row("scanning", loaded))
+    finally:
+        llm_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Evidence fan-out during a provider outage, and offline load.
+
+outage: ClaimBuster hangs (or answers 503 with --status). Without a circuit
+breaker every verification pays the provider timeout; with one, only the
+first few do and the rest skip the dead provider until the trial call.
+
+    cd backend && python -m benchmarks.bench_providers outage --requests 40
+    cd backend && python -m benchmarks.bench_providers outage --status 503
+    cd backend && python -m benchmarks.bench_providers offline --requests 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.bench_verify_claim import report
+from benchmarks.stub_server import start_stub_server, stub_env
+
+
+async def outage(evidence, n: int, window: int):
+    timings = []
+    for i in range(n):
+        start = time.perf_counter()
+        await evidence.gather_evidence(f"outage claim {i}")
+        timings.append(time.perf_counter() - start)
+    report(f"first {window}", timings[:window])
+    report("remaining", timings[window:])
+    await evidence.close_http_client()
+    print(json.dumps(evidence.PROVIDERS["claimbuster"].stats(), indent=2))
+
+
+async def offline(evidence, n: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await evidence.gather_evidence(f"offline claim {i}")
+            timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    elapsed = time.perf_counter() - start
+    print(f"{n / elapsed:8.0f} fan-outs/s at concurrency {concurrency}")
+    report("fan-out", timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=("outage", "offline"))
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--status", type=int, default=None, help="ClaimBuster answers this status instead of hanging")
+    parser.add_argument("--timeout", type=float, default=1.0, help="ClaimBuster per-attempt timeout (s)")
+    args = parser.parse_args()
+
+    # Measure the providers themselves: no response cache, no quota
+    os.environ.update({"PROVIDER_CACHE_TTL": "0", "PROVIDER_RATE": "1000000", "PROVIDER_BURST": "1000000"})
+    if args.mode == "offline":
+        os.environ["EVIDENCE_OFFLINE"] = "1"
+        import evidence
+        asyncio.run(offline(evidence, args.requests, args.concurrency))
+        return
+
+    statuses = {"claimbuster": args.status} if args.status else {}
+    delays = {} if args.status else {"claimbuster": 30}
+    server = start_stub_server(delays=delays, statuses=statuses)
+    os.environ.update(stub_env(server))
+    os.environ["EVIDENCE_CLAIMBUSTER_TIMEOUT"] = str(args.timeout)
+
+    import evidence  # imported after the environment points at the stubs
+
+    asyncio.run(outage(evidence, args.requests, evidence.PROVIDER_FAILURE_THRESHOLD))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
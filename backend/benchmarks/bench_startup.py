@@ -0,0 +1,142 @@
+"""
+Cold-start time and memory of the API server.
+
+Starts the real server in a subprocess (scratch database), then polls
+/health/live and /health/ready and reports the time until each answers 200,
+plus the RSS and PSS of the whole process tree. PSS splits shared pages between
+the processes that map them, so it is the number that shows whether gunicorn
+workers share one preloaded model or each hold their own.
+
+    cd backend && python -m benchmarks.bench_startup                          # uvicorn, lazy model
+    cd backend && python -m benchmarks.bench_startup --warmup                  # uvicorn, WARMUP_ON_BOOT=1
+    cd backend && python -m benchmarks.bench_startup --server gunicorn --workers 4
+    cd backend && python -m benchmarks.bench_startup --server gunicorn --workers 4 --no-preload
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def probe(url: str):
+    """(HTTP status, parsed JSON body); status 0 while the server is not accepting connections."""
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+    except (OSError, ValueError):
+        return 0, None
+
+
+def process_tree(pid: int):
+    pids, frontier = [pid], [pid]
+    while frontier:
+        parent = frontier.pop()
+        try:
+            with open(f"/proc/{parent}/task/{parent}/children") as f:
+                children = [int(c) for c in f.read().split()]
+        except OSError:
+            children = []
+        pids.extend(children)
+        frontier.extend(children)
+    return pids
+
+
+def memory_mb(pids):
+    rss = pss = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    key, value = line.split(":", 1)
+                    if key == "Rss": rss += int(value.split()[0])
+                    elif key == "Pss": pss += int(value.split()[0])
+        except OSError:
+            pass
+    return rss / 1024, pss / 1024
+
+
+def run_once(args, tmp: str):
+    port = free_port()
+    env = dict(os.environ, ATLAS_DB=os.path.join(tmp, f"startup-{port}.db"),
+               WARMUP_ON_BOOT="1" if args.warmup else "0", PRELOAD_APP="0" if args.no_preload else "1",
+               PYTHONUNBUFFERED="1")
+    if args.server == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+               "--workers", str(args.workers), "main:app"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"]
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    live = ready = None
+    try:
+        while time.perf_counter() - start < args.timeout and proc.poll() is None:
+            if live is None and probe(f"http://127.0.0.1:{port}/health/live")[0] == 200:
+                live = time.perf_counter() - start
+            if live is not None:
+                code, body = probe(f"http://127.0.0.1:{port}/health/ready")
+                if code == 200:
+                    ready = time.perf_counter() - start
+                    break
+                failed = [name for name, c in (body or {}).get("components", {}).items()
+                          if c["required"] and c["state"] == "failed"]
+                if failed:
+                    print(f"  required component(s) failed to load: {', '.join(failed)}")
+                    break
+            time.sleep(0.05)
+        # Let background warm-up settle before measuring memory
+        time.sleep(args.settle)
+        rss, pss = memory_mb(process_tree(proc.pid))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return live, ready, rss, pss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=("uvicorn", "gunicorn"), default="uvicorn")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--warmup", action="store_true", help="set WARMUP_ON_BOOT=1")
+    parser.add_argument("--no-preload", action="store_true", help="gunicorn without fork-after-load")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--settle", type=float, default=1.0, help="seconds to wait before sampling memory")
+    parser.add_argument("--timeout", type=float, default=180)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(args.runs):
+            results.append(run_once(args, tmp))
+
+    def fmt(values):
+        values = [v for v in values if v is not None]
+        return f"{statistics.median(values):7.2f}" if values else "    n/a"
+
+    print(f"{args.server} workers={args.workers if args.server == 'gunicorn' else 1} warmup={args.warmup} "
+          f"preload={not args.no_preload} runs={args.runs}")
+    print(f"  live   {fmt([r[0] for r in results])} s")
+    print(f"  ready  {fmt([r[1] for r in results])} s")
+    print(f"  rss    {fmt([r[2] for r in results])} MB (sum over processes, counts shared pages once per process)")
+    print(f"  pss    {fmt([r[3] for r in results])} MB (shared pages split between processes)")
+
+
+if __name__ == "__main__":
+    main()
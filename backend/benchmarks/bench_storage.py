@@ -0,0 +1,124 @@
+"""
+Concurrent claim writes plus /archive reads against a scratch database.
+
+"legacy" reproduces the old storage path: a fresh connection per call, the
+default rollback journal, one transaction per claim and no created_at index.
+"pooled" uses the pooled WAL connections and the group-commit ClaimWriter.
+
+    cd backend && python -m benchmarks.bench_storage --writers 16 --claims 200
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import database
+from benchmarks.bench_verify_claim import report
+
+ARCHIVE_QUERY = 'SELECT * FROM claims ORDER BY created_at DESC, id DESC LIMIT 50'
+
+
+def make_record(writer: int, i: int) -> dict:
+    now = datetime.utcnow().isoformat()
+    return {"claim_text": f"claim {writer}-{i}", "verdict": "True", "explanation": "x" * 400,
+            "sources": [{"name": "t", "url": "https://example.org", "snippet": "s" * 200}],
+            "credibility_score": 80, "hash": f"{writer:08x}{i:056x}", "created_at": now, "expires_at": now}
+
+
+def legacy_write(path: str, record: dict):
+    conn = sqlite3.connect(path)
+    try:
+        database.insert_claims(conn, [record])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def legacy_read(path: str):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(ARCHIVE_QUERY).fetchall()
+    finally:
+        conn.close()
+
+
+def pooled_read(_path: str):
+    with database.db_connection() as conn:
+        conn.execute(ARCHIVE_QUERY).fetchall()
+
+
+def run(label: str, path: str, write, read, writers: int, claims: int, seed_rows: int):
+    errors, reads, lock = [], [], threading.Lock()
+    stop = threading.Event()
+
+    def writer(w):
+        for i in range(claims):
+            try:
+                write(path, make_record(w, i))
+            except Exception as e:
+                with lock: errors.append(str(e))
+
+    def reader():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                read(path)
+                reads.append(time.perf_counter() - t0)
+            except Exception as e:
+                with lock: errors.append(str(e))
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for t in readers: t.start()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for t in readers: t.join()
+
+    locked = sum("locked" in e for e in errors)
+    print(f"{label:<7} {writers * claims / elapsed:8.0f} claims/s   errors={len(errors)} (locked={locked})   "
+          f"rows={seed_rows + writers * claims - len(errors)}")
+    if reads:
+        report("  /archive", reads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--claims", type=int, default=100, help="claims per writer")
+    parser.add_argument("--seed", type=int, default=20_000, help="rows present before the run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Legacy: rollback journal, no created_at index, 5 s default lock timeout
+        legacy = os.path.join(tmp, "legacy.db")
+        conn = sqlite3.connect(legacy)
+        database._migration_1_base_tables(conn)
+        database._migration_2_verdict_cache(conn)
+        database._migration_7_normalized_sources(conn)
+        conn.execute("DROP INDEX idx_claims_created_at_verdict")
+        database.insert_claims(conn, [make_record(-1, i) for i in range(args.seed)])
+        conn.commit()
+        conn.close()
+        run("legacy", legacy, legacy_write, legacy_read, args.writers, args.claims, args.seed)
+
+        database.DB_NAME = os.path.join(tmp, "pooled.db")
+        database.init_db()
+        with database.db_connection() as conn:
+            with conn:
+                database.insert_claims(conn, [make_record(-1, i) for i in range(args.seed)])
+        writer = database.ClaimWriter()
+        run("pooled", database.DB_NAME, lambda _p, r: writer.submit(r).result(), pooled_read,
+            args.writers, args.claims, args.seed)
+        print(f"  group commits={writer.commits} (avg {writer.rows / max(writer.commits, 1):.1f} claims/commit)")
+        writer.stop()
+        database.get_pool().close()
+
+
+if __name__ == "__main__":
+    main()
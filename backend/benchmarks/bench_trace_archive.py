@@ -0,0 +1,68 @@
+"""
+/trace-archive against the local stand-in archive: cold traces (every
+snapshot fetched, TRACE_CONCURRENCY at a time) versus repeat traces served
+from the disk cache, with the number of archive requests each round sent.
+
+    cd backend && python -m benchmarks.bench_trace_archive --urls 20 --snapshot-ms 150
+    cd backend && python -m benchmarks.bench_trace_archive --concurrency 1   # sequential fetches
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.archive_stub_server import archive_env, start_archive_server
+from benchmarks.bench_verify_claim import report
+
+
+async def trace_round(wayback, urls, server):
+    before = sum(server.counts.values())
+    timings = []
+    for url in urls:
+        start = time.perf_counter()
+        await wayback.trace_url(url)
+        timings.append(time.perf_counter() - start)
+    return timings, sum(server.counts.values()) - before
+
+
+async def run(wayback, urls, server):
+    cold, cold_requests = await trace_round(wayback, urls, server)
+    warm, warm_requests = await trace_round(wayback, urls, server)
+    report("cold", cold)
+    report("repeat", warm)
+    print(f"archive requests: cold {cold_requests} ({cold_requests / len(urls):.1f}/trace), "
+          f"repeat {warm_requests} ({warm_requests / len(urls):.1f}/trace)")
+    print(wayback.trace_cache.stats())
+    await wayback.get_http_client().aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=10)
+    parser.add_argument("--captures", type=int, default=60, help="captures per URL in the stand-in archive")
+    parser.add_argument("--snapshot-ms", type=float, default=150, help="stand-in latency per snapshot")
+    parser.add_argument("--cdx-ms", type=float, default=300, help="stand-in latency per index query")
+    parser.add_argument("--concurrency", type=int, default=None, help="TRACE_CONCURRENCY (default: the module's)")
+    args = parser.parse_args()
+
+    server = start_archive_server(delays={"cdx": args.cdx_ms / 1000, "snapshot": args.snapshot_ms / 1000},
+                                  captures=args.captures, change_every=2)
+    cache_dir = tempfile.mkdtemp(prefix="veripress-trace-")
+    os.environ.update(archive_env(server), TRACE_CACHE_DIR=cache_dir)
+    if args.concurrency:
+        os.environ["TRACE_CONCURRENCY"] = str(args.concurrency)
+
+    import wayback  # imported after the environment points at the stand-in
+
+    urls = [f"https://news.example.com/{'deleted-' if i % 3 == 0 else ''}story-{i}" for i in range(args.urls)]
+    try:
+        asyncio.run(run(wayback, urls, server))
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
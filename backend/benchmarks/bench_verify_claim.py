@@ -0,0 +1,67 @@
+"""
+Evidence fan-out benchmark: sequential lookups (the old /verify-claim path)
+versus the concurrent, pooled `gather_evidence`.
+
+    cd backend && python -m benchmarks.bench_verify_claim --requests 50 --slow 1.5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.stub_server import start_stub_server, stub_env
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label, samples):
+    print(f"{label:<12} p50={percentile(samples, 50) * 1000:8.1f} ms   "
+          f"p99={percentile(samples, 99) * 1000:8.1f} ms   mean={statistics.mean(samples) * 1000:8.1f} ms")
+
+
+async def run(evidence, n: int, deadline: float):
+    sequential, concurrent = [], []
+    for i in range(n):
+        query = f"benchmark claim {i}"
+
+        start = time.perf_counter()
+        for provider in evidence.PROVIDERS.values():
+            await provider.lookup(query)
+        sequential.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await evidence.gather_evidence(query, deadline=deadline)
+        concurrent.append(time.perf_counter() - start)
+
+    await evidence.close_http_client()
+    report("sequential", sequential)
+    report("concurrent", concurrent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--delay", type=float, default=0.2, help="per-provider stub latency (s)")
+    parser.add_argument("--slow", type=float, default=None, help="make ClaimBuster this slow (s)")
+    parser.add_argument("--deadline", type=float, default=1.0)
+    args = parser.parse_args()
+
+    delays = {"factcheck": args.delay, "serper": args.delay, "claimbuster": args.slow or args.delay}
+    server = start_stub_server(delays=delays)
+    os.environ.update(stub_env(server))
+    # Measure the network path: no response cache, no quota
+    os.environ.update({"PROVIDER_CACHE_TTL": "0", "PROVIDER_RATE": "1000000", "PROVIDER_BURST": "1000000"})
+
+    import evidence  # imported after the environment points at the stubs
+
+    asyncio.run(run(evidence, args.requests, args.deadline))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Time to first useful byte: /verify-claim versus /verify-claim/stream.
+
+Runs the real app under uvicorn (the test client buffers whole responses)
+against the stub providers (fact check, live search and ClaimBuster answer
+after different delays) and the mock Groq server, and reports, per request,
+when the first event arrived and when the verdict did. Every claim is new, so
+nothing is answered from the verdict cache.
+
+    cd backend && python -m benchmarks.bench_verify_stream --requests 20
+    cd backend && python -m benchmarks.bench_verify_stream --llm-ms 2000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_startup import BACKEND, free_port, probe
+from benchmarks.bench_verify_claim import report
+from benchmarks.mock_llm_server import mock_llm_env, start_mock_llm_server
+from benchmarks.stub_server import start_stub_server, stub_env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--factcheck", type=float, default=0.3, help="fact check API delay (s)")
+    parser.add_argument("--serper", type=float, default=0.15, help="live search delay (s)")
+    parser.add_argument("--claimbuster", type=float, default=0.6, help="ClaimBuster delay (s)")
+    parser.add_argument("--llm-ms", type=float, default=800, help="mock Groq latency per completion")
+    args = parser.parse_args()
+
+    stubs = start_stub_server(delays={"factcheck": args.factcheck, "serper": args.serper, "claimbuster": args.claimbuster})
+    llm_server = start_mock_llm_server(base_ms=args.llm_ms, per_token_ms=0)
+    port = free_port()
+    env = dict(os.environ, **stub_env(stubs), **mock_llm_env(llm_server),
+               ATLAS_DB=os.path.join(tempfile.mkdtemp(), "verify-stream.db"), VERIFY_RATE_LIMIT="1000000/minute",
+               PROVIDER_CACHE_TTL="0", PROVIDER_RATE="1000000", PROVIDER_BURST="1000000")
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                              cwd=BACKEND, env=env)
+    base = f"http://127.0.0.1:{port}"
+    blocking, stream_first, stream_verdict = [], [], []
+    try:
+        while probe(f"{base}/health/ready")[0] != 200:
+            time.sleep(0.05)
+        with httpx.Client(base_url=base, timeout=30) as client:
+            for i in range(args.requests):
+                start = time.perf_counter()
+                client.post("/verify-claim", json={"claim_text": f"Blocking benchmark claim {i}"}).raise_for_status()
+                blocking.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                first = None
+                with client.stream("POST", "/verify-claim/stream", json={"claim_text": f"Streaming benchmark claim {i}"}) as response:
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        first = first or time.perf_counter() - start
+                        if json.loads(line)["event"] == "verdict":
+                            stream_verdict.append(time.perf_counter() - start)
+                stream_first.append(first)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    report("blocking", blocking)
+    report("first event", stream_first)
+    report("verdict", stream_verdict)
+    llm_server.shutdown()
+    stubs.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Local stand-in for the Groq chat completions API.
+
+Answers the single-claim and batched verdict prompts from llm.py with a
+deterministic verdict per claim (see `expected_verdict`), after a latency of
+`base_ms` plus `per_token_ms` for every output token, so batching can be
+benchmarked and checked for correctness offline. Batched responses can be
+made to drop or corrupt entries to exercise the retry path.
+
+    cd backend && python -m benchmarks.mock_llm_server
+    GROQ_API_KEY=stub GROQ_BASE_URL=http://127.0.0.1:8901 uvicorn main:app
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.stub_server import StubServer
+
+VERDICTS = (("False", 10), ("Unverified", 50), ("True", 90))
+_CLAIMS = re.compile(r"^\s*Claims: (\[.*\])\s*$", re.MULTILINE)
+_CLAIM = re.compile(r'^\s*Claim: "(.*)"\s*$', re.MULTILINE)
+
+
+def expected_verdict(claim: str):
+    """(verdict, score) the mock gives `claim`; stable across runs."""
+    return VERDICTS[hashlib.sha1(claim.encode()).digest()[0] % len(VERDICTS)]
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    base_ms = 300.0
+    per_token_ms = 2.0
+    drop_rate = 0.0     # batched entries left out of the response
+    corrupt_rate = 0.0  # batched entries with a missing verdict
+    stats = None
+
+    def log_message(self, *args):
+        pass
+
+    def _verdict(self, claim: str) -> dict:
+        verdict, score = expected_verdict(claim)
+        return {"verdict": verdict, "explanation": f"Mock analysis of: {claim[:60]}", "score": score}
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        prompt = request["messages"][-1]["content"]
+
+        batch = _CLAIMS.search(prompt)
+        if batch:
+            results = []
+            for item in json.loads(batch.group(1)):
+                if random.random() < self.drop_rate:
+                    continue
+                entry = {"id": item["id"], **self._verdict(item["claim"])}
+                if random.random() < self.corrupt_rate:
+                    del entry["verdict"]
+                results.append(entry)
+            payload = {"results": results}
+        else:
+            single = _CLAIM.search(prompt)
+            payload = self._verdict(single.group(1) if single else prompt)
+        content = json.dumps(payload)
+
+        output_tokens = len(content) // 4 + 1
+        with self.stats["lock"]:
+            self.stats["requests"] += 1
+            self.stats["claims"] += len(payload["results"]) if batch else 1
+        time.sleep((self.base_ms + self.per_token_ms * output_tokens) / 1000)
+
+        body = json.dumps({
+            "id": f"chatcmpl-mock-{self.stats['requests']}", "object": "chat.completion", "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": output_tokens,
+                      "total_tokens": len(prompt) // 4 + output_tokens},
+        }).encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def start_mock_llm_server(port: int = 0, base_ms: float = 300, per_token_ms: float = 2,
+                          drop_rate: float = 0, corrupt_rate: float = 0) -> ThreadingHTTPServer:
+    """Starts the mock on a background thread; `server.stats` counts requests and claims answered."""
+    stats = {"requests": 0, "claims": 0, "lock": threading.Lock()}
+    handler = type("ConfiguredMockLLMHandler", (MockLLMHandler,), {
+        "base_ms": base_ms, "per_token_ms": per_token_ms, "drop_rate": drop_rate,
+        "corrupt_rate": corrupt_rate, "stats": stats})
+    server = StubServer(("127.0.0.1", port), handler)
+    server.stats = stats
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def mock_llm_env(server: ThreadingHTTPServer) -> dict:
+    """Environment variables that point llm.py at the mock."""
+    return {"GROQ_API_KEY": "stub", "GROQ_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}"}
+
+
+if __name__ == "__main__":
+    srv = start_mock_llm_server(8901)
+    print("Mock Groq API listening on http://127.0.0.1:8901")
+    for key, value in mock_llm_env(srv).items():
+        print(f"  {key}={value}")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
@@ -0,0 +1,30 @@
+"""
+Tiny stand-in for the `transformers` image-classification pipeline.
+
+Benchmarks that run the API in a subprocess put this directory first on
+PYTHONPATH, so inference.load_ai_detector gets a classifier that costs a fixed
+STAND_IN_CLASSIFIER_MS per call plus STAND_IN_CLASSIFIER_IMAGE_MS per image
+and scores images from their mean brightness, instead of downloading and
+running the ResNet-50 detector.
+"""
+import os
+import time
+
+from PIL import ImageStat
+
+CALL_MS = float(os.getenv("STAND_IN_CLASSIFIER_MS", "20"))
+IMAGE_MS = float(os.getenv("STAND_IN_CLASSIFIER_IMAGE_MS", "5"))
+
+
+def _classify(images, batch_size=1):
+    images = images if isinstance(images, list) else [images]
+    time.sleep((CALL_MS + IMAGE_MS * len(images)) / 1000)
+    outputs = []
+    for image in images:
+        score = sum(ImageStat.Stat(image.convert("L")).mean) / 255
+        outputs.append([{"label": "artificial", "score": score}, {"label": "human", "score": 1 - score}])
+    return outputs
+
+
+def pipeline(task: str, model: str = None, **kwargs):
+    return _classify
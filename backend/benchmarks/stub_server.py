@@ -0,0 +1,111 @@
+"""
+Local stand-ins for the external evidence providers.
+
+Each route sleeps for a configurable delay and returns a canned payload in the
+same shape as the real API, or a configured error status to simulate an
+outage, so the verification pipeline can be benchmarked without network access
+or API keys.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+FACT_CHECK_PAYLOAD = {
+    "claims": [{
+        "text": "Stub claim",
+        "claimReview": [{
+            "publisher": {"name": "Stub Checker"},
+            "url": "https://factcheck.example.org/stub",
+            "textualRating": "False",
+            "reviewDate": "2020-01-01T00:00:00Z",
+        }],
+    }]
+}
+
+SERPER_PAYLOAD = {
+    "organic": [
+        {"title": f"Stub result {i}", "link": f"https://www.reuters.com/world/stub-{i}",
+         "snippet": "Officials confirmed the report on Tuesday.", "source": "Reuters", "date": "1 day ago"}
+        for i in range(6)
+    ]
+}
+
+CLAIMBUSTER_PAYLOAD = {"results": [{"text": "Stub claim", "score": 0.42}]}
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 drops connections under concurrent load,
+    # which shows up as 1 s SYN-retry stalls that the real APIs do not have.
+    request_queue_size = 1024
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    delays = {"factcheck": 0.05, "serper": 0.05, "claimbuster": 0.05}
+    statuses = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, route: str, payload: dict):
+        time.sleep(self.delays.get(route, 0))
+        status = self.statuses.get(route, 200)
+        body = json.dumps(payload if status == 200 else {"error": "stub outage"}).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up (deadline hit) while we were sleeping
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path.startswith("/factcheck"):
+            self._reply("factcheck", FACT_CHECK_PAYLOAD)
+        elif path.startswith("/claimbuster"):
+            self._reply("claimbuster", CLAIMBUSTER_PAYLOAD)
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if urlparse(self.path).path.startswith("/serper"):
+            self._reply("serper", SERPER_PAYLOAD)
+        else:
+            self.send_error(404)
+
+
+def start_stub_server(port: int = 0, delays: dict = None, statuses: dict = None) -> ThreadingHTTPServer:
+    """Starts the stub server on a background thread and returns it."""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"delays": {**StubHandler.delays, **(delays or {})},
+                                                             "statuses": dict(statuses or {})})
+    server = StubServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stub_env(server: ThreadingHTTPServer) -> dict:
+    """Environment variables that point evidence.py at the stub server."""
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    return {
+        "GOOGLE_FACT_CHECK_KEY": "stub", "SERPER_API_KEY": "stub", "CLAIMBUSTER_API_KEY": "stub",
+        "GOOGLE_FACT_CHECK_URL": f"{base}/factcheck",
+        "SERPER_URL": f"{base}/serper",
+        "CLAIMBUSTER_URL": f"{base}/claimbuster",
+    }
+
+
+if __name__ == "__main__":
+    srv = start_stub_server(8900)
+    print("Stub providers listening on http://127.0.0.1:8900")
+    for key, value in stub_env(srv).items():
+        print(f"  {key}={value}")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
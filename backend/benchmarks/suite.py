@@ -0,0 +1,380 @@
+"""
+Benchmark suite with a stored baseline, for catching performance regressions.
+
+Micro-benchmarks time hot functions in-process: EXIF extraction
+(get_exif_data), the Layer 3 pixel forensics (ELA, noise map, JPEG grid and
+clone hints on a 1024x768 photo), safe_int_score, is_trusted_domain and
+archive row decoding. End-to-end scenarios run the real app under uvicorn
+against local stand-ins (stub_server.py for Google Fact Check, Serper and
+ClaimBuster, mock_llm_server.py for Groq, stand_ins/transformers.py for the
+image classifier) and drive /verify-claim, /scan-image and /archive with a
+closed-loop load at fixed concurrency.
+
+Results are written as JSON and compared metric by metric with the baseline
+(benchmarks/baseline.json unless --baseline says otherwise). A metric more than
+--tolerance worse than its baseline is reported as a regression and the exit
+status is 1. Baselines depend on the machine: regenerate one with
+--save-baseline on the machine that runs the comparison.
+
+    cd backend && python -m benchmarks.suite
+    cd backend && python -m benchmarks.suite --only micro --output results.json
+    cd backend && python -m benchmarks.suite --only e2e --tolerance 0.4
+    cd backend && python -m benchmarks.suite --save-baseline
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+import numpy as np
+from PIL import Image
+
+from benchmarks.bench_startup import BACKEND, free_port, probe
+from benchmarks.bench_verify_claim import percentile
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+STAND_INS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stand_ins")
+
+# Compared metrics and which direction is better; other fields are informational
+LOWER_IS_BETTER = {"us_per_op", "p50_ms", "p95_ms"}
+HIGHER_IS_BETTER = {"ops_per_s", "rps"}
+ERROR_RATE_SLACK = 0.01
+
+
+# --- Fixtures ---
+
+def photo_like(width: int, height: int, seed: int) -> Image.Image:
+    """
+    Smooth random shapes plus sensor-like noise, so forensics and JPEG behave
+    as on a photo. Different seeds give perceptually different images, so
+    scans are not answered from the image index.
+    """
+    rng = np.random.default_rng(seed)
+    coarse = Image.fromarray(rng.integers(0, 256, (6, 8, 3), dtype=np.uint8)).resize((width, height), Image.BICUBIC)
+    pixels = np.asarray(coarse, dtype=np.float32) + rng.normal(0, 6, (height, width, 3))
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def jpeg_bytes(image: Image.Image, exif: bool = False) -> bytes:
+    out = io.BytesIO()
+    if exif:
+        tags = Image.Exif()
+        tags[0x010F] = "Canon"                   # Make
+        tags[0x0110] = "Canon EOS 5D Mark IV"    # Model
+        tags[0x0131] = "Benchmark 1.0"           # Software
+        tags[0x0132] = "2024:03:01 10:15:00"     # DateTime
+        tags[0x9286] = b"ASCII\x00\x00\x00newsroom sample"  # UserComment (bytes)
+        image.save(out, "JPEG", quality=90, exif=tags)
+    else:
+        image.save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+
+def claim_record(i: int) -> dict:
+    now = datetime.utcnow().isoformat()
+    sources = [{"name": f"Live: Source {j}", "url": f"https://www.reuters.com/world/article-{i}-{j}",
+                "snippet": "Officials confirmed the report on Tuesday..." * 2, "date": "1 day ago"} for j in range(5)]
+    return {"claim_text": f"Archived benchmark claim number {i} about the city budget", "verdict": ("True", "False", "Unverified")[i % 3],
+            "explanation": "The claim matches the published council minutes. " * 4, "sources": sources,
+            "credibility_score": (i * 37) % 101, "hash": f"{i:064x}", "created_at": now, "expires_at": now}
+
+
+def seed_archive(rows: int):
+    import database
+    database.init_db()
+    with database.db_connection() as conn:
+        with conn:
+            database.insert_claims(conn, [claim_record(i) for i in range(rows)])
+
+
+# --- Micro-benchmarks ---
+
+def measure(fn, min_time: float, rounds: int) -> dict:
+    """Runs `fn` in rounds of at least `min_time` seconds; per-call figures from the median round."""
+    n = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 4:
+            break
+        n *= 2
+    n = max(1, int(n * min_time / elapsed))
+    per_op = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        per_op.append((time.perf_counter() - start) / n)
+    median = statistics.median(per_op)
+    return {"us_per_op": round(median * 1e6, 3), "ops_per_s": round(1 / median, 1),
+            "best_us_per_op": round(min(per_op) * 1e6, 3), "calls_per_round": n}
+
+
+def micro_benchmarks(args) -> dict:
+    from archive import decode_claim, load_sources
+    from database import db_connection
+    from forensics import analyze_forensics
+    from llm import safe_int_score
+    from forensics import get_exif_data
+    from models import ArchiveItem
+    from reputation import DEFAULT_DOMAINS, is_trusted_domain
+    from benchmarks.bench_reputation import build_urls
+
+    exif_jpeg = jpeg_bytes(photo_like(640, 480, seed=1), exif=True)
+    photo = Image.open(io.BytesIO(jpeg_bytes(photo_like(1024, 768, seed=2))))
+    photo.load()
+    scores = [87, 42.9, "75", "score: 12/100", "around 60%", "n/a", None, 140, -3, "True"]
+    urls = build_urls(random.Random(7), dict(DEFAULT_DOMAINS), 1000)
+    with db_connection() as conn:
+        rows = conn.execute("SELECT * FROM claims ORDER BY created_at DESC, id DESC LIMIT 50").fetchall()
+        sources = load_sources(conn, [row["id"] for row in rows])
+
+    def exif():
+        with Image.open(io.BytesIO(exif_jpeg)) as image:
+            get_exif_data(image)
+
+    def scores_batch():
+        for value in scores:
+            safe_int_score(value)
+
+    def urls_batch():
+        for url in urls:
+            is_trusted_domain(url)
+
+    def decode_rows():
+        for row in rows:
+            ArchiveItem(**decode_claim(row, sources.get(row["id"], [])))
+
+    # (name, callable, items handled per call); figures are reported per item
+    cases = [
+        ("get_exif_data", exif, 1),
+        ("layer3_forensics", lambda: analyze_forensics(photo), 1),
+        ("safe_int_score", scores_batch, len(scores)),
+        ("is_trusted_domain", urls_batch, len(urls)),
+        ("archive_row_decode", decode_rows, len(rows)),
+    ]
+    results = {}
+    for name, fn, items in cases:
+        result = measure(fn, args.min_time, args.rounds)
+        for key in ("us_per_op", "best_us_per_op"):
+            result[key] = round(result[key] / items, 3)
+        result["ops_per_s"] = round(result["ops_per_s"] * items, 1)
+        results[f"micro.{name}"] = result
+        print(f"  {name:<22} {result['us_per_op']:12,.2f} us/op {result['ops_per_s']:14,.0f} ops/s")
+    return results
+
+
+# --- End-to-end scenarios ---
+
+async def drive(base: str, requests: int, concurrency: int, make_request) -> dict:
+    """Closed-loop load: `concurrency` clients issue `requests` calls of make_request(client, i) in total."""
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+
+    async def worker(client):
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await make_request(client, i)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, timeout=60, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {"rps": round(requests / elapsed, 2), "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2), "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "error_rate": round(errors / requests, 4), "requests": requests, "concurrency": concurrency}
+
+
+def e2e_scenarios(args) -> dict:
+    from benchmarks.mock_llm_server import mock_llm_env, start_mock_llm_server
+    from benchmarks.stub_server import start_stub_server, stub_env
+
+    stubs = start_stub_server(delays={"factcheck": args.provider_ms / 1000, "serper": args.provider_ms / 1000,
+                                      "claimbuster": args.provider_ms / 1000})
+    llm_server = start_mock_llm_server(base_ms=args.llm_ms, per_token_ms=0)
+    port = free_port()
+    env = dict(os.environ, **stub_env(stubs), **mock_llm_env(llm_server),
+               PYTHONPATH=os.pathsep.join(filter(None, [STAND_INS, os.environ.get("PYTHONPATH")])),
+               VERIFY_RATE_LIMIT="1000000/minute", PROVIDER_CACHE_TTL="0", PROVIDER_RATE="1000000",
+               PROVIDER_BURST="1000000", WARMUP_ON_BOOT="0")
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                              cwd=BACKEND, env=env)
+    base = f"http://127.0.0.1:{port}"
+    images = [jpeg_bytes(photo_like(640, 480, seed=100 + i)) for i in range(args.scan_requests + 2)]
+    run_id = int(time.time())
+    cursors = [None]
+
+    async def verify_claim(client, i):
+        return await client.post("/verify-claim", json={"claim_text": f"Suite claim {run_id}-{i}: the council approved the budget"})
+
+    async def scan_image(client, i):
+        return await client.post("/scan-image", files={"file": (f"photo-{i}.jpg", images[i % len(images)], "image/jpeg")})
+
+    async def archive(client, i):
+        if i % 4 == 3:
+            return await client.get(f"/archive/{1 + (i * 7919) % args.archive_rows}")
+        cursor = cursors[i % len(cursors)]
+        response = await client.get("/archive", params={"limit": 20, **({"cursor": cursor} if cursor else {})})
+        if response.headers.get("x-next-cursor") and len(cursors) < 20:
+            cursors.append(response.headers["x-next-cursor"])
+        return response
+
+    scenarios = [
+        ("verify_claim", verify_claim, args.verify_requests, args.verify_concurrency),
+        ("scan_image", scan_image, args.scan_requests, args.scan_concurrency),
+        ("archive", archive, args.archive_requests, args.archive_concurrency),
+    ]
+    results = {}
+    try:
+        deadline = time.monotonic() + 60
+        while probe(f"{base}/health/ready")[0] != 200:
+            if server.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("API server did not start")
+            time.sleep(0.05)
+        for name, make_request, requests, concurrency in scenarios:
+            # Warm-up (model load, connection pool) outside the timed run
+            asyncio.run(drive(base, 2, 1, lambda client, i: make_request(client, requests + i)))
+            result = asyncio.run(drive(base, requests, concurrency, make_request))
+            results[f"e2e.{name}"] = result
+            print(f"  {name:<22} {result['rps']:8.1f} req/s   p50={result['p50_ms']:8.1f} ms   "
+                  f"p95={result['p95_ms']:8.1f} ms   errors={result['error_rate']:.1%}")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        llm_server.shutdown()
+        stubs.shutdown()
+    return results
+
+
+# --- Baseline comparison ---
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Prints the change of every compared metric; returns the regressions."""
+    regressions = []
+    for name, metrics in sorted(results.items()):
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"  {name:<28} (no baseline)")
+            continue
+        for key, value in metrics.items():
+            old = reference.get(key)
+            if old is None:
+                continue
+            if key == "error_rate":
+                bad = value > old + ERROR_RATE_SLACK
+                change = value - old
+            elif key in LOWER_IS_BETTER:
+                change = value / old - 1 if old else 0.0
+                bad = change > tolerance
+            elif key in HIGHER_IS_BETTER:
+                change = value / old - 1 if old else 0.0
+                bad = change < -tolerance
+            else:
+                continue
+            flag = "  REGRESSION" if bad else ""
+            print(f"  {name:<28} {key:<10} {old:>12,.2f} -> {value:>12,.2f}  {change:+7.1%}{flag}")
+            if bad:
+                regressions.append((name, key, old, value))
+    return regressions
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND, capture_output=True, text=True,
+                              timeout=10).stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=("micro", "e2e"), help="run one part of the suite")
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown per metric")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per micro-benchmark round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--archive-rows", type=int, default=5000, help="claims seeded into the scratch database")
+    parser.add_argument("--provider-ms", type=float, default=30, help="stub evidence provider latency")
+    parser.add_argument("--llm-ms", type=float, default=80, help="mock Groq latency per completion")
+    parser.add_argument("--verify-requests", type=int, default=200)
+    parser.add_argument("--verify-concurrency", type=int, default=16)
+    parser.add_argument("--scan-requests", type=int, default=60)
+    parser.add_argument("--scan-concurrency", type=int, default=4)
+    parser.add_argument("--archive-requests", type=int, default=1000)
+    parser.add_argument("--archive-concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    # The scratch database is shared by the micro-benchmarks and the server subprocess
+    tmp = tempfile.mkdtemp(prefix="veripress-bench-")
+    os.environ["ATLAS_DB"] = os.path.join(tmp, "suite.db")
+    import database
+    database.DB_NAME = os.environ["ATLAS_DB"]
+    seed_archive(args.archive_rows)
+
+    results = {}
+    if args.only in (None, "micro"):
+        print("Micro-benchmarks")
+        results.update(micro_benchmarks(args))
+    if args.only in (None, "e2e"):
+        print("End-to-end scenarios")
+        results.update(e2e_scenarios(args))
+
+    report = {
+        "meta": {"revision": git_revision(), "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+                 "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "settings": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "save_baseline")}},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {"meta": report["meta"], "results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline["results"] = json.load(f).get("results", {})
+        baseline["results"].update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print(f"Compared with baseline {baseline['meta'].get('revision')} ({baseline['meta'].get('timestamp')}), "
+          f"tolerance {args.tolerance:.0%}")
+    regressions = compare(results, baseline["results"], args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import os
+import re
+import time
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from archive import load_sources
+from database import db_connection
+from metrics import callback_metric
+
+# --- Configuration ---
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", "2048"))
+
+# TTLs in seconds. Breaking-news verdicts go stale within minutes, published
+# fact-checks are stable for days.
+VERDICT_TTL_BREAKING = int(os.getenv("VERDICT_TTL_BREAKING", "900"))
+VERDICT_TTL_FACT_CHECK = int(os.getenv("VERDICT_TTL_FACT_CHECK", str(7 * 24 * 3600)))
+VERDICT_TTL_DEFAULT = int(os.getenv("VERDICT_TTL_DEFAULT", str(6 * 3600)))
+VERDICT_TTL_NO_DATA = int(os.getenv("VERDICT_TTL_NO_DATA", "600"))
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_claim(text: str) -> str:
+    """Canonical form used for cache keys: NFKC, casefolded, no punctuation, single spaces."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def verdict_ttl(verdict: str, has_breaking_news: bool, fact_check_found: bool) -> int:
+    """How long a verdict may be served from cache. 0 means do not cache."""
+    if verdict == "Error":
+        return 0
+    if has_breaking_news:
+        return VERDICT_TTL_BREAKING
+    if fact_check_found:
+        return VERDICT_TTL_FACT_CHECK
+    if verdict == "Unverified":
+        return VERDICT_TTL_NO_DATA
+    return VERDICT_TTL_DEFAULT
+
+
+def expiry_timestamp(created_at: str, ttl: int) -> Optional[str]:
+    """ISO expiry stored alongside the claim row; None for uncacheable verdicts."""
+    if ttl <= 0:
+        return None
+    return (datetime.fromisoformat(created_at) + timedelta(seconds=ttl)).isoformat()
+
+
+class VerdictCache:
+    """
+    Two-tier verdict cache keyed by the normalized claim hash.
+
+    Tier 1 is an in-process LRU with per-entry expiry. Tier 2 is the `claims`
+    table itself (indexed on `hash`), so verdicts survive restarts and are
+    shared between workers. Stored hits are promoted into the LRU.
+    """
+
+    def __init__(self, max_entries: int = VERDICT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, payload = entry
+            if expires <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def _get_stored(self, key: str) -> Optional[tuple]:
+        now = datetime.utcnow().isoformat()
+        try:
+            with db_connection() as conn:
+                row = conn.execute(
+                    '''SELECT id, verdict, explanation, credibility_score, hash, created_at, expires_at
+                       FROM claims WHERE hash = ? AND expires_at > ? ORDER BY id DESC LIMIT 1''',
+                    (key, now)).fetchone()
+                sources = load_sources(conn, [row["id"]]).get(row["id"], []) if row is not None else []
+        except Exception as e:
+            logger.error(f"Verdict cache lookup failed: {e}")
+            return None
+        if row is None:
+            return None
+        payload = {
+            "verdict": row["verdict"], "explanation": row["explanation"],
+            "sources": sources,
+            "credibility_score": row["credibility_score"], "hash": row["hash"], "created_at": row["created_at"],
+        }
+        ttl = (datetime.fromisoformat(row["expires_at"]) - datetime.utcnow()).total_seconds()
+        return payload, ttl
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        payload = self._get_memory(key)
+        if payload is not None:
+            with self._lock: self.memory_hits += 1
+            return payload
+        stored = self._get_stored(key)
+        if stored is not None:
+            payload, ttl = stored
+            self.put(key, payload, ttl)
+            with self._lock: self.db_hits += 1
+            return payload
+        with self._lock: self.misses += 1
+        return None
+
+    def put(self, key: str, payload: Dict[str, Any], ttl: float):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.memory_hits + self.db_hits) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+
+verdict_cache = VerdictCache()
+
+callback_metric("verdict_cache_lookups", "Verdict cache lookups by result.", ["result"],
+                lambda: [(("memory_hit",), verdict_cache.memory_hits), (("db_hit",), verdict_cache.db_hits),
+                         (("miss",), verdict_cache.misses)], kind="counter")
+callback_metric("verdict_cache_entries", "Verdicts held in memory.", [], lambda: [((), len(verdict_cache._entries))])
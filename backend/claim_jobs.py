@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from cache import verdict_cache
+from verification import analyze_claim, cache_verdict, claim_key, save_verifications
+
+# --- Configuration ---
+CLAIM_JOB_MAX_CLAIMS = int(os.getenv("CLAIM_JOB_MAX_CLAIMS", "20000"))
+CLAIM_JOB_MAX_LENGTH = int(os.getenv("CLAIM_JOB_MAX_LENGTH", "2000"))  # characters per claim
+# Workers per job; the global EVIDENCE_/LLM_CONCURRENCY caps still apply across jobs.
+CLAIM_JOB_WORKERS = int(os.getenv("CLAIM_JOB_WORKERS", "64"))
+# Verified claims are written in one transaction per this many rows.
+CLAIM_JOB_FLUSH_ROWS = int(os.getenv("CLAIM_JOB_FLUSH_ROWS", "200"))
+# Batch lookups queue for provider quota instead of being skipped as throttled.
+CLAIM_JOB_QUOTA_WAIT = float(os.getenv("CLAIM_JOB_QUOTA_WAIT", "30"))
+CLAIM_JOB_RETENTION = int(os.getenv("CLAIM_JOB_RETENTION", "50"))  # finished jobs kept in memory
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidClaimBatch(ValueError):
+    pass
+
+
+def parse_claims(items: List[Any]) -> List[str]:
+    """Accepts plain strings or {"claim_text": ...} objects (the /verify-claim body)."""
+    claims = []
+    for i, item in enumerate(items):
+        if isinstance(item, dict):
+            item = item.get("claim_text")
+        if not isinstance(item, str):
+            raise InvalidClaimBatch(f"Item {i}: expected a string or an object with 'claim_text'.")
+        claims.append(item.strip()[:CLAIM_JOB_MAX_LENGTH])
+    return claims
+
+
+def parse_jsonl(data: bytes) -> List[str]:
+    items = []
+    for lineno, line in enumerate(data.decode("utf-8", errors="replace").splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError:
+            raise InvalidClaimBatch(f"Line {lineno} is not valid JSON.")
+    return parse_claims(items)
+
+
+class ClaimJob:
+    """
+    One batch of claims. Duplicates (same normalized hash) are verified once;
+    each result line lists every input index it answers. Results are published
+    in completion order, after their rows are committed.
+    """
+
+    def __init__(self, claims: List[str]):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.created_at = datetime.utcnow().isoformat()
+        self.finished_at: Optional[str] = None
+        self.total = len(claims)
+        self.skipped = 0  # empty lines
+        self.indices: "OrderedDict[str, List[int]]" = OrderedDict()
+        self.texts: Dict[str, str] = {}
+        for i, text in enumerate(claims):
+            if not text:
+                self.skipped += 1
+                continue
+            key = claim_key(text)
+            if key not in self.indices:
+                self.indices[key] = []
+                self.texts[key] = text
+            self.indices[key].append(i)
+        self.cached = 0
+        self.failed = 0
+        self.saved = 0
+        self.results: List[Dict[str, Any]] = []
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+        self._started = 0.0
+        self._elapsed = 0.0
+
+    @property
+    def unique(self) -> int:
+        return len(self.indices)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    async def publish(self, lines: List[Dict[str, Any]]):
+        async with self.changed:
+            self.results.extend(lines)
+            self.changed.notify_all()
+
+    async def follow(self):
+        """Yields result lines as they are published, until the job finishes."""
+        position = 0
+        while True:
+            async with self.changed:
+                while position >= len(self.results) and not self.finished:
+                    await self.changed.wait()
+                lines = self.results[position:]
+                finished = self.finished
+            position += len(lines)
+            for line in lines:
+                yield line
+            if finished and position >= len(self.results):
+                return
+
+    def describe(self) -> Dict[str, Any]:
+        elapsed = self._elapsed or (time.perf_counter() - self._started if self._started else 0.0)
+        return {
+            "job_id": self.id, "status": self.status, "created_at": self.created_at, "finished_at": self.finished_at,
+            "total": self.total, "unique": self.unique, "skipped": self.skipped,
+            "completed": len(self.results), "cached": self.cached, "failed": self.failed, "saved": self.saved,
+            "elapsed": round(elapsed, 2),
+            "claims_per_second": round(len(self.results) / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+class ClaimJobManager:
+    """Runs claim jobs as background tasks on the event loop and keeps the recent ones."""
+
+    def __init__(self, workers: int = CLAIM_JOB_WORKERS, flush_rows: int = CLAIM_JOB_FLUSH_ROWS,
+                 retention: int = CLAIM_JOB_RETENTION):
+        self.workers = workers
+        self.flush_rows = flush_rows
+        self.retention = retention
+        self.jobs: "OrderedDict[str, ClaimJob]" = OrderedDict()
+
+    def submit(self, claims: List[str]) -> ClaimJob:
+        if not claims:
+            raise InvalidClaimBatch("No claims.")
+        if len(claims) > CLAIM_JOB_MAX_CLAIMS:
+            raise InvalidClaimBatch(f"At most {CLAIM_JOB_MAX_CLAIMS} claims per job.")
+        job = ClaimJob(claims)
+        self.jobs[job.id] = job
+        self._evict()
+        job.task = asyncio.ensure_future(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[ClaimJob]:
+        return self.jobs.get(job_id)
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.retention)]:
+            del self.jobs[job_id]
+
+    async def _run(self, job: ClaimJob):
+        job.status = "running"
+        job._started = time.perf_counter()
+        queue: asyncio.Queue = asyncio.Queue()
+        for key in job.indices:
+            queue.put_nowait(key)
+        pending: List[tuple] = []  # (result line, record, response, ttl) awaiting a bulk insert
+
+        async def flush():
+            batch = pending[:]
+            pending.clear()
+            if not batch:
+                return
+            try:
+                await run_in_threadpool(save_verifications, [record for _, record, _, _ in batch])
+                job.saved += len(batch)
+                for _, _, response, ttl in batch:
+                    cache_verdict(response, ttl)
+            except Exception as e:
+                logger.error(f"Claim job {job.id}: bulk insert of {len(batch)} rows failed: {e}")
+            await job.publish([line for line, _, _, _ in batch])
+
+        async def worker():
+            while True:
+                try:
+                    key = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                text = job.texts[key]
+                line = {"indices": job.indices[key], "claim_text": text}
+                try:
+                    cached = await run_in_threadpool(verdict_cache.get, key)
+                    if cached:
+                        job.cached += 1
+                        await job.publish([{**line, **cached, "cached": True}])
+                        continue
+                    response, record, ttl = await analyze_claim(text, key, with_related=False,
+                                                                quota_wait=CLAIM_JOB_QUOTA_WAIT, batched=True)
+                except Exception as e:
+                    job.failed += 1
+                    logger.warning(f"Claim job {job.id}: claim {job.indices[key][0]} failed: {e}")
+                    await job.publish([{**line, "hash": key, "error": str(e)[:200]}])
+                    continue
+                pending.append(({**line, **response.model_dump(exclude={"related"})}, record, response, ttl))
+                if len(pending) >= self.flush_rows:
+                    await flush()
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.workers, max(1, job.unique)))))
+            await flush()
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Claim job {job.id} failed: {e}")
+            job.status = "failed"
+        finally:
+            job._elapsed = time.perf_counter() - job._started
+            job.finished_at = datetime.utcnow().isoformat()
+            await job.publish([])
+            logger.info(f"Claim job {job.id}: {job.status}, {len(job.results)}/{job.unique} unique claims "
+                        f"in {job._elapsed:.1f}s ({job.cached} cached, {job.failed} failed)")
+
+    async def close(self):
+        running = [job.task for job in self.jobs.values() if job.task and not job.task.done()]
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+claim_jobs = ClaimJobManager()
@@ -0,0 +1,107 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+# --- Configuration ---
+# Load every registered component in the background as soon as the app starts,
+# instead of on first use. Readiness then also waits for the optional ones.
+WARMUP_ON_BOOT = os.getenv("WARMUP_ON_BOOT", "0") == "1"
+
+logger = logging.getLogger(__name__)
+
+COLD, LOADING, READY, FAILED = "cold", "loading", "ready", "failed"
+
+
+class Component:
+    """
+    A heavy subsystem (model, database schema, ...) loaded at most once per
+    process: lazily by the first `get()`, or ahead of time by `warm()`.
+    Concurrent callers wait for the single in-progress load. A failed load is
+    remembered and `get()` returns None, so callers degrade instead of retrying
+    an expensive import on every request.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any], required: bool = False,
+                 closer: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.closer = closer
+        self.state = COLD
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._value: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        """True once a load has finished, successfully or not; get() will not block."""
+        return self.state in (READY, FAILED)
+
+    def get(self) -> Any:
+        if self.loaded:
+            return self._value
+        with self._lock:
+            if self.loaded:
+                return self._value
+            self.state = LOADING
+            start = time.perf_counter()
+            try:
+                self._value = self.loader()
+                self.state = READY
+                logger.info(f"Component '{self.name}' ready in {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                self.state, self.error = FAILED, str(e)
+                logger.warning(f"Component '{self.name}' failed to load: {e}")
+            self.load_seconds = round(time.perf_counter() - start, 3)
+        return self._value
+
+    def warm(self) -> threading.Thread:
+        thread = threading.Thread(target=self.get, name=f"warmup-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        with self._lock:
+            if self.state == READY and self.closer and self._value is not None:
+                self.closer(self._value)
+
+    def describe(self) -> Dict[str, Any]:
+        info = {"state": self.state, "required": self.required, "load_seconds": self.load_seconds}
+        if self.error:
+            info["error"] = self.error
+        return info
+
+
+class ComponentRegistry:
+    def __init__(self):
+        self._components: Dict[str, Component] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], required: bool = False,
+                 closer: Optional[Callable[[Any], None]] = None) -> Component:
+        component = Component(name, loader, required, closer)
+        self._components[name] = component
+        return component
+
+    def __getitem__(self, name: str) -> Component:
+        return self._components[name]
+
+    def warm_all(self, wait: bool = False):
+        threads = [c.warm() for c in self._components.values() if c.state == COLD]
+        if wait:
+            for thread in threads: thread.join()
+
+    def close_all(self):
+        for component in self._components.values():
+            component.close()
+
+    def ready(self) -> bool:
+        return all(c.state == READY for c in self._components.values() if c.required)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: c.describe() for name, c in self._components.items()}
+
+
+registry = ComponentRegistry()
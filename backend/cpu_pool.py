@@ -0,0 +1,125 @@
+import os
+import time
+import asyncio
+import logging
+import importlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from metrics import callback_metric
+
+# --- Configuration ---
+# Worker processes for CPU-bound image layers (decode, EXIF, pixel forensics,
+# hashing). 0 runs them on the thread pool instead, where they compete with
+# the event loop for the GIL.
+FORENSICS_WORKERS = int(os.getenv("FORENSICS_WORKERS", str(min(4, os.cpu_count() or 1))))
+# "spawn" starts clean interpreters; forking a process that already runs
+# inference threads and an event loop can copy held locks.
+FORENSICS_START_METHOD = os.getenv("FORENSICS_START_METHOD", "spawn")
+# Workers run at lower priority, so request handling wins when cores are scarce.
+FORENSICS_WORKER_NICE = int(os.getenv("FORENSICS_WORKER_NICE", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker(nice: int):
+    if nice:
+        try: os.nice(nice)
+        except OSError: pass
+    # Import the layer code once per worker rather than on its first job
+    for module in ("forensics", "image_index"):
+        importlib.import_module(module)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class CPUPool:
+    """
+    Process pool for the CPU-bound stages of a scan, awaited from the event
+    loop. Jobs take picklable inputs (an upload's path or bytes, never a PIL
+    image). A worker that dies (OOM kill, segfault in a decoder) breaks the
+    executor: the job fails, and the next one starts a fresh pool.
+    """
+
+    def __init__(self, workers: int = FORENSICS_WORKERS, start_method: str = FORENSICS_START_METHOD,
+                 nice: int = FORENSICS_WORKER_NICE):
+        self.workers = workers
+        self.start_method = start_method
+        self.nice = nice
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(self.start_method),
+                                                     initializer=_init_worker, initargs=(self.nice,))
+            return self._executor
+
+    def start(self) -> "CPUPool":
+        """Starts the worker processes ahead of the first scan (component loader)."""
+        if self.workers > 0:
+            start = time.perf_counter()
+            executor = self._get_executor()
+            pids = {future.result() for future in [executor.submit(_ping) for _ in range(self.workers * 2)]}
+            logger.info(f"CPU pool: {len(pids)} worker process(es) up in {time.perf_counter() - start:.2f}s")
+        return self
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.restarts += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """fn(*args) in a worker process (or a thread when the pool is disabled)."""
+        self.in_flight += 1
+        try:
+            if self.workers <= 0:
+                result = await asyncio.to_thread(fn, *args)
+            else:
+                executor = self._get_executor()
+                try:
+                    result = await asyncio.get_running_loop().run_in_executor(executor, partial(fn, *args))
+                except BrokenProcessPool:
+                    logger.error(f"CPU pool worker died during {getattr(fn, '__name__', fn)}; restarting the pool")
+                    self._discard(executor)
+                    raise
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        self.completed += 1
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "start_method": self.start_method, "in_flight": self.in_flight,
+                "completed": self.completed, "failed": self.failed, "restarts": self.restarts}
+
+
+cpu_pool = CPUPool()
+
+callback_metric("cpu_pool_jobs_in_flight", "Image layer jobs queued or running in the CPU pool.", [],
+                lambda: [((), cpu_pool.in_flight)])
+callback_metric("cpu_pool_jobs_failed", "Image layer jobs that raised (including cancelled and lost to a dead worker).", [],
+                lambda: [((), cpu_pool.failed)], kind="counter")
+callback_metric("cpu_pool_restarts", "CPU pool restarts after a worker process died.", [],
+                lambda: [((), cpu_pool.restarts)], kind="counter")
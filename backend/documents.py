@@ -0,0 +1,1104 @@
+import io
+import os
+import re
+import time
+import zlib
+import bisect
+import logging
+import zipfile
+from array import array
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from xml.etree import ElementTree
+
+from PIL import Image
+
+# --- Configuration ---
+DOC_MAX_BYTES = int(os.getenv("DOC_MAX_BYTES", str(1024 * 1024 * 1024)))
+DOC_CHUNK_BYTES = int(os.getenv("DOC_CHUNK_BYTES", str(4 * 1024 * 1024)))
+# Pages whose resources (images, fonts) are inspected; structure, revisions and
+# metadata always cover the whole file.
+DOC_MAX_PAGES = int(os.getenv("DOC_MAX_PAGES", "5000"))
+DOC_MAX_IMAGES = int(os.getenv("DOC_MAX_IMAGES", "24"))              # embedded images run through the image layers
+DOC_MAX_IMAGES_PER_PAGE = int(os.getenv("DOC_MAX_IMAGES_PER_PAGE", "2"))
+DOC_MAX_RESOURCES_PER_PAGE = int(os.getenv("DOC_MAX_RESOURCES_PER_PAGE", "64"))  # XObjects/fonts looked at per page
+DOC_MIN_IMAGE_SIDE = int(os.getenv("DOC_MIN_IMAGE_SIDE", "64"))       # icons and masks are not worth a scan
+DOC_MAX_IMAGE_BYTES = int(os.getenv("DOC_MAX_IMAGE_BYTES", str(40 * 1024 * 1024)))
+DOC_MAX_INFLATE_BYTES = int(os.getenv("DOC_MAX_INFLATE_BYTES", str(16 * 1024 * 1024)))  # per decompressed stream
+DOC_MAX_OBJECT_STREAMS = int(os.getenv("DOC_MAX_OBJECT_STREAMS", "4000"))
+DOC_MAX_OBJECT_BYTES = 256 * 1024   # largest object dictionary read
+DOC_PROGRESS_SECONDS = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+class UnsupportedDocument(ValueError):
+    """The upload is neither a PDF nor a DOCX (or is too damaged to read)."""
+
+
+class EmbeddedImage:
+    """An image inside a document, opened on demand for the image layers."""
+
+    def __init__(self, name: str, page: Optional[int], width: int, height: int, encoding: str,
+                 open: Callable[[], BinaryIO]):
+        self.name = name
+        self.page = page
+        self.width = width
+        self.height = height
+        self.encoding = encoding
+        self.open = open
+
+    def describe(self) -> Dict[str, Any]:
+        return {"name": self.name, "page": self.page, "width": self.width, "height": self.height,
+                "encoding": self.encoding}
+
+
+class _Slice(io.RawIOBase):
+    """Read-only window [offset, offset + length) of a file, for streaming one embedded object."""
+
+    def __init__(self, f: BinaryIO, offset: int, length: int):
+        self._f = f
+        self._f.seek(offset)
+        self._left = length
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._f.read(min(len(buffer), self._left))
+        self._left -= len(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self._f.close()
+        super().close()
+
+
+def inflate(f: BinaryIO, offset: int, length: int, cap: int) -> bytes:
+    """zlib-inflates `length` bytes at `offset` a chunk at a time, producing at most `cap` bytes."""
+    decompressor, out = zlib.decompressobj(), bytearray()
+    f.seek(offset)
+    while length > 0 and len(out) < cap and not decompressor.eof:
+        chunk = f.read(min(length, 1024 * 1024))
+        if not chunk:
+            break
+        length -= len(chunk)
+        out += decompressor.decompress(chunk, cap - len(out))
+    return bytes(out)
+
+
+def detect_format(open_raw: Callable[[], BinaryIO]) -> str:
+    """"pdf" or "docx" from the first bytes (and zip directory); raises UnsupportedDocument."""
+    with open_raw() as raw:
+        head = raw.read(1024)
+    if b"%PDF-" in head:
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with open_raw() as raw, zipfile.ZipFile(raw) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return "docx"
+        except zipfile.BadZipFile:
+            pass
+    raise UnsupportedDocument("Unsupported document type; upload a PDF or DOCX file.")
+
+
+def analyze_document(open_raw: Callable[[], BinaryIO], size: int) -> Iterator[Union[Dict[str, Any], EmbeddedImage]]:
+    """
+    Streams the document once and yields, in order: progress events, one
+    event per revision, the embedded images worth scanning (EmbeddedImage)
+    and a final {"type": "document"} report. Blocking; run it in a thread.
+    """
+    if detect_format(open_raw) == "pdf":
+        yield from PDFScanner(open_raw, size).run()
+    else:
+        yield from DocxScanner(open_raw, size).run()
+
+
+# --- Dates ---
+
+_PDF_DATE = re.compile(r"(?:D:)?(\d{4})(\d{2})?(\d{2})?(\d{2})?(\d{2})?(\d{2})?\s*(?:([+\-Z])\s*(\d{2})?'?(\d{2})?'?)?")
+
+
+def parse_pdf_date(value: Any) -> Optional[datetime]:
+    """PDF date string (D:YYYYMMDDHHmmSSOHH'mm') as an aware datetime; None if unreadable."""
+    if not isinstance(value, str):
+        return None
+    m = _PDF_DATE.match(value.strip())
+    if not m:
+        return None
+    year, month, day, hour, minute, second, sign, tz_h, tz_m = m.groups()
+    try:
+        offset = timedelta(hours=int(tz_h or 0), minutes=int(tz_m or 0))
+        tz = timezone(-offset if sign == "-" else offset) if sign and sign != "Z" else timezone.utc
+        return datetime(int(year), int(month or 1), int(day or 1), int(hour or 0), int(minute or 0), int(second or 0),
+                        tzinfo=tz)
+    except ValueError:
+        return None
+
+
+def parse_iso_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def timeline_findings(created: Optional[datetime], modified: Optional[datetime]) -> List[Tuple[str, int]]:
+    findings = []
+    if created and modified and modified < created - timedelta(minutes=1):
+        findings.append((f"Timeline paradox: modified ({modified:%Y-%m-%d %H:%M}) before created ({created:%Y-%m-%d %H:%M})", 20))
+    now = datetime.now(timezone.utc) + timedelta(days=1)
+    for label, value in (("Creation", created), ("Modification", modified)):
+        if value and value > now:
+            findings.append((f"{label} date is in the future ({value:%Y-%m-%d})", 15))
+    return findings
+
+
+# --- PDF objects ---
+
+class Name(str):
+    """A PDF name (/Type -> Name("Type"))."""
+
+
+class Ref:
+    __slots__ = ("num", "gen")
+
+    def __init__(self, num: int, gen: int):
+        self.num = num
+        self.gen = gen
+
+    def __repr__(self):
+        return f"{self.num} {self.gen} R"
+
+
+class PDFSyntaxError(ValueError):
+    pass
+
+
+_WHITESPACE = frozenset(b" \t\r\n\f\x00")
+_DELIMITERS = frozenset(b"()<>[]{}/%") | _WHITESPACE
+_NUMBER = re.compile(rb"[+-]?(?:\d+\.?\d*|\.\d+)")
+_REF_TAIL = re.compile(rb"\s+(\d+)\s+R(?![^\s()<>\[\]{}/%])")
+_TOKEN = re.compile(rb"[^\s()<>\[\]{}/%]+")
+_NAME_ESCAPE = re.compile(rb"#([0-9A-Fa-f]{2})")
+_STRING_ESCAPES = {ord("n"): b"\n", ord("r"): b"\r", ord("t"): b"\t", ord("b"): b"\b", ord("f"): b"\f",
+                   ord("("): b"(", ord(")"): b")", ord("\\"): b"\\"}
+
+
+def decode_text(raw: bytes) -> str:
+    """PDF text string: UTF-16 with a BOM, UTF-8 with a BOM, else PDFDocEncoding (~Latin-1)."""
+    if raw.startswith(b"\xfe\xff"):
+        return raw[2:].decode("utf-16-be", errors="replace")
+    if raw.startswith(b"\xff\xfe"):
+        return raw[2:].decode("utf-16-le", errors="replace")
+    if raw.startswith(b"\xef\xbb\xbf"):
+        return raw[3:].decode("utf-8", errors="replace")
+    return raw.decode("latin-1")
+
+
+def _skip(data: bytes, pos: int) -> int:
+    n = len(data)
+    while pos < n:
+        c = data[pos]
+        if c in _WHITESPACE:
+            pos += 1
+        elif c == 0x25:  # % comment to end of line
+            while pos < n and data[pos] not in (0x0A, 0x0D):
+                pos += 1
+        else:
+            break
+    return pos
+
+
+def _literal_string(data: bytes, pos: int) -> Tuple[str, int]:
+    out, depth, n = bytearray(), 1, len(data)
+    pos += 1
+    while pos < n:
+        c = data[pos]
+        if c == 0x5C and pos + 1 < n:  # backslash
+            nxt = data[pos + 1]
+            if nxt in _STRING_ESCAPES:
+                out += _STRING_ESCAPES[nxt]
+                pos += 2
+            elif 0x30 <= nxt <= 0x37:
+                digits = re.match(rb"[0-7]{1,3}", data[pos + 1:pos + 4]).group(0)
+                out.append(int(digits, 8) & 0xFF)
+                pos += 1 + len(digits)
+            elif nxt in (0x0A, 0x0D):  # line continuation
+                pos += 3 if data[pos + 1:pos + 3] == b"\r\n" else 2
+            else:
+                out.append(nxt)
+                pos += 2
+            continue
+        if c == 0x28:
+            depth += 1
+        elif c == 0x29:
+            depth -= 1
+            if depth == 0:
+                return decode_text(bytes(out)), pos + 1
+        out.append(c)
+        pos += 1
+    raise PDFSyntaxError("unterminated string")
+
+
+def parse_value(data: bytes, pos: int, depth: int = 0) -> Tuple[Any, int]:
+    """One PDF object from `data` at `pos` -> (value, end). Dicts and arrays become dict and list."""
+    if depth > 64:
+        raise PDFSyntaxError("nesting too deep")
+    pos = _skip(data, pos)
+    if pos >= len(data):
+        raise PDFSyntaxError("unexpected end of data")
+    c = data[pos]
+    if c == 0x3C:  # <
+        if data[pos + 1:pos + 2] == b"<":
+            result, pos = {}, pos + 2
+            while True:
+                pos = _skip(data, pos)
+                if data[pos:pos + 2] == b">>":
+                    return result, pos + 2
+                key, pos = parse_value(data, pos, depth + 1)
+                if not isinstance(key, Name):
+                    raise PDFSyntaxError(f"dictionary key {key!r} is not a name")
+                result[key], pos = parse_value(data, pos, depth + 1)
+        end = data.find(b">", pos)
+        if end < 0:
+            raise PDFSyntaxError("unterminated hex string")
+        hexdigits = re.sub(rb"\s", b"", data[pos + 1:end])
+        return decode_text(bytes.fromhex((hexdigits + b"0" * (len(hexdigits) % 2)).decode("ascii", "replace"))), end + 1
+    if c == 0x28:  # (
+        return _literal_string(data, pos)
+    if c == 0x5B:  # [
+        result, pos = [], pos + 1
+        while True:
+            pos = _skip(data, pos)
+            if data[pos:pos + 1] == b"]":
+                return result, pos + 1
+            item, pos = parse_value(data, pos, depth + 1)
+            result.append(item)
+    if c == 0x2F:  # /
+        end = pos + 1
+        while end < len(data) and data[end] not in _DELIMITERS:
+            end += 1
+        raw = _NAME_ESCAPE.sub(lambda m: bytes([int(m.group(1), 16)]), data[pos + 1:end])
+        return Name(raw.decode("latin-1")), end
+    m = _NUMBER.match(data, pos)
+    if m:
+        token = m.group(0)
+        if b"." not in token:
+            ref = _REF_TAIL.match(data, m.end())
+            if ref:
+                return Ref(int(token), int(ref.group(1))), ref.end()
+            return int(token), m.end()
+        return float(token), m.end()
+    m = _TOKEN.match(data, pos)
+    if m:
+        word = m.group(0)
+        return {b"true": True, b"false": False, b"null": None}.get(word, word.decode("latin-1")), m.end()
+    raise PDFSyntaxError(f"unexpected byte {data[pos:pos + 1]!r}")
+
+
+# --- PDF scanner ---
+
+# One pass over the raw bytes finds object headers, revision boundaries,
+# trailers, the object types we need later and active-content keywords.
+# Stream bodies with a direct /Length are jumped over rather than scanned.
+_SCAN = re.compile(
+    rb"(?P<obj>(?<![0-9])\d{1,10}[ \t\r\n\f\x00]+\d{1,5}[ \t\r\n\f\x00]+obj(?![A-Za-z]))"
+    rb"|/Length[ \t\r\n\f\x00]+(?P<length>\d{1,12})(?![0-9]|[ \t\r\n\f\x00]+\d+[ \t\r\n\f\x00]+R)"
+    rb"|(?<![A-Za-z])(?P<stream>stream)(?:\r\n|\n|\r)"
+    rb"|(?P<eof>%%EOF)"
+    rb"|(?P<trailer>trailer(?![A-Za-z]))"
+    rb"|/Type\s*/(?P<type>Page|ObjStm|XRef)(?![A-Za-z0-9])"
+    rb"|/(?P<kw>JavaScript|JS|Launch|EmbeddedFile|RichMedia|XFA|OpenAction|AA|AcroForm|Encrypt|SubmitForm|ImportData|Linearized)(?![A-Za-z0-9])"
+    rb"|(?P<hexname>/[A-Za-z0-9]*#[0-9A-Fa-f]{2}[A-Za-z0-9#]*)"
+)
+_SCAN_OVERLAP = 256
+_OBJ_HEADER = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj")
+
+ACTIVE_CONTENT = {
+    "JavaScript": ("Contains JavaScript", 25), "JS": ("Contains JavaScript", 25),
+    "Launch": ("Launch action (can start external programs)", 30),
+    "EmbeddedFile": ("Embedded file attachments", 10),
+    "RichMedia": ("Embedded rich media (Flash/video)", 10),
+    "XFA": ("XFA form (dynamic, scriptable content)", 10),
+    "SubmitForm": ("Form submits data to a remote address", 10),
+    "ImportData": ("Imports external data", 10),
+}
+
+_XMP_FIELDS = {
+    "xmp:CreatorTool": "creator_tool", "pdf:Producer": "producer", "xmp:CreateDate": "created",
+    "xmp:ModifyDate": "modified", "xmp:MetadataDate": "metadata_date", "xmpMM:DocumentID": "document_id",
+    "xmpMM:InstanceID": "instance_id",
+}
+_XMP_VALUE = re.compile(rb"(xmp:CreatorTool|pdf:Producer|xmp:CreateDate|xmp:ModifyDate|xmp:MetadataDate|"
+                        rb"xmpMM:DocumentID|xmpMM:InstanceID)\s*(?:=\s*[\"']([^\"']*)[\"']|>\s*([^<]*?)\s*<)")
+_XMP_AGENT = re.compile(rb"stEvt:softwareAgent\s*(?:=\s*[\"']([^\"']*)[\"']|>\s*([^<]*?)\s*<)")
+_SUBSET_TAG = re.compile(r"^([A-Z]{6})\+(.+)$")
+
+INFO_FIELDS = ("Title", "Author", "Subject", "Keywords", "Creator", "Producer", "CreationDate", "ModDate")
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    text = str(value).replace("\x00", "").strip()
+    return text[:300] or None
+
+
+class PDFScanner:
+    """
+    Streaming PDF reader: one sequential pass over the file indexes object
+    offsets (in compact arrays), %%EOF revision boundaries, trailers and
+    active-content keywords; afterwards only the objects that matter
+    (trailers, Info, catalog, XMP, page tree, fonts, image headers) are read
+    with seeks. Image data is never loaded here; scanners stream it later.
+    """
+
+    def __init__(self, open_raw: Callable[[], BinaryIO], size: int):
+        self.open_raw = open_raw
+        self.size = size
+        self.offsets = array("q")                        # object number -> latest offset, -1 if none
+        self.history: Dict[int, List[int]] = {}          # earlier offsets of redefined objects
+        self.eofs: List[int] = []
+        self.trailers: List[int] = []
+        self.xref_streams: List[Tuple[int, int]] = []     # (offset, object number)
+        self.object_streams: List[Tuple[int, int]] = []
+        self.page_objects = 0
+        self.keywords: Counter = Counter()
+        self.obfuscated_names: Counter = Counter()
+        self.object_count = 0
+        # Objects stored in object streams: number -> (stream number, index), and the stream's offset
+        self.compressed_in = array("i")
+        self.compressed_index = array("i")
+        self._file: Optional[BinaryIO] = None
+        self._cache: "OrderedDict[Any, Any]" = OrderedDict()
+        self._objstm_cache: "OrderedDict[int, Tuple[bytes, List[Tuple[int, int]], int]]" = OrderedDict()
+        self.unsupported_images = 0
+        self.truncated: Dict[str, Any] = {}
+        self._last_trailer: Dict[str, Any] = {}
+
+    # -- pass 1: sequential scan --
+
+    def _set_offset(self, num: int, offset: int):
+        if num >= len(self.offsets):
+            self.offsets.extend([-1] * (num + 1 - len(self.offsets)))
+        previous = self.offsets[num]
+        if previous >= 0:
+            self.history.setdefault(num, []).append(previous)
+        self.offsets[num] = offset
+
+    def _stream_end(self, f: BinaryIO, data: bytes, pos: int, target: int) -> bool:
+        """True if `endstream` follows the claimed stream length (`target` is relative to `data`)."""
+        if target + 32 <= len(data):
+            return b"endstream" in data[target:target + 32]
+        resume = f.tell()
+        f.seek(pos + target)
+        found = b"endstream" in f.read(32)
+        f.seek(resume)
+        return found
+
+    def _scan(self) -> Iterator[Dict[str, Any]]:
+        pos, carry, current_obj, length = 0, b"", -1, None
+        last_progress = time.monotonic()
+        with self.open_raw() as f:
+            while True:
+                chunk = f.read(DOC_CHUNK_BYTES)
+                data = carry + chunk
+                final = not chunk
+                limit = len(data) if final else max(0, len(data) - _SCAN_OVERLAP)
+                cut, at, skip_to = limit, 0, None
+                while True:
+                    m = _SCAN.search(data, at)
+                    if m is None or m.start() >= limit:
+                        break
+                    at = m.end()
+                    cut = max(cut, at)
+                    offset = pos + m.start()
+                    kind = m.lastgroup
+                    if kind == "obj":
+                        num_text, gen_text = m.group(0).split()[:2]
+                        current_obj = int(num_text)
+                        self._set_offset(current_obj, offset)
+                        self.object_count += 1
+                        length = None
+                    elif kind == "length":
+                        length = int(m.group("length"))
+                    elif kind == "stream":
+                        target = m.end() + length if length is not None else None
+                        length = None
+                        if target is None or not self._stream_end(f, data, pos, target):
+                            continue
+                        if target <= len(data):
+                            at = target
+                            cut = max(cut, target)
+                        else:
+                            skip_to = pos + target
+                            break
+                    elif kind == "eof":
+                        self.eofs.append(offset)
+                    elif kind == "trailer":
+                        self.trailers.append(offset)
+                    elif kind == "type":
+                        found = m.group("type")
+                        if found == b"Page":
+                            self.page_objects += 1
+                        elif found == b"ObjStm" and current_obj >= 0:
+                            self.object_streams.append((self.offsets[current_obj], current_obj))
+                        elif found == b"XRef" and current_obj >= 0:
+                            self.xref_streams.append((self.offsets[current_obj], current_obj))
+                    elif kind == "kw":
+                        self.keywords[m.group("kw").decode()] += 1
+                    else:
+                        self._hex_name(m.group("hexname"))
+                if skip_to is not None:
+                    # The stream runs past this chunk: seek over the rest of it
+                    f.seek(skip_to)
+                    pos, carry = skip_to, b""
+                else:
+                    if final:
+                        break
+                    pos += cut
+                    carry = data[cut:]
+                if time.monotonic() - last_progress >= DOC_PROGRESS_SECONDS:
+                    last_progress = time.monotonic()
+                    yield {"type": "progress", "stage": "structure", "bytes": pos, "total": self.size}
+
+    def _hex_name(self, raw: bytes):
+        """Names spelled with #xx escapes (/J#61vaScript) are a classic way to hide active content."""
+        name = _NAME_ESCAPE.sub(lambda m: bytes([int(m.group(1), 16)]), raw[1:]).decode("latin-1")
+        if name in ACTIVE_CONTENT or name in ("OpenAction", "AA", "Type", "Page", "ObjStm"):
+            self.obfuscated_names[name] += 1
+            if name in ACTIVE_CONTENT:
+                self.keywords[name] += 1
+
+    def _index_object_streams(self):
+        """Maps objects stored inside object streams, and scans their (inflated) text for keywords."""
+        streams = self.object_streams
+        if len(streams) > DOC_MAX_OBJECT_STREAMS:
+            self.truncated["object_streams"] = len(streams)
+            streams = streams[-DOC_MAX_OBJECT_STREAMS:]
+        for stream_offset, stream_num in streams:
+            try:
+                data, entries, first = self._object_stream(stream_num)
+            except Exception as e:
+                logger.warning(f"Object stream {stream_num} unreadable: {e}")
+                continue
+            for index, (num, _) in enumerate(entries):
+                if num >= len(self.compressed_in):
+                    grow = num + 1 - len(self.compressed_in)
+                    self.compressed_in.extend([-1] * grow)
+                    self.compressed_index.extend([-1] * grow)
+                latest = self.offsets[num] if num < len(self.offsets) else -1
+                if latest < stream_offset:  # a later plain definition overrides the stream copy
+                    self.compressed_in[num] = stream_num
+                    self.compressed_index[num] = index
+                self.object_count += 1
+            for m in _SCAN.finditer(data, first):
+                kind = m.lastgroup
+                if kind == "type" and m.group("type") == b"Page":
+                    self.page_objects += 1
+                elif kind == "kw":
+                    self.keywords[m.group("kw").decode()] += 1
+                elif kind == "hexname":
+                    self._hex_name(m.group("hexname"))
+
+    # -- random access --
+
+    def _read_at(self, offset: int, length: int) -> bytes:
+        self._file.seek(offset)
+        return self._file.read(length)
+
+    def _offset(self, num: int, before: Optional[int] = None) -> int:
+        if num < 0 or num >= len(self.offsets):
+            return -1
+        latest = self.offsets[num]
+        if before is None or latest < before:
+            return latest
+        earlier = [o for o in self.history.get(num, ()) if o < before]
+        return max(earlier) if earlier else -1
+
+    def _object_stream(self, stream_num: int) -> Tuple[bytes, List[Tuple[int, int]], int]:
+        cached = self._objstm_cache.get(stream_num)
+        if cached is not None:
+            self._objstm_cache.move_to_end(stream_num)
+            return cached
+        header, data = self.stream(Ref(stream_num, 0))
+        count, first = int(header.get("N", 0)), int(header.get("First", 0))
+        numbers = [int(x) for x in data[:first].split()[:2 * count]]
+        entries = list(zip(numbers[0::2], numbers[1::2]))
+        self._objstm_cache[stream_num] = (data, entries, first)
+        if len(self._objstm_cache) > 8:
+            self._objstm_cache.popitem(last=False)
+        return data, entries, first
+
+    def _object_at(self, offset: int) -> Tuple[Any, Optional[int]]:
+        """(value, stream data offset or None) of the object whose header starts at `offset`."""
+        data = self._read_at(offset, DOC_MAX_OBJECT_BYTES)
+        m = _OBJ_HEADER.match(data)
+        if not m:
+            raise PDFSyntaxError(f"no object at offset {offset}")
+        value, pos = parse_value(data, m.end())
+        pos = _skip(data, pos)
+        if data.startswith(b"stream", pos):
+            pos += 6
+            if data[pos:pos + 2] == b"\r\n":
+                pos += 2
+            elif data[pos:pos + 1] in (b"\r", b"\n"):
+                pos += 1
+            return value, offset + pos
+        return value, None
+
+    def get(self, ref: Any, before: Optional[int] = None) -> Any:
+        """Resolves an indirect reference (as of file offset `before`); other values are returned as is."""
+        if not isinstance(ref, Ref):
+            return ref
+        return self._get(ref.num, before)[0]
+
+    def _get(self, num: int, before: Optional[int] = None) -> Tuple[Any, Optional[int]]:
+        key = (num, before)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        offset = self._offset(num, before)
+        result: Tuple[Any, Optional[int]] = (None, None)
+        try:
+            if offset >= 0:
+                result = self._object_at(offset)
+            elif num < len(self.compressed_in) and self.compressed_in[num] >= 0:
+                data, entries, first = self._object_stream(self.compressed_in[num])
+                result = (parse_value(data, first + entries[self.compressed_index[num]][1])[0], None)
+        except (PDFSyntaxError, IndexError, ValueError, zlib.error) as e:
+            logger.debug(f"Object {num} unreadable: {e}")
+        self._cache[key] = result
+        if len(self._cache) > 4096:
+            self._cache.popitem(last=False)
+        return result
+
+    def dict(self, ref: Any, before: Optional[int] = None) -> Dict[str, Any]:
+        value = self.get(ref, before)
+        return value if isinstance(value, dict) else {}
+
+    def _stream_length(self, header: Dict[str, Any], data_offset: int) -> int:
+        length = self.get(header.get("Length"))
+        if isinstance(length, int) and 0 <= length <= self.size - data_offset:
+            return length
+        # Missing or wrong /Length: find endstream (bounded)
+        window = self._read_at(data_offset, DOC_MAX_IMAGE_BYTES + 16)
+        end = window.find(b"endstream")
+        return end if end >= 0 else len(window)
+
+    def stream(self, ref: Ref, cap: int = DOC_MAX_INFLATE_BYTES) -> Tuple[Dict[str, Any], bytes]:
+        """(dictionary, decoded data) of a stream object; only FlateDecode (or no filter) is decoded."""
+        header, data_offset = self._get(ref.num)
+        if not isinstance(header, dict) or data_offset is None:
+            raise PDFSyntaxError(f"object {ref.num} is not a stream")
+        length = self._stream_length(header, data_offset)
+        filters = header.get("Filter")
+        filters = filters if isinstance(filters, list) else [filters] if filters else []
+        if not filters:
+            return header, self._read_at(data_offset, min(length, cap))
+        if filters != ["FlateDecode"] or header.get("DecodeParms"):
+            raise PDFSyntaxError(f"unsupported stream filter {filters}")
+        return header, inflate(self._file, data_offset, length, cap)
+
+    # -- document-level analysis --
+
+    def _trailer(self, start: int, end: int) -> Dict[str, Any]:
+        """Trailer dictionary of the revision ending at `end` (classic trailer or xref stream)."""
+        candidates = [o for o in self.trailers if start <= o < end]
+        if candidates:
+            try:
+                value, _ = parse_value(self._read_at(candidates[-1] + 7, DOC_MAX_OBJECT_BYTES), 0)
+                if isinstance(value, dict):
+                    return value
+            except PDFSyntaxError:
+                pass
+        streams = [num for offset, num in self.xref_streams if start <= offset < end]
+        if streams:
+            return self.dict(Ref(streams[-1], 0), before=end)
+        return {}
+
+    def _info(self, trailer: Dict[str, Any], before: Optional[int]) -> Dict[str, Any]:
+        info = self.dict(trailer.get("Info"), before)
+        fields = {}
+        for key in INFO_FIELDS:
+            text = _text(self.get(info.get(key), before))
+            if text:
+                fields[key] = text
+        return fields
+
+    def _revisions(self) -> List[Dict[str, Any]]:
+        revisions, start = [], 0
+        for index, eof in enumerate(self.eofs):
+            objects = bisect.bisect_left(self._sorted_offsets, eof) - bisect.bisect_left(self._sorted_offsets, start)
+            trailer = self._trailer(start, eof)
+            info = self._info(trailer, eof + 5)
+            revisions.append({"index": index, "offset": eof, "bytes": eof + 5 - start, "objects": objects,
+                              "info": info, "xref": "table" if any(start <= o < eof for o in self.trailers) else "stream"})
+            self._last_trailer = trailer
+            start = eof + 5
+        return revisions
+
+    def _xmp(self, catalog: Dict[str, Any]) -> Dict[str, Any]:
+        ref = catalog.get("Metadata")
+        if not isinstance(ref, Ref):
+            return {}
+        try:
+            _, data = self.stream(ref)
+        except Exception as e:
+            logger.debug(f"XMP unreadable: {e}")
+            return {}
+        xmp: Dict[str, Any] = {}
+        for m in _XMP_VALUE.finditer(data):
+            value = (m.group(2) if m.group(2) is not None else m.group(3) or b"").decode("utf-8", "replace").strip()
+            if value:
+                xmp.setdefault(_XMP_FIELDS[m.group(1).decode()], value[:300])
+        agents = []
+        for m in _XMP_AGENT.finditer(data):
+            agent = (m.group(1) if m.group(1) is not None else m.group(2) or b"").decode("utf-8", "replace").strip()
+            if agent and agent not in agents:
+                agents.append(agent[:200])
+        if agents:
+            xmp["history_agents"] = agents
+        return xmp
+
+    def _pages(self, catalog: Dict[str, Any]) -> Iterator[Tuple[int, Dict[str, Any], Any]]:
+        """(page number, page dict, inherited resources) in reading order, up to DOC_MAX_PAGES."""
+        stack: List[Tuple[Any, Any]] = [(catalog.get("Pages"), None)]
+        seen, number = set(), 0
+        while stack:
+            ref, inherited = stack.pop()
+            if isinstance(ref, Ref):
+                if ref.num in seen:
+                    continue
+                seen.add(ref.num)
+            node = self.dict(ref)
+            resources = node.get("Resources", inherited)
+            kids = node.get("Kids")
+            if isinstance(kids, list) and node.get("Type") != "Page":
+                stack.extend((kid, resources) for kid in reversed(kids))
+                continue
+            number += 1
+            if number > DOC_MAX_PAGES:
+                self.truncated["pages"] = DOC_MAX_PAGES
+                return
+            yield number, node, resources
+
+    def _font(self, ref: Any) -> Optional[Dict[str, Any]]:
+        font = self.dict(ref)
+        base = _text(font.get("BaseFont"))
+        if not base:
+            return None
+        descriptor = self.dict(font.get("FontDescriptor"))
+        descendants = self.get(font.get("DescendantFonts"))
+        if not descriptor and isinstance(descendants, list) and descendants:
+            descriptor = self.dict(self.dict(descendants[0]).get("FontDescriptor"))
+        embedded = any(key in descriptor for key in ("FontFile", "FontFile2", "FontFile3"))
+        subset = _SUBSET_TAG.match(base)
+        return {"name": subset.group(2) if subset else base, "subset": subset.group(1) if subset else None,
+                "type": _text(font.get("Subtype")), "embedded": embedded}
+
+    def _image(self, ref: Ref, page: int) -> Optional[EmbeddedImage]:
+        header, data_offset = self._get(ref.num)
+        if not isinstance(header, dict) or data_offset is None or header.get("ImageMask") is True:
+            return None
+        width, height = header.get("Width"), header.get("Height")
+        if not isinstance(width, int) or not isinstance(height, int) or min(width, height) < DOC_MIN_IMAGE_SIDE:
+            return None
+        filters = header.get("Filter")
+        filters = filters if isinstance(filters, list) else [filters] if filters else []
+        length = self._stream_length(header, data_offset)
+        name = f"page{page}-obj{ref.num}"
+        if filters in (["DCTDecode"], ["JPXDecode"]) and length <= DOC_MAX_IMAGE_BYTES:
+            encoding = "jpeg" if filters == ["DCTDecode"] else "jpeg2000"
+            return EmbeddedImage(f"{name}.{'jpg' if encoding == 'jpeg' else 'jp2'}", page, width, height, encoding,
+                                 lambda: _Slice(self.open_raw(), data_offset, length))
+        colorspace = self.get(header.get("ColorSpace"))
+        mode = {"DeviceRGB": "RGB", "DeviceGray": "L"}.get(colorspace if isinstance(colorspace, str) else "")
+        if (filters in ([], ["FlateDecode"]) and mode and header.get("BitsPerComponent") == 8
+                and not header.get("DecodeParms") and width * height * len(mode) <= DOC_MAX_INFLATE_BYTES):
+            expected = width * height * len(mode)
+
+            def open_raster() -> BinaryIO:
+                with self.open_raw() as f:
+                    if filters:
+                        pixels = inflate(f, data_offset, length, expected)
+                    else:
+                        f.seek(data_offset)
+                        pixels = f.read(expected)
+                png = io.BytesIO()
+                Image.frombytes(mode, (width, height), pixels.ljust(expected, b"\x00")).save(png, "PNG")
+                png.seek(0)
+                return png
+
+            return EmbeddedImage(f"{name}.png", page, width, height, "raw", open_raster)
+        self.unsupported_images += 1
+        return None
+
+    def run(self) -> Iterator[Union[Dict[str, Any], EmbeddedImage]]:
+        yield from self._scan()
+        with self.open_raw() as self._file:
+            self._index_object_streams()
+            self._sorted_offsets = sorted(o for o in self.offsets if o >= 0)
+            yield {"type": "progress", "stage": "structure", "bytes": self.size, "total": self.size}
+
+            revisions = self._revisions()
+            for revision in revisions:
+                yield {"type": "revision", **revision}
+            final_trailer = self._last_trailer
+            if not final_trailer.get("Root") and self.xref_streams:  # truncated file: newest xref stream
+                final_trailer = self.dict(Ref(self.xref_streams[-1][1], 0))
+            catalog = self.dict(final_trailer.get("Root"))
+            info = self._info(final_trailer, None)
+            xmp = self._xmp(catalog)
+            encrypted = "Encrypt" in final_trailer
+
+            fonts: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+            seen_fonts, seen_xobjects = set(), set()
+            images_found, images_queued, pages = 0, 0, 0
+            for number, page, resources in self._pages(catalog):
+                pages = number
+                resources = self.dict(resources)
+                xobjects = self.dict(resources.get("XObject"))
+                queued_here = 0
+                # Images directly on the page, then one level into form XObjects
+                candidates = list(xobjects.values())[:DOC_MAX_RESOURCES_PER_PAGE]
+                for ref in candidates:
+                    if not isinstance(ref, Ref) or ref.num in seen_xobjects:
+                        continue
+                    seen_xobjects.add(ref.num)
+                    header = self.dict(ref)
+                    if header.get("Subtype") == "Form":
+                        nested = self.dict(self.dict(header.get("Resources")).get("XObject"))
+                        candidates.extend(list(nested.values())[:DOC_MAX_RESOURCES_PER_PAGE - len(candidates)])
+                        continue
+                    if header.get("Subtype") != "Image":
+                        continue
+                    images_found += 1
+                    if queued_here >= DOC_MAX_IMAGES_PER_PAGE or images_queued >= DOC_MAX_IMAGES:
+                        continue
+                    image = self._image(ref, number)
+                    if image is not None:
+                        queued_here += 1
+                        images_queued += 1
+                        yield image
+                for ref in list(self.dict(resources.get("Font")).values())[:DOC_MAX_RESOURCES_PER_PAGE]:
+                    if not isinstance(ref, Ref) or ref.num in seen_fonts:
+                        continue
+                    seen_fonts.add(ref.num)
+                    font = self._font(ref)
+                    if font:
+                        fonts.setdefault((font["name"], font["subset"]), font)
+                if number % 200 == 0:
+                    yield {"type": "progress", "stage": "pages", "pages": number}
+
+            page_count = self.get(self.dict(catalog.get("Pages")).get("Count"))
+            if images_found > images_queued:
+                self.truncated["images"] = images_found - images_queued
+            yield {"type": "document", **self._report(revisions, info, xmp, list(fonts.values()), encrypted,
+                                                       page_count if isinstance(page_count, int) else self.page_objects,
+                                                       pages, images_found)}
+
+    def _report(self, revisions, info, xmp, fonts, encrypted, page_count, pages_inspected, images_found) -> Dict[str, Any]:
+        findings: List[Tuple[str, int]] = []
+        if not self.object_count:
+            findings.append(("No readable PDF objects (damaged or not a real PDF)", 30))
+        elif not self.eofs:
+            findings.append(("File is truncated (no %%EOF marker)", 10))
+        linearized = self.keywords.get("Linearized", 0) > 0
+        updates = max(0, len(revisions) - 1 - (1 if linearized else 0))
+        if updates:
+            findings.append((f"Edited after creation: {updates} incremental update(s)", min(30, 10 * updates)))
+
+        # Tool chain: every distinct creator/producer, oldest revision first
+        tools: List[str] = []
+        for revision in revisions:
+            for key in ("Creator", "Producer"):
+                value = revision["info"].get(key)
+                if value and value not in tools:
+                    tools.append(value)
+        for value in [info.get("Creator"), info.get("Producer"), xmp.get("creator_tool"), xmp.get("producer"),
+                      *xmp.get("history_agents", [])]:
+            if value and value not in tools:
+                tools.append(value)
+        if info.get("Producer") and xmp.get("producer") and info["Producer"] != xmp["producer"]:
+            findings.append((f"Info/XMP producer mismatch: \"{info['Producer']}\" vs \"{xmp['producer']}\"", 10))
+
+        changed = sorted({key for revision in revisions[1:] for key in ("Author", "Creator", "Producer", "Title")
+                          if revisions[0]["info"].get(key) != revision["info"].get(key) and revision["info"].get(key)})
+        if changed:
+            findings.append((f"Metadata rewritten in a later revision: {', '.join(changed)}", 10))
+
+        created = parse_pdf_date(info.get("CreationDate")) or parse_iso_date(xmp.get("created"))
+        modified = parse_pdf_date(info.get("ModDate")) or parse_iso_date(xmp.get("modified"))
+        findings.extend(timeline_findings(created, modified))
+
+        for keyword, (text, penalty) in ACTIVE_CONTENT.items():
+            if self.keywords.get(keyword) and (text, penalty) not in findings:
+                findings.append((text, penalty))
+        if self.keywords.get("OpenAction") and any(self.keywords.get(k) for k in ("JavaScript", "JS", "Launch")):
+            findings.append(("Action runs automatically when the file is opened", 10))
+        if self.obfuscated_names:
+            findings.append((f"Obfuscated PDF names: {', '.join(sorted(self.obfuscated_names))}", 20))
+
+        groups = Counter(font["name"] for font in fonts if font["subset"])
+        split = sorted(name for name, count in groups.items() if count > 1)
+        if split:
+            findings.append((f"Same font embedded as separate subsets ({', '.join(split[:5])}): pages from different sources", 10))
+        not_embedded = sorted({font["name"] for font in fonts if not font["embedded"]})
+
+        return {
+            "format": "pdf",
+            "pages": page_count,
+            "pages_inspected": pages_inspected,
+            "objects": self.object_count,
+            "revisions": revisions,
+            "incremental_updates": updates,
+            "linearized": linearized,
+            "encrypted": encrypted,
+            "info": info,
+            "xmp": xmp,
+            "created": _iso(created),
+            "modified": _iso(modified),
+            "tool_chain": tools,
+            "fonts": {"count": len(fonts), "embedded": sum(f["embedded"] for f in fonts),
+                      "not_embedded": not_embedded[:50], "split_subsets": split,
+                      "names": sorted({f["name"] for f in fonts})[:100]},
+            "active_content": {k: v for k, v in sorted(self.keywords.items()) if k != "Linearized"},
+            "images_found": images_found,
+            "unsupported_images": self.unsupported_images,
+            "findings": findings,
+            "truncated": self.truncated,
+        }
+
+
+# --- DOCX scanner ---
+
+_NS = {
+    "w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+    "cp": "http://schemas.openxmlformats.org/package/2006/metadata/core-properties",
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "dcterms": "http://purl.org/dc/terms/",
+    "ep": "http://schemas.openxmlformats.org/officeDocument/2006/extended-properties",
+}
+_W = "{" + _NS["w"] + "}"
+DEFAULT_TEMPLATES = ("normal.dotm", "normal.dot", "normal", "")
+
+
+class DocxScanner:
+    """
+    DOCX (zip) reader: core and app properties, editing sessions (rsids),
+    tracked changes and comment authors, fonts, macros and embedded media.
+    Parts are streamed out of the zip with iterparse, so even a document.xml
+    of hundreds of MB is parsed in constant memory.
+    """
+
+    def __init__(self, open_raw: Callable[[], BinaryIO], size: int):
+        self.open_raw = open_raw
+        self.size = size
+
+    def _properties(self, archive: zipfile.ZipFile, name: str) -> Dict[str, str]:
+        if name not in archive.namelist():
+            return {}
+        props = {}
+        with archive.open(name) as part:
+            for _, element in ElementTree.iterparse(part):
+                tag = element.tag.rsplit("}", 1)[-1]
+                if element.text and element.text.strip() and len(element) == 0:
+                    props[tag] = element.text.strip()[:300]
+        return props
+
+    def _document(self, archive: zipfile.ZipFile) -> Dict[str, Any]:
+        """Streams word/document.xml: tracked changes, authors and editing sessions."""
+        changes: Counter = Counter()
+        authors: Counter = Counter()
+        dates: List[str] = []
+        sessions = set()
+        paragraphs = 0
+        depth, body = 0, None
+        with archive.open("word/document.xml") as part:
+            for event, element in ElementTree.iterparse(part, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 2:
+                        body = element
+                    continue
+                depth -= 1
+                tag = element.tag
+                if tag in (_W + "ins", _W + "del", _W + "moveFrom", _W + "moveTo"):
+                    changes[tag[len(_W):]] += 1
+                    author = element.get(_W + "author")
+                    if author: authors[author[:100]] += 1
+                    date = element.get(_W + "date")
+                    if date and len(dates) < 10000: dates.append(date)
+                elif tag == _W + "p":
+                    paragraphs += 1
+                    rsid = element.get(_W + "rsidR")
+                    if rsid and len(sessions) < 100000: sessions.add(rsid)
+                    element.clear()
+                if depth == 2 and body is not None:
+                    body.clear()  # drop finished top-level blocks: constant memory on huge documents
+        return {"tracked_changes": dict(changes), "change_authors": dict(authors.most_common(20)),
+                "change_dates": [min(dates), max(dates)] if dates else None, "paragraphs": paragraphs,
+                "paragraph_sessions": len(sessions)}
+
+    def _settings(self, archive: zipfile.ZipFile) -> Dict[str, Any]:
+        if "word/settings.xml" not in archive.namelist():
+            return {}
+        rsids, track = 0, False
+        with archive.open("word/settings.xml") as part:
+            for _, element in ElementTree.iterparse(part):
+                if element.tag == _W + "rsid":
+                    rsids += 1
+                elif element.tag == _W + "trackRevisions":
+                    track = element.get(_W + "val", "true") not in ("false", "0")
+        return {"editing_sessions": rsids, "track_revisions": track}
+
+    def _authors(self, archive: zipfile.ZipFile, name: str) -> List[str]:
+        if name not in archive.namelist():
+            return []
+        authors = Counter()
+        with archive.open(name) as part:
+            for _, element in ElementTree.iterparse(part):
+                author = element.get(_W + "author")
+                if author: authors[author[:100]] += 1
+                element.clear()
+        return [author for author, _ in authors.most_common(20)]
+
+    def _fonts(self, archive: zipfile.ZipFile) -> Dict[str, Any]:
+        names, embedded = [], 0
+        if "word/fontTable.xml" in archive.namelist():
+            with archive.open("word/fontTable.xml") as part:
+                for _, element in ElementTree.iterparse(part):
+                    if element.tag == _W + "font" and element.get(_W + "name"):
+                        names.append(element.get(_W + "name")[:100])
+                        embedded += any(child.tag.startswith(_W + "embed") for child in element)
+        return {"count": len(names), "embedded": embedded, "names": sorted(set(names))[:100]}
+
+    def run(self) -> Iterator[Union[Dict[str, Any], EmbeddedImage]]:
+        with self.open_raw() as raw, zipfile.ZipFile(raw) as archive:
+            members = archive.infolist()
+            core = self._properties(archive, "docProps/core.xml")
+            app = self._properties(archive, "docProps/app.xml")
+            yield {"type": "progress", "stage": "properties", "bytes": 0, "total": self.size}
+            settings = self._settings(archive)
+            document = self._document(archive)
+            yield {"type": "progress", "stage": "document", "bytes": self.size, "total": self.size}
+            comment_authors = self._authors(archive, "word/comments.xml")
+            fonts = self._fonts(archive)
+
+            media = [m for m in members if m.filename.startswith("word/media/") and not m.is_dir()]
+            images_found = images_queued = 0
+            for member in media:
+                if not member.filename.lower().endswith((".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".webp")):
+                    continue
+                images_found += 1
+                if images_queued >= DOC_MAX_IMAGES or member.file_size > DOC_MAX_IMAGE_BYTES:
+                    continue
+                images_queued += 1
+                yield EmbeddedImage(member.filename, None, 0, 0, member.filename.rsplit(".", 1)[-1].lower(),
+                                    lambda name=member.filename: _ZipMember(self.open_raw, name))
+            names = [m.filename for m in members]
+
+        findings: List[Tuple[str, int]] = []
+        created, modified = parse_iso_date(core.get("created")), parse_iso_date(core.get("modified"))
+        findings.extend(timeline_findings(created, modified))
+        if any(n.lower().endswith("vbaproject.bin") for n in names):
+            findings.append(("Contains VBA macros", 25))
+        embeddings = [n for n in names if n.startswith("word/embeddings/")]
+        if embeddings:
+            findings.append((f"Embedded objects ({len(embeddings)})", 10))
+        if not app:
+            findings.append(("No application properties: generated or stripped by a tool rather than saved by an editor", 5))
+        template = (app.get("Template") or "").lower()
+        if template not in DEFAULT_TEMPLATES:
+            findings.append((f"Non-default template: {app['Template']}", 5))
+        creator, last = core.get("creator"), core.get("lastModifiedBy")
+        if creator and last and creator != last:
+            findings.append((f"Last modified by a different author ({last}) than the creator ({creator})", 5))
+        if sum(document["tracked_changes"].values()):
+            findings.append((f"{sum(document['tracked_changes'].values())} tracked change(s) left in the file", 5))
+        revision = int(core["revision"]) if (core.get("revision") or "").isdigit() else None
+        if revision and revision > 1 and app.get("TotalTime") == "0":
+            findings.append((f"{revision} saved revisions but zero editing time", 5))
+
+        tools = [tool for tool in (" ".join(filter(None, (app.get("Application"), app.get("AppVersion")))), )
+                 if tool]
+        truncated = {"images": images_found - images_queued} if images_found > images_queued else {}
+        yield {"type": "document", "format": "docx", "pages": int(app["Pages"]) if (app.get("Pages") or "").isdigit() else None,
+               "core": core, "app": app, "settings": settings, **document, "comment_authors": comment_authors,
+               "fonts": fonts, "created": _iso(created), "modified": _iso(modified), "revision": revision,
+               "tool_chain": tools, "macros": any(n.lower().endswith("vbaproject.bin") for n in names),
+               "embedded_objects": len(embeddings), "images_found": images_found, "findings": findings,
+               "truncated": truncated}
+
+
+class _ZipMember(io.RawIOBase):
+    """One zip member, opened on its own handle so several can be read concurrently."""
+
+    def __init__(self, open_raw: Callable[[], BinaryIO], name: str):
+        self._raw = open_raw()
+        self._archive = zipfile.ZipFile(self._raw)
+        self._member = self._archive.open(name)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._member.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self._member.close()
+        self._archive.close()
+        self._raw.close()
+        super().close()
+
+
+# --- Scoring ---
+
+def score_document(report: Dict[str, Any], images: List[Dict[str, Any]]) -> Tuple[int, List[str]]:
+    """Integrity score 0-100 and risk flags from the structural findings plus the embedded image scans."""
+    findings = list(report.get("findings", []))
+    for image in images:
+        if image.get("score", 100) < 40:
+            findings.append((f"Embedded image {image['name']} flagged: {image.get('verdict')}", 15))
+    penalty = sum(p for _, p in findings)
+    return max(0, 100 - penalty), [text for text, _ in findings]
+
+
+def display_metadata(report: Dict[str, Any]) -> Dict[str, Any]:
+    """Flat key/value view of the report for the metadata table."""
+    if report["format"] == "pdf":
+        info, xmp = report["info"], report["xmp"]
+        fields = {
+            "Format": "PDF", "Pages": report["pages"], "Title": info.get("Title"), "Author": info.get("Author"),
+            "Creator": info.get("Creator") or xmp.get("creator_tool"), "Producer": info.get("Producer") or xmp.get("producer"),
+            "Created": report["created"], "Modified": report["modified"],
+            "Revisions": len(report["revisions"]), "Incremental updates": report["incremental_updates"],
+            "Fonts": f"{report['fonts']['count']} ({report['fonts']['embedded']} embedded)",
+            "Embedded images": report["images_found"], "Encrypted": report["encrypted"] or None,
+        }
+    else:
+        core, app = report["core"], report["app"]
+        fields = {
+            "Format": "DOCX", "Pages": report["pages"], "Title": core.get("title"), "Author": core.get("creator"),
+            "Last modified by": core.get("lastModifiedBy"), "Application": " ".join(filter(None, (app.get("Application"), app.get("AppVersion")))) or None,
+            "Template": app.get("Template"), "Created": report["created"], "Modified": report["modified"],
+            "Revision": report["revision"], "Editing time (min)": app.get("TotalTime"),
+            "Editing sessions": report["settings"].get("editing_sessions"),
+            "Tracked changes": sum(report["tracked_changes"].values()) or None,
+            "Fonts": report["fonts"]["count"], "Embedded images": report["images_found"],
+        }
+    return {key: value for key, value in fields.items() if value not in (None, "")}
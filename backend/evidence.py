@@ -0,0 +1,469 @@
+import os
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+from dotenv import load_dotenv
+
+from metrics import callback_metric, histogram, record_stage
+
+# --- Configuration ---
+load_dotenv()
+
+GOOGLE_FACT_CHECK_KEY = os.getenv("GOOGLE_FACT_CHECK_KEY", "")
+SERPER_API_KEY = os.getenv("SERPER_API_KEY", "")
+CLAIMBUSTER_API_KEY = os.getenv("CLAIMBUSTER_API_KEY", "")
+
+# Base URLs are overridable so the lookups can be pointed at local stub servers.
+GOOGLE_FACT_CHECK_URL = os.getenv("GOOGLE_FACT_CHECK_URL", "https://factchecktools.googleapis.com/v1alpha1/claims:search")
+SERPER_URL = os.getenv("SERPER_URL", "https://google.serper.dev/search")
+CLAIMBUSTER_URL = os.getenv("CLAIMBUSTER_URL", "https://api.claimbuster.org/api/v2/score/text")
+
+PROVIDER_TIMEOUT = float(os.getenv("PROVIDER_TIMEOUT", "5"))
+# Overall budget for the whole fan-out; slower providers are dropped, not awaited.
+EVIDENCE_DEADLINE = float(os.getenv("EVIDENCE_DEADLINE", "6"))
+
+# Defaults for every provider; each can be overridden per provider with
+# EVIDENCE_<NAME>_<SETTING>, e.g. EVIDENCE_CLAIMBUSTER_TIMEOUT=2.
+PROVIDER_RETRIES = int(os.getenv("PROVIDER_RETRIES", "1"))
+PROVIDER_BACKOFF = float(os.getenv("PROVIDER_BACKOFF", "0.2"))
+PROVIDER_FAILURE_THRESHOLD = int(os.getenv("PROVIDER_FAILURE_THRESHOLD", "5"))
+PROVIDER_RESET_SECONDS = float(os.getenv("PROVIDER_RESET_SECONDS", "30"))
+PROVIDER_RATE = float(os.getenv("PROVIDER_RATE", "10"))  # requests/second
+PROVIDER_BURST = int(os.getenv("PROVIDER_BURST", "20"))
+PROVIDER_CACHE_TTL = float(os.getenv("PROVIDER_CACHE_TTL", "600"))
+PROVIDER_CACHE_SIZE = int(os.getenv("PROVIDER_CACHE_SIZE", "2048"))
+
+# Replace every provider with a local stub (load tests, offline development).
+EVIDENCE_OFFLINE = os.getenv("EVIDENCE_OFFLINE", "0") == "1"
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "50"))
+STUB_FAILURE_RATE = float(os.getenv("STUB_FAILURE_RATE", "0"))
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_SECONDS = histogram("provider_call_seconds", "Evidence provider HTTP attempts by outcome (ok, timeout, error, cancelled).",
+                             ["provider", "outcome"])
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the shared keep-alive client. Created lazily so it binds to the
+    running event loop rather than the one active at import time.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=PROVIDER_TIMEOUT,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _setting(provider: str, key: str, default: float) -> float:
+    return float(os.getenv(f"EVIDENCE_{provider.upper()}_{key}", default))
+
+
+# --- Resilience primitives ---
+
+class ProviderError(Exception):
+    """A failed lookup. `retryable` failures (timeouts, 5xx, 429) are retried with backoff."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failed lookups; calls
+    are refused while open. After `reset_seconds` one trial call is let
+    through (half-open): success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = PROVIDER_FAILURE_THRESHOLD, reset_seconds: float = PROVIDER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+
+class TokenBucket:
+    """Request quota: `rate` tokens/second refill, at most `burst` banked."""
+
+    def __init__(self, rate: float = PROVIDER_RATE, burst: int = PROVIDER_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self, timeout: float) -> bool:
+        """Waits up to `timeout` seconds for a token (batch jobs queue instead of skipping)."""
+        give_up = time.monotonic() + timeout
+        while not self.try_acquire():
+            wait = (1 - self.tokens) / self.rate if self.rate > 0 else timeout
+            if time.monotonic() + wait > give_up:
+                return False
+            await asyncio.sleep(wait)
+        return True
+
+
+class ResponseCache:
+    """Small TTL + LRU cache of provider responses (None results are cached too)."""
+
+    def __init__(self, ttl: float = PROVIDER_CACHE_TTL, max_entries: int = PROVIDER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str):
+        """Returns (hit, value)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def put(self, key: str, value):
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# --- Providers ---
+
+class EvidenceProvider:
+    """
+    Common interface for evidence sources. Subclasses implement `fetch()`,
+    which returns the provider's payload (or None for "no data") and raises
+    ProviderError on failure. `lookup()` wraps it with the response cache,
+    circuit breaker, token-bucket quota, per-attempt timeout and jittered
+    retries, and never raises.
+    """
+
+    name = "provider"
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name or self.name
+        self.timeout = _setting(self.name, "TIMEOUT", PROVIDER_TIMEOUT)
+        self.retries = int(_setting(self.name, "RETRIES", PROVIDER_RETRIES))
+        self.backoff = _setting(self.name, "BACKOFF", PROVIDER_BACKOFF)
+        self.breaker = CircuitBreaker(int(_setting(self.name, "FAILURE_THRESHOLD", PROVIDER_FAILURE_THRESHOLD)),
+                                      _setting(self.name, "RESET_SECONDS", PROVIDER_RESET_SECONDS))
+        self.bucket = TokenBucket(_setting(self.name, "RATE", PROVIDER_RATE), int(_setting(self.name, "BURST", PROVIDER_BURST)))
+        self.cache = ResponseCache(_setting(self.name, "CACHE_TTL", PROVIDER_CACHE_TTL), PROVIDER_CACHE_SIZE)
+        self.counters = {"calls": 0, "cache_hits": 0, "successes": 0, "failures": 0, "retries": 0,
+                         "short_circuited": 0, "throttled": 0}
+
+    @property
+    def enabled(self) -> bool:
+        """False when the provider is not configured (e.g. no API key)."""
+        return True
+
+    def healthy(self) -> bool:
+        return self.enabled and self.breaker.state != "open"
+
+    async def fetch(self, query: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def _attempt(self, query: str) -> Optional[Dict[str, Any]]:
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await asyncio.wait_for(self.fetch(query), self.timeout)
+            outcome = "ok"
+            return result
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            record_stage(PROVIDER_SECONDS, time.perf_counter() - start, f"provider_{self.name}",
+                         provider=self.name, outcome=outcome)
+
+    async def lookup(self, query: str, quota_wait: float = 0) -> Optional[Dict[str, Any]]:
+        """`quota_wait` > 0 waits that long for a rate-limit token instead of skipping the call."""
+        if not self.enabled:
+            return None
+        self.counters["calls"] += 1
+        hit, cached = self.cache.get(query)
+        if hit:
+            self.counters["cache_hits"] += 1
+            return cached
+        if self.breaker.state == "open":
+            self.counters["short_circuited"] += 1
+            return None
+        acquired = await self.bucket.acquire(quota_wait) if quota_wait > 0 else self.bucket.try_acquire()
+        if not acquired:
+            self.counters["throttled"] += 1
+            return None
+        if not self.breaker.allow():  # half-open and another request holds the trial call
+            self.counters["short_circuited"] += 1
+            return None
+
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    result = await self._attempt(query)
+                except asyncio.TimeoutError:
+                    error = ProviderError(f"timed out after {self.timeout}s")
+                except ProviderError as e:
+                    error = e
+                except httpx.HTTPError as e:
+                    error = ProviderError(repr(e))
+                except Exception as e:
+                    error = ProviderError(repr(e), retryable=False)
+                else:
+                    self.breaker.record_success()
+                    self.counters["successes"] += 1
+                    self.cache.put(query, result)
+                    return result
+                if not error.retryable or attempt == self.retries:
+                    break
+                self.counters["retries"] += 1
+                # Full jitter keeps retries from concurrent requests from synchronizing
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+        except asyncio.CancelledError:
+            # Dropped at the evidence deadline: count it, so a provider that is
+            # always too slow ends up with an open circuit instead of a task per request
+            self.breaker.record_failure()
+            self.counters["failures"] += 1
+            raise
+
+        self.breaker.record_failure()
+        self.counters["failures"] += 1
+        logger.warning(f"Evidence provider '{self.name}' failed: {error} (circuit {self.breaker.state})")
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "healthy": self.healthy(), "circuit": self.breaker.state,
+                "consecutive_failures": self.breaker.failures, "tokens": round(self.bucket.tokens, 1),
+                **self.counters}
+
+
+def _raise_for_status(response: httpx.Response):
+    if response.status_code == 429 or response.status_code >= 500:
+        raise ProviderError(f"HTTP {response.status_code}")
+    if response.status_code != 200:
+        raise ProviderError(f"HTTP {response.status_code}", retryable=False)
+
+
+class GoogleFactCheckProvider(EvidenceProvider):
+    name = "google"
+
+    @property
+    def enabled(self) -> bool:
+        return bool(GOOGLE_FACT_CHECK_KEY)
+
+    async def fetch(self, query: str) -> Optional[Dict[str, Any]]:
+        params = {"query": query, "key": GOOGLE_FACT_CHECK_KEY, "languageCode": "en"}
+        response = await get_http_client().get(GOOGLE_FACT_CHECK_URL, params=params)
+        _raise_for_status(response)
+        data = response.json()
+        return data["claims"][0] if data.get("claims") else None
+
+
+class SerperProvider(EvidenceProvider):
+    name = "live_search"
+
+    @property
+    def enabled(self) -> bool:
+        return bool(SERPER_API_KEY)
+
+    async def fetch(self, query: str) -> Optional[Dict[str, Any]]:
+        payload = {"q": query, "num": 6, "tbs": "qdr:w"}
+        headers = {'X-API-KEY': SERPER_API_KEY, 'Content-Type': 'application/json'}
+        response = await get_http_client().post(SERPER_URL, headers=headers, json=payload)
+        _raise_for_status(response)
+        return response.json()
+
+
+class ClaimBusterProvider(EvidenceProvider):
+    name = "claimbuster"
+
+    @property
+    def enabled(self) -> bool:
+        return bool(CLAIMBUSTER_API_KEY)
+
+    async def fetch(self, query: str) -> Optional[Dict[str, Any]]:
+        url = f"{CLAIMBUSTER_URL}/{quote(query, safe='')}"
+        response = await get_http_client().get(url, headers={"x-api-key": CLAIMBUSTER_API_KEY})
+        _raise_for_status(response)
+        return response.json()
+
+
+class StubProvider(EvidenceProvider):
+    """
+    Offline stand-in that answers in the payload format of the provider it
+    replaces, after `latency_ms`, failing a `failure_rate` share of calls.
+    Answers are derived from the query hash, so load tests are repeatable.
+    """
+
+    def __init__(self, name: str, latency_ms: float = STUB_LATENCY_MS, failure_rate: float = STUB_FAILURE_RATE):
+        super().__init__(name)
+        self.latency = latency_ms / 1000
+        self.failure_rate = failure_rate
+
+    async def fetch(self, query: str) -> Optional[Dict[str, Any]]:
+        await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ProviderError("stub failure")
+        digest = hashlib.sha256(f"{self.name}:{query}".encode()).digest()
+        if self.name == "google":
+            if digest[0] % 3:  # most claims have no published fact-check
+                return None
+            rating = ("False", "Misleading", "True")[digest[1] % 3]
+            return {"text": query, "claimReview": [{
+                "publisher": {"name": "Stub Fact Check"}, "textualRating": rating,
+                "reviewDate": datetime.utcnow().strftime("%Y-%m-%dT00:00:00Z"),
+                "url": f"https://factcheck.invalid/{digest.hex()[:12]}"}]}
+        if self.name == "live_search":
+            return {"organic": [
+                {"title": f"Report {i} on {query[:40]}", "link": f"https://news{i}.invalid/{digest.hex()[:8]}",
+                 "snippet": f"Coverage of the claim: {query[:80]}", "source": f"Stub News {i}", "date": "1 day ago"}
+                for i in range(1 + digest[2] % 6)]}
+        if self.name == "claimbuster":
+            return {"results": [{"text": query, "score": digest[3] / 255}]}
+        return None
+
+
+class ProviderRegistry:
+    def __init__(self):
+        self._providers: Dict[str, EvidenceProvider] = {}
+
+    def register(self, provider: EvidenceProvider) -> EvidenceProvider:
+        self._providers[provider.name] = provider
+        return provider
+
+    def __getitem__(self, name: str) -> EvidenceProvider:
+        return self._providers[name]
+
+    def names(self) -> List[str]:
+        return list(self._providers)
+
+    def values(self) -> List[EvidenceProvider]:
+        return list(self._providers.values())
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: p.stats() for name, p in self._providers.items()}
+
+
+PROVIDERS = ProviderRegistry()
+
+callback_metric("provider_events", "Evidence lookups by provider and outcome (calls, cache_hits, successes, failures, "
+                "retries, short_circuited, throttled).", ["provider", "event"],
+                lambda: [((p.name, event), value) for p in PROVIDERS.values() for event, value in p.counters.items()],
+                kind="counter")
+callback_metric("provider_circuit_open", "1 while the provider's circuit breaker is open.", ["provider"],
+                lambda: [((p.name,), int(p.breaker.state == "open")) for p in PROVIDERS.values()])
+if EVIDENCE_OFFLINE:
+    for _name in ("google", "live_search", "claimbuster"):
+        PROVIDERS.register(StubProvider(_name))
+else:
+    PROVIDERS.register(GoogleFactCheckProvider())
+    PROVIDERS.register(SerperProvider())
+    PROVIDERS.register(ClaimBusterProvider())
+
+
+async def iter_evidence(query: str, deadline: float = EVIDENCE_DEADLINE,
+                        quota_wait: float = 0) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+    """
+    Runs every healthy provider concurrently and yields (name, result) as each
+    one finishes within `deadline` seconds; result is None for a failed lookup.
+    Providers that are unconfigured, have an open circuit or are still pending
+    at the deadline are never yielded. A `quota_wait` lets lookups queue for
+    their rate limit and extends the deadline by as much.
+    """
+    tasks = {}
+    for provider in PROVIDERS.values():
+        if provider.healthy():
+            tasks[asyncio.create_task(provider.lookup(query, quota_wait))] = provider.name
+        elif provider.enabled:
+            provider.counters["short_circuited"] += 1
+    give_up = time.monotonic() + deadline + quota_wait
+    pending = set(tasks)
+    try:
+        while pending:
+            remaining = give_up - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield tasks[task], task.result() if task.exception() is None else None
+    finally:
+        for task in pending:
+            task.cancel()
+            if time.monotonic() >= give_up:
+                logger.warning(f"Evidence provider '{tasks[task]}' missed the {deadline}s deadline.")
+
+
+async def gather_evidence(query: str, deadline: float = EVIDENCE_DEADLINE,
+                          quota_wait: float = 0) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    All of iter_evidence at once: a result for every registered provider name,
+    None for those that were skipped, failed or missed the deadline.
+    """
+    results: Dict[str, Optional[Dict[str, Any]]] = {name: None for name in PROVIDERS.names()}
+    async for name, result in iter_evidence(query, deadline, quota_wait):
+        results[name] = result
+    return results
@@ -0,0 +1,349 @@
+import io
+import os
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageChops, ExifTags
+
+from ingest import open_image_source
+
+# --- Configuration ---
+# Images are processed in horizontal strips of this many rows (rounded to the
+# JPEG block grid), so the NumPy working set scales with image width, not height.
+FORENSICS_TILE_ROWS = int(os.getenv("FORENSICS_TILE_ROWS", "256"))
+# Larger images are analyzed at 1/2, 1/4 or 1/8 scale. PIL decodes a whole
+# image at once, so this bounds the decoded pixels themselves: JPEGs are
+# decoded straight at the reduced scale (draft), never at full resolution.
+FORENSICS_MAX_PIXELS = int(os.getenv("FORENSICS_MAX_PIXELS", str(24_000_000)))
+ELA_QUALITY = int(os.getenv("ELA_QUALITY", "90"))
+HEATMAP_MAX_SIZE = 64
+
+BLOCK = 8
+REGION = 8                    # blocks per side of a region when comparing local statistics
+
+# Copy-move search runs on a pooled copy of the image of at most this many
+# pixels, over every overlapping 4x4 window.
+CLONE_MAX_PIXELS = 2_000_000
+CLONE_WINDOW = 4
+CLONE_TEXTURE_ENERGY = 9.0      # mean squared residual; flatter windows (sky, walls) match trivially
+CLONE_MIN_SHIFT = 16            # in original pixels
+CLONE_MIN_VOTES = 32            # matching windows that must agree on one displacement
+CLONE_MIN_DENSITY = 0.02        # ...and cover their bounding box at least this densely
+
+_HASH_MULTIPLIER = np.uint64(0x100000001B3)
+
+logger = logging.getLogger(__name__)
+
+
+def _blocks(array: np.ndarray) -> np.ndarray:
+    """(H, W) -> (H/8, W/8, 8, 8) view; H and W must be multiples of 8."""
+    h, w = array.shape
+    return array.reshape(h // BLOCK, BLOCK, w // BLOCK, BLOCK).swapaxes(1, 2)
+
+
+def _ela_strip(strip: Image.Image) -> np.ndarray:
+    """Error level analysis: per-pixel max channel difference after one JPEG round trip."""
+    buffer = io.BytesIO()
+    strip.save(buffer, "JPEG", quality=ELA_QUALITY)
+    buffer.seek(0)
+    diff = ImageChops.difference(strip, Image.open(buffer))
+    return np.asarray(diff, dtype=np.uint8).max(axis=2)
+
+
+def _pool(gray: np.ndarray, factor: int) -> np.ndarray:
+    h, w = gray.shape[0] // factor * factor, gray.shape[1] // factor * factor
+    return gray[:h, :w].reshape(h // factor, factor, w // factor, factor).mean(axis=(1, 3))
+
+
+def _window_hashes(pooled: np.ndarray):
+    """
+    Rolling hashes of every overlapping 4x4 window of the strip's high-pass
+    residual, for windows with enough residual energy. Hashing the residual
+    rather than raw pixels means smooth gradients never match, while a pasted
+    copy carries its noise pattern along with it.
+    """
+    residual = pooled[:-1, :-1] - pooled[1:, :-1] - pooled[:-1, 1:] + pooled[1:, 1:]
+    quantized = np.clip(np.round(residual / 4) + 128, 0, 255).astype(np.uint64)
+    h, w = residual.shape[0] - CLONE_WINDOW + 1, residual.shape[1] - CLONE_WINDOW + 1
+    hashes = np.zeros((h, w), dtype=np.uint64)
+    energy = np.zeros((h, w), dtype=np.float32)
+    with np.errstate(over="ignore"):
+        for i in range(CLONE_WINDOW):
+            for j in range(CLONE_WINDOW):
+                hashes = hashes * _HASH_MULTIPLIER + quantized[i:i + h, j:j + w]
+                energy += residual[i:i + h, j:j + w] ** 2
+    ys, xs = np.nonzero(energy / CLONE_WINDOW ** 2 > CLONE_TEXTURE_ENERGY)
+    return hashes[ys, xs], xs.astype(np.int32), ys.astype(np.int32)
+
+
+def _decode_scaled(image: Image.Image, max_pixels: int) -> Tuple[Image.Image, int]:
+    """
+    `image` reduced by a power of two until it fits max_pixels, and that
+    factor. A JPEG not yet loaded is decoded at the reduced size from its DCT
+    coefficients; other formats have no reduced decode and are reduced after loading.
+    """
+    width, height = image.size
+    scale = 1
+    while width * height > max_pixels * scale ** 2 and scale < 8:
+        scale *= 2
+    if scale == 1:
+        return image, 1
+    image.draft(image.mode, (width // scale, height // scale))
+    if image.size[0] < width:
+        return image, round(width / image.size[0])
+    return image.reduce(scale), scale
+
+
+def _regional(block_map: np.ndarray, reducer=np.nanmedian) -> np.ndarray:
+    """Reduces a block map to REGION x REGION block regions (edges padded with NaN)."""
+    h, w = block_map.shape
+    ph, pw = -(-h // REGION) * REGION, -(-w // REGION) * REGION
+    padded = np.full((ph, pw), np.nan, dtype=np.float64)
+    padded[:h, :w] = block_map
+    regions = padded.reshape(ph // REGION, REGION, pw // REGION, REGION).swapaxes(1, 2).reshape(ph // REGION, pw // REGION, -1)
+    return reducer(regions, axis=2)
+
+
+def _downsample(block_map: np.ndarray, max_size: int = HEATMAP_MAX_SIZE) -> List[List[int]]:
+    """Average-pools a block map to at most max_size on each side, scaled to 0-255."""
+    h, w = block_map.shape
+    fy, fx = max(1, -(-h // max_size)), max(1, -(-w // max_size))
+    ph, pw = -(-h // fy) * fy, -(-w // fx) * fx
+    padded = np.pad(block_map, ((0, ph - h), (0, pw - w)), mode="edge")
+    pooled = padded.reshape(ph // fy, fy, pw // fx, fx).mean(axis=(1, 3))
+    peak = pooled.max()
+    if peak > 0:
+        pooled = pooled / peak
+    return (pooled * 255).astype(np.uint8).tolist()
+
+
+def _spread(values: np.ndarray) -> float:
+    """Robust relative dispersion: (p95 - p5) / median."""
+    values = values[np.isfinite(values)]
+    if values.size < 4:
+        return 0.0
+    p5, p50, p95 = np.percentile(values, [5, 50, 95])
+    return float((p95 - p5) / p50) if p50 > 0 else 0.0
+
+
+def _clone_regions(hashes: np.ndarray, xs: np.ndarray, ys: np.ndarray, scale: int):
+    """
+    Groups identical windows by displacement vector. A real copy-move moves a
+    whole patch by one shift, so only shifts backed by CLONE_MIN_VOTES windows count.
+    """
+    if hashes.size < 2:
+        return 0, []
+    order = np.argsort(hashes, kind="stable")
+    same = hashes[order][1:] == hashes[order][:-1]
+    a, b = order[:-1][same], order[1:][same]
+    dx, dy = xs[b] - xs[a], ys[b] - ys[a]
+    flip = (dy < 0) | ((dy == 0) & (dx < 0))
+    dx, dy = np.where(flip, -dx, dx), np.where(flip, -dy, dy)
+    src = np.where(flip, b, a)
+    far = np.maximum(np.abs(dx), np.abs(dy)) * scale >= CLONE_MIN_SHIFT
+    if not far.any():
+        return 0, []
+    span = int(max(xs.max(), ys.max())) + 1
+    keys, inverse, counts = np.unique(dy[far] * (2 * span + 1) + dx[far] + span, return_inverse=True, return_counts=True)
+    shifts = np.stack([keys % (2 * span + 1) - span, keys // (2 * span + 1)], axis=1)
+    regions, matched = [], 0
+    for k in np.argsort(counts)[::-1]:
+        if counts[k] < CLONE_MIN_VOTES:
+            break
+        members = src[far][inverse == k]
+        x0, y0, x1, y1 = xs[members].min(), ys[members].min(), xs[members].max(), ys[members].max()
+        # Chance matches scatter over the whole frame; a pasted patch is compact
+        if counts[k] < CLONE_MIN_DENSITY * (x1 - x0 + 1) * (y1 - y0 + 1):
+            continue
+        matched += int(counts[k])
+        if len(regions) < 5:
+            sx, sy = int(shifts[k][0]), int(shifts[k][1])
+            box = [int(x0), int(y0), int(x1) + CLONE_WINDOW, int(y1) + CLONE_WINDOW]
+            regions.append({"source": [v * scale for v in box],
+                            "target": [(v + (sx if i % 2 == 0 else sy)) * scale for i, v in enumerate(box)]})
+    return matched, regions
+
+
+def analyze_forensics(image: Image.Image, heatmap: bool = False, tile_rows: int = FORENSICS_TILE_ROWS,
+                      max_pixels: int = FORENSICS_MAX_PIXELS) -> Dict[str, Any]:
+    """
+    Pixel-level forensics for Layer 3, computed strip by strip with NumPy.
+
+    - ELA: how unevenly regions respond to one more JPEG compression.
+    - Noise: per-8x8-block sigma of a 2x2 high-pass residual; spliced regions
+      rarely share the camera's noise level.
+    - JPEG grid: energy of pixel steps by column/row modulo the block size. A
+      strong grid that is not on the block boundary means the image was
+      cropped after compression.
+    - Clone hints: textured patches repeated elsewhere under a single shift.
+
+    Inconsistency scores compare regions of 8x8 blocks, so content edges
+    average out while a pasted area stands apart. Images over `max_pixels`
+    are analyzed at a reduced scale (see _decode_scaled); positions are
+    reported in original pixels.
+    """
+    full_width, full_height = image.size
+    image, scale = _decode_scaled(image, max_pixels)
+    width, height = image.size
+    width8, height8 = width // BLOCK * BLOCK, height // BLOCK * BLOCK
+    if width8 == 0 or height8 == 0:
+        raise ValueError("Image too small for block forensics.")
+    # JPEG blocks of the original, in analyzed pixels (a reduced decode keeps their edges)
+    grid = BLOCK // scale
+
+    clone_scale = max(1, int(np.ceil(np.sqrt(width * height / CLONE_MAX_PIXELS))))
+    step = BLOCK * clone_scale
+    tile_rows = max(step, tile_rows // step * step)
+    # Strips overlap by one clone window, so windows starting near the bottom
+    # of a strip are hashed whole rather than cut at the strip boundary
+    overlap = CLONE_WINDOW * clone_scale
+
+    ela_maps, noise_maps, grid_maps = [], [], []
+    col_energy = np.zeros(grid)
+    row_energy = np.zeros(grid)
+    clone_hashes, clone_xs, clone_ys = [], [], []
+
+    for top in range(0, height8, tile_rows):
+        bottom = min(top + tile_rows, height8)
+        rows = bottom - top
+        # Crop first, then convert: only one strip is ever held as RGB
+        strip = image.crop((0, top, width8, min(bottom + overlap, height8)))
+        if strip.mode != "RGB":
+            strip = strip.convert("RGB")
+        extended = np.asarray(strip.convert("L"), dtype=np.float32)
+        gray = extended[:rows]
+
+        ela_maps.append(_blocks(_ela_strip(strip)[:rows].astype(np.float32)).mean(axis=(2, 3)))
+
+        residual = np.zeros_like(gray)
+        residual[:-1, :-1] = gray[:-1, :-1] - gray[1:, :-1] - gray[:-1, 1:] + gray[1:, 1:]
+        noise_maps.append(_blocks(residual).std(axis=(2, 3)) / 2)
+
+        dx = np.abs(np.diff(gray, axis=1))
+        dy = np.abs(np.diff(gray, axis=0))
+        col_energy += np.bincount(np.arange(dx.shape[1]) % grid, weights=dx.sum(axis=0), minlength=grid)
+        row_energy += np.bincount((np.arange(dy.shape[0]) + top) % grid, weights=dy.sum(axis=1), minlength=grid)
+
+        # Per-block grid strength: step across the block's right edge vs. steps inside it
+        dx_blocks = _blocks(np.pad(dx, ((0, 0), (0, 1)), mode="edge"))
+        boundary = dx_blocks[..., BLOCK - 1].mean(axis=2)
+        interior = dx_blocks[..., :BLOCK - 1].mean(axis=(2, 3))
+        grid_maps.append(boundary / (interior + 1.0))
+
+        pooled = _pool(extended, clone_scale) if clone_scale > 1 else extended
+        if pooled.shape[0] >= CLONE_WINDOW and pooled.shape[1] >= CLONE_WINDOW:
+            hashes, xs, ys = _window_hashes(pooled)
+            own = ys < rows // clone_scale  # windows starting in the overlap belong to the next strip
+            clone_hashes.append(hashes[own])
+            clone_xs.append(xs[own])
+            clone_ys.append(ys[own] + top // clone_scale)
+
+    ela_map = np.concatenate(ela_maps)
+    noise_map = np.concatenate(noise_maps)
+    grid_map = np.concatenate(grid_maps)
+
+    # ELA and noise: dispersion of regional medians
+    ela_regions = _regional(ela_map)
+    noise_regions = _regional(noise_map)
+    ela_inconsistency = _spread(ela_regions.ravel())
+    noise_inconsistency = _spread(noise_regions.ravel())
+
+    # JPEG grid (energy index grid - 1 is the step across the block edge).
+    # At 1/8 scale a block is a single pixel and there is no grid to measure.
+    blockiness, grid_offset = 1.0, [0, 0]
+    if grid > 1:
+        col_ratio = col_energy.max() / (np.delete(col_energy, col_energy.argmax()).mean() + 1e-6)
+        row_ratio = row_energy.max() / (np.delete(row_energy, row_energy.argmax()).mean() + 1e-6)
+        blockiness = float((col_ratio + row_ratio) / 2)
+        grid_offset = [int((col_energy.argmax() + 1) % grid) * scale, int((row_energy.argmax() + 1) % grid) * scale]
+    has_grid = blockiness > 1.15
+    grid_aligned = not has_grid or grid_offset == [0, 0]
+
+    # Clone hints
+    cloned_windows, regions = 0, []
+    if clone_hashes:
+        cloned_windows, regions = _clone_regions(np.concatenate(clone_hashes), np.concatenate(clone_xs),
+                                                 np.concatenate(clone_ys), clone_scale * scale)
+    clone_area = cloned_windows * (CLONE_WINDOW * clone_scale) ** 2 / (width * height)
+
+    tamper_score = (
+        min(max(ela_inconsistency - 1.0, 0) / 2.0, 1) * 30
+        + min(max(noise_inconsistency - 1.0, 0) / 2.0, 1) * 30
+        + (0 if grid_aligned else 15)
+        + min(clone_area * 20, 1) * 25
+    )
+
+    result: Dict[str, Any] = {
+        "tamper_score": int(round(tamper_score)),
+        "ela": {"mean": round(float(ela_map.mean()), 2), "max": round(float(ela_map.max()), 2),
+                "inconsistency": round(ela_inconsistency, 3)},
+        "noise": {"median_sigma": round(float(np.median(noise_map)), 3), "inconsistency": round(noise_inconsistency, 3)},
+        "jpeg_grid": {"blockiness": round(blockiness, 3), "offset": grid_offset, "aligned": grid_aligned},
+        "clone": {"matched_windows": cloned_windows, "regions": regions},
+        "megapixels": round(full_width * full_height / 1e6, 2),
+        "scale": scale,
+    }
+    if heatmap:
+        ela_norm = ela_map / (np.median(ela_map) + 1e-6)
+        noise_norm = np.abs(noise_map - np.median(noise_map)) / (np.median(noise_map) + 1e-6)
+        result["heatmap"] = _downsample(ela_norm + noise_norm + np.maximum(grid_map - 1, 0))
+    return result
+
+
+def forensics_log(metrics: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Layer 3 entry for the scan response."""
+    if metrics is None:
+        return {"status": "neutral", "label": "Forensics", "text": "Not Analyzed.", "details": "Pixel analysis failed."}
+    score = metrics["tamper_score"]
+    text = "Manipulation Traces." if score > 60 else ("Irregularities." if score > 35 else "Consistent.")
+    details = (f"Tamper {score}/100 · ELA spread {metrics['ela']['inconsistency']:.2f} · "
+               f"Noise spread {metrics['noise']['inconsistency']:.2f} · "
+               f"Grid {'aligned' if metrics['jpeg_grid']['aligned'] else 'shifted'} · "
+               f"Clone regions {len(metrics['clone']['regions'])}")
+    return {
+        "status": "danger" if score > 60 else ("warning" if score > 35 else "success"),
+        "label": "Forensics",
+        "text": text,
+        "details": details,
+        "metrics": metrics,
+    }
+
+
+def get_exif_data(image):
+    """Safely extract EXIF data converting bytes to strings."""
+    exif_data = {}
+    try:
+        info = image.getexif()
+        if info:
+            for tag, value in info.items():
+                decoded = ExifTags.TAGS.get(tag, tag)
+                if isinstance(value, bytes):
+                    try: value = value.decode('utf-8', errors='ignore').strip()
+                    except: value = str(value)
+                elif not isinstance(value, (str, int, float)):
+                    value = str(value)
+                if isinstance(value, str):
+                    value = value.replace('\x00', '')
+                exif_data[decoded] = value
+    except Exception as e:
+        logging.warning(f"EXIF Error: {e}")
+    return exif_data
+
+
+# --- Worker entry points (run in the CPU pool; arguments and results are pickled) ---
+
+def read_exif(source: Union[str, bytes]) -> Dict[str, Any]:
+    """Layer 2 input: EXIF of an upload, read from its header without decoding pixels."""
+    with open_image_source(source) as image:
+        return get_exif_data(image)
+
+
+def run_forensics(source: Union[str, bytes], heatmap: bool = False) -> Optional[Dict[str, Any]]:
+    """Layer 3 on an upload; None if the pixels cannot be analyzed."""
+    try:
+        with open_image_source(source) as image:
+            return analyze_forensics(image, heatmap=heatmap)
+    except Exception as e:
+        logger.warning(f"Forensics Error: {e}")
+        return None
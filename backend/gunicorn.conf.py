@@ -0,0 +1,33 @@
+"""
+Production server: N uvicorn workers sharing one copy of the AI detector.
+
+    cd backend && gunicorn -c gunicorn.conf.py main:app
+
+With preload_app the app module is imported once in the master. `when_ready`
+then loads the model there, before any worker is forked, so the weights sit
+in copy-on-write pages shared by every worker instead of being loaded N times.
+Only the model is preloaded: SQLite connections and inference threads do not
+survive fork(), so workers open their own on startup / first use.
+"""
+import gc
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+preload_app = os.getenv("PRELOAD_APP", "1") == "1"
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    import main
+
+    main.ai_detector.get()
+    server.log.info(f"Preloaded components: {main.registry.status()}")
+    # Objects that exist now live for the whole process; moving them out of the
+    # GC's generations stops collections in workers from writing to (and so
+    # un-sharing) the pages that hold them.
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,155 @@
+import os
+import json
+import logging
+from contextlib import nullcontext
+from datetime import datetime
+from itertools import combinations
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from database import db_connection
+from ingest import open_image_source
+
+# --- Configuration ---
+# Maximum pHash Hamming distance (out of 64 bits) still treated as the same image.
+PHASH_MATCH_THRESHOLD = int(os.getenv("PHASH_MATCH_THRESHOLD", "6"))
+PHASH_INDEX_ENABLED = os.getenv("PHASH_INDEX_ENABLED", "1") == "1"
+
+# Multi-index hashing: the 64-bit pHash is split into bands, each stored in
+# its own column with a covering (band, phash) index. If two hashes are within
+# distance t, at least one band differs by at most t // BANDS bits
+# (pigeonhole), so probing every band with that radius finds all matches via
+# index lookups. A b-bit band holds about N / 2**b scans per value, so the
+# widths are sized for millions of scans: at 21-22 bits a probe returns a
+# handful of rows where a 16-bit band would return N / 65536.
+BAND_WIDTHS = (21, 21, 22)
+BANDS = len(BAND_WIDTHS)
+_BAND_SHIFTS = [sum(BAND_WIDTHS[:i]) for i in range(BANDS)]
+
+logger = logging.getLogger(__name__)
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+_DCT_32 = _dct_matrix(32)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    value = 0
+    for bit in bits.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def _grayscale(image: Image.Image, size: tuple) -> np.ndarray:
+    return np.asarray(image.convert("L").resize(size, Image.LANCZOS), dtype=np.float64)
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    pixels = _grayscale(image, (32, 32))
+    coeffs = (_DCT_32 @ pixels @ _DCT_32.T)[:8, :8]
+    # Median excludes the DC term, which only encodes overall brightness
+    median = np.median(coeffs.ravel()[1:])
+    return _bits_to_int(coeffs > median)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def compute_image_hashes(image: Image.Image, sha256: str) -> Dict[str, Any]:
+    """The upload's SHA-256 plus the pHash of its pixels."""
+    # JPEGs can be decoded straight at a reduced scale; hashes only need 32x32
+    if image.format == "JPEG":
+        image.draft("RGB", (128, 128))
+    return {
+        "sha256": sha256,
+        "phash": perceptual_hash(image),
+    }
+
+
+def hash_source(source, sha256: str) -> Dict[str, Any]:
+    """compute_image_hashes on an upload's IngestedImage.source() (CPU pool entry point)."""
+    with open_image_source(source) as image:
+        return compute_image_hashes(image, sha256)
+
+
+def _bands(value: int) -> List[int]:
+    return [(value >> shift) & ((1 << width) - 1) for shift, width in zip(_BAND_SHIFTS, BAND_WIDTHS)]
+
+
+def _neighbours(band: int, radius: int, width: int) -> List[int]:
+    """Every `width`-bit band value within `radius` bit flips of `band`."""
+    values = [band]
+    for r in range(1, radius + 1):
+        for positions in combinations(range(width), r):
+            flipped = band
+            for p in positions:
+                flipped ^= 1 << p
+            values.append(flipped)
+    return values
+
+
+def _to_signed(value: int) -> int:
+    """SQLite INTEGER is signed 64-bit."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def find_match(hashes: Dict[str, Any], threshold: int = PHASH_MATCH_THRESHOLD, conn=None) -> Optional[Dict[str, Any]]:
+    """
+    Returns the closest prior scan (exact SHA-256 first, then nearest pHash within
+    `threshold`), or None. Only rows sharing a near-identical band are fetched.
+    """
+    with (db_connection() if conn is None else nullcontext(conn)) as conn:
+        row = conn.execute('SELECT id, result, created_at FROM image_scans WHERE sha256 = ? ORDER BY id DESC LIMIT 1',
+                           (hashes["sha256"],)).fetchone()
+        if row:
+            return {"scan_id": row["id"], "distance": 0, "exact": True, "scanned_at": row["created_at"],
+                    "result": json.loads(row["result"])}
+
+        radius = threshold // BANDS
+        clauses, params = [], []
+        for i, band in enumerate(_bands(hashes["phash"])):
+            probes = _neighbours(band, radius, BAND_WIDTHS[i])
+            clauses.append(f"SELECT id, phash FROM image_scans WHERE band{i} IN ({','.join('?' * len(probes))})")
+            params.extend(probes)
+        candidates = conn.execute(" UNION ".join(clauses), params).fetchall()
+
+        best = None
+        for candidate in candidates:
+            distance = hamming(hashes["phash"], _to_unsigned(candidate["phash"]))
+            if distance <= threshold and (best is None or distance < best[1]):
+                best = (candidate["id"], distance)
+        if best is None:
+            return None
+
+        row = conn.execute('SELECT result, created_at FROM image_scans WHERE id = ?', (best[0],)).fetchone()
+        return {"scan_id": best[0], "distance": best[1], "exact": False, "scanned_at": row["created_at"],
+                "result": json.loads(row["result"])}
+
+
+def store_scan(hashes: Dict[str, Any], result: Dict[str, Any], conn=None) -> Optional[int]:
+    own_conn = conn is None
+    try:
+        with (db_connection() if own_conn else nullcontext(conn)) as conn:
+            bands = _bands(hashes["phash"])
+            cursor = conn.execute(
+                '''INSERT INTO image_scans (sha256, phash, band0, band1, band2, result, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                (hashes["sha256"], _to_signed(hashes["phash"]), *bands, json.dumps(result), datetime.utcnow().isoformat()))
+            if own_conn: conn.commit()
+            return cursor.lastrowid
+    except Exception as e:
+        logger.error(f"Image index write failed: {e}")
+        return None
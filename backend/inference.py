@@ -0,0 +1,149 @@
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+from metrics import histogram, stage_timer
+
+# --- Configuration ---
+INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", "8"))
+INFERENCE_BATCH_WAIT_MS = float(os.getenv("INFERENCE_BATCH_WAIT_MS", "15"))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "64"))
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+AI_DETECTOR_MODEL = os.getenv("AI_DETECTOR_MODEL", "umm-maybe/AI-image-detector")
+
+logger = logging.getLogger(__name__)
+
+BATCH_SECONDS = histogram("inference_batch_seconds", "Model call time per micro-batch.", ["scheduler"])
+BATCH_SIZE = histogram("inference_batch_size", "Items per micro-batch.", ["scheduler"],
+                       buckets=(1, 2, 4, 8, 16, 32, 64))
+REQUEST_SECONDS = histogram("inference_request_seconds", "Queue wait plus batch time seen by one caller.", ["scheduler"])
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the scheduler is saturated; callers should shed load (HTTP 503)."""
+
+
+class BatchInferenceScheduler:
+    """
+    Micro-batching front end for an image classifier.
+
+    Images are queued and grouped into batches of up to `batch_size`, waiting
+    at most `max_wait_ms` for a batch to fill. Batches run on dedicated worker
+    threads (PyTorch releases the GIL inside kernels), never on the event loop.
+    The queue is bounded: when it is full `submit` raises InferenceQueueFull
+    instead of letting latency grow without limit. `model_fn(items)` returns
+    one output per item, in order.
+    """
+
+    def __init__(self, model_fn: Callable[..., Any], batch_size: int = INFERENCE_BATCH_SIZE,
+                 max_wait_ms: float = INFERENCE_BATCH_WAIT_MS, queue_size: int = INFERENCE_QUEUE_SIZE,
+                 workers: int = INFERENCE_WORKERS, name: str = "model"):
+        self.model_fn = model_fn
+        self.name = name
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.workers = max(1, workers)
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.batches_run = 0
+        self.images_run = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout=5)
+
+    def submit(self, image) -> Future:
+        if not self._threads:
+            self.start()
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((image, future))
+        except queue.Full:
+            raise InferenceQueueFull(f"Inference queue full ({self._queue.maxsize} pending).")
+        return future
+
+    async def predict(self, image) -> Any:
+        with stage_timer(REQUEST_SECONDS, self.name, scheduler=self.name):
+            return await asyncio.wrap_future(self.submit(image))
+
+    def _collect_batch(self, first: tuple) -> List[tuple]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # leave the stop signal for this worker's next loop
+                break
+            batch.append(item)
+        return batch
+
+    def _worker(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            # Drop requests whose caller has already gone away.
+            batch = [(image, fut) for image, fut in self._collect_batch(first) if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            BATCH_SIZE.observe(len(batch), scheduler=self.name)
+            try:
+                with stage_timer(BATCH_SECONDS, scheduler=self.name):
+                    outputs = self.model_fn([image for image, _ in batch])
+                for (_, fut), output in zip(batch, outputs):
+                    fut.set_result(output)
+                self.batches_run += 1
+                self.images_run += len(batch)
+            except Exception as e:
+                logger.error(f"Batch inference failed ({len(batch)} images): {e}")
+                for _, fut in batch:
+                    if not fut.done(): fut.set_exception(e)
+
+    def stats(self):
+        return {
+            "batches": self.batches_run,
+            "images": self.images_run,
+            "avg_batch_size": round(self.images_run / self.batches_run, 2) if self.batches_run else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+
+def pipeline_batches(pipe: Callable[..., Any]) -> Callable[[List[Any]], Any]:
+    """model_fn for a transformers pipeline: each micro-batch runs as one forward pass."""
+    return lambda images: pipe(images, batch_size=len(images))
+
+
+def load_ai_detector(model: str = AI_DETECTOR_MODEL) -> BatchInferenceScheduler:
+    """
+    Builds the local AI-image detector (ResNet-50 based) behind a scheduler.
+    transformers is imported here, not at module load, so processes that never
+    scan an image never pay for it. Worker threads start on the first submit,
+    which keeps this safe to call in a pre-fork master (see gunicorn.conf.py).
+    """
+    from transformers import pipeline
+
+    logger.info(f"Loading AI image detector {model} (CPU)...")
+    return BatchInferenceScheduler(pipeline_batches(pipeline("image-classification", model=model)), name="ai_detector")
@@ -0,0 +1,259 @@
+import io
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from typing import Any, BinaryIO, Dict, Optional, Tuple, Union
+
+from PIL import Image
+
+# --- Configuration ---
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(60 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(80_000_000)))
+INGEST_CHUNK_BYTES = 1024 * 1024
+# Multipart framing and form fields on top of the file bytes themselves
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+# Uploads larger than this are spooled to a temp file instead of kept in memory.
+INGEST_SPOOL_BYTES = int(os.getenv("INGEST_SPOOL_BYTES", str(8 * 1024 * 1024)))
+# The detector resizes to 224x224; decoding at twice that loses nothing.
+CLASSIFIER_INPUT_SIZE = int(os.getenv("CLASSIFIER_INPUT_SIZE", "448"))
+
+# PIL refuses to decode anything beyond this (DecompressionBombError), as a
+# backstop for code paths that skip the explicit header check below.
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+logger = logging.getLogger(__name__)
+
+
+def open_image_source(source: Union[str, bytes]) -> Image.Image:
+    """Lazy PIL image from IngestedImage.source() (a temp file path or the bytes themselves)."""
+    return Image.open(source) if isinstance(source, str) else Image.open(io.BytesIO(source))
+
+
+class UploadRejected(Exception):
+    def __init__(self, detail: str, status_code: int = 413):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _reset_peak_rss() -> bool:
+    """Restarts the kernel's RSS high-water mark (VmHWM) for this process."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def measured(fn, *args) -> Tuple[Any, Dict[str, int]]:
+    """
+    fn(*args) and the memory it took, measured in the process that runs it:
+    call it through the CPU pool so the decode's own worker is sampled.
+    Returns (result, {"start": RSS bytes, "peak": RSS bytes}). Without a
+    resettable high-water mark (non-Linux) the peak is sampled at the end.
+    """
+    exact = _reset_peak_rss()
+    start = _rss_bytes()
+    result = fn(*args)
+    peak = (_peak_rss_bytes() if exact else None) or _rss_bytes()
+    return result, {"start": start, "peak": max(start, peak)}
+
+
+class MemoryProbe:
+    """
+    Collects the measured() samples of one scan's worker-process jobs. Jobs
+    run side by side in different workers, so the summed delta is an upper
+    bound on what the scan added at any one moment.
+    """
+
+    def __init__(self):
+        self.jobs = []
+
+    def add(self, memory: Dict[str, int]):
+        self.jobs.append(memory)
+
+    def report(self) -> Dict[str, float]:
+        return {
+            "jobs": len(self.jobs),
+            "rss_peak_mb": round(max((job["peak"] for job in self.jobs), default=0) / 2 ** 20, 1),
+            "peak_delta_mb": round(sum(job["peak"] - job["start"] for job in self.jobs) / 2 ** 20, 1),
+        }
+
+
+class IngestedImage:
+    """
+    An upload received in chunks: hashed incrementally, kept in memory while
+    small and spooled to a temp file once it grows past INGEST_SPOOL_BYTES.
+    Every `open()` returns an independent lazy PIL image, so several layers can
+    decode it concurrently without sharing a file position.
+    """
+
+    def __init__(self, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.sha256: Optional[str] = None
+        self.width = self.height = 0
+        self.format: Optional[str] = None
+        self._digest = hashlib.sha256()
+        self._buffer: Optional[io.BytesIO] = io.BytesIO()
+        self._data: Optional[bytes] = None
+        self._file = None
+        self._path: Optional[str] = None
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadRejected(f"File exceeds the {self.max_bytes // 2 ** 20} MB upload limit.")
+        self._digest.update(chunk)
+        if self._file is None and self.size > INGEST_SPOOL_BYTES:
+            self._file = tempfile.NamedTemporaryFile(prefix="veripress-", suffix=".upload", delete=False)
+            self._path = self._file.name
+            self._file.write(self._buffer.getbuffer())
+            self._buffer = None
+        (self._file or self._buffer).write(chunk)
+
+    def finish(self) -> "IngestedImage":
+        self.sha256 = self._digest.hexdigest()
+        if self._file is not None:
+            self._file.close()
+        else:
+            self._data = self._buffer.getvalue()
+            self._buffer = None
+        return self
+
+    def raw(self) -> BinaryIO:
+        return open(self._path, "rb") if self._path else io.BytesIO(self._data)
+
+    def open(self) -> Image.Image:
+        return open_image_source(self.source())
+
+    def source(self) -> Union[str, bytes]:
+        """Picklable handle on the upload for worker processes: the spool path, or the bytes if small."""
+        return self._path or self._data
+
+    def validate(self) -> "IngestedImage":
+        """Reads only the image header and enforces the pixel budget before any decode."""
+        try:
+            with self.open() as image:
+                self.width, self.height = image.size
+                self.format = image.format
+        except Image.DecompressionBombError:
+            raise UploadRejected(f"Image exceeds the {MAX_IMAGE_PIXELS // 1_000_000} MP limit.")
+        except Exception:
+            raise UploadRejected("Unsupported or corrupt image file.", status_code=400)
+        if self.width * self.height > MAX_IMAGE_PIXELS:
+            raise UploadRejected(f"Image is {self.width}x{self.height}; the limit is {MAX_IMAGE_PIXELS // 1_000_000} MP.")
+        return self
+
+    def close(self):
+        if self._path:
+            try: os.unlink(self._path)
+            except OSError: pass
+            self._path = None
+        self._data = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {"bytes": self.size, "width": self.width, "height": self.height, "format": self.format,
+                "spooled": self._path is not None}
+
+
+def reduced_image(source: Union[str, bytes], size: int = CLASSIFIER_INPUT_SIZE) -> Image.Image:
+    """
+    Decoded RGB image at roughly `size` on its short side. JPEGs are decoded
+    directly at 1/2, 1/4 or 1/8 scale via draft(), never at full resolution.
+    """
+    image = open_image_source(source)
+    if image.format == "JPEG":
+        image.draft("RGB", (size, size))
+    image = image.convert("RGB")
+    if min(image.size) > 2 * size:
+        image = image.reduce(min(image.size) // size)
+    return image
+
+
+async def ingest_upload(file, max_bytes: int = MAX_UPLOAD_BYTES) -> IngestedImage:
+    """
+    Copies an UploadFile into an IngestedImage chunk by chunk, without ever
+    holding the whole body in memory. Starlette has already received (and
+    spooled) the request body by now, so `max_bytes` only bounds what is kept;
+    UploadLimitMiddleware is what stops an oversized transfer.
+    """
+    ingested = IngestedImage(max_bytes)
+    try:
+        while True:
+            chunk = await file.read(INGEST_CHUNK_BYTES)
+            if not chunk:
+                break
+            ingested.write(chunk)
+        return ingested.finish()
+    except BaseException:
+        ingested.finish().close()
+        raise
+
+
+def ingest_stream(stream: BinaryIO, max_bytes: int = MAX_UPLOAD_BYTES) -> IngestedImage:
+    """Same as ingest_upload for synchronous file-likes (e.g. zip members)."""
+    ingested = IngestedImage(max_bytes)
+    try:
+        for chunk in iter(lambda: stream.read(INGEST_CHUNK_BYTES), b""):
+            ingested.write(chunk)
+        return ingested.finish()
+    except BaseException:
+        ingested.finish().close()
+        raise
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware that refuses oversized uploads before their body is read:
+    413 when Content-Length exceeds the route's limit (plus form overhead),
+    411 when an upload route is sent a body without a length (chunked).
+    `limits` maps request paths to their upload limit in bytes.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is None or not length.isdigit():
+            await self._reject(send, 411, "Uploads must be sent with a Content-Length.")
+        elif int(length) > limit + UPLOAD_FORM_OVERHEAD:
+            await self._reject(send, 413, f"Upload exceeds the {limit // 2 ** 20} MB limit.")
+        else:
+            await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _reject(send, status: int, detail: str):
+        body = json.dumps({"detail": detail}).encode()
+        await send({"type": "http.response.start", "status": status, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), (b"connection", b"close")]})
+        await send({"type": "http.response.body", "body": body})
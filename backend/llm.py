@@ -0,0 +1,369 @@
+import os
+import re
+import json
+import time
+import random
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from groq import AsyncGroq, Groq
+
+from inference import BatchInferenceScheduler
+from metrics import callback_metric, counter, histogram, stage_timer
+
+# --- Configuration ---
+load_dotenv()
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+# Point at benchmarks/mock_llm_server.py (or any OpenAI-compatible server) for offline runs.
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+
+# Batched verdicts: up to LLM_BATCH_SIZE claims per completion, and no more
+# than LLM_BATCH_TOKEN_BUDGET estimated tokens (prompt + expected output).
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "16"))
+LLM_BATCH_WAIT_MS = float(os.getenv("LLM_BATCH_WAIT_MS", "50"))
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "12000"))
+LLM_OUTPUT_TOKENS_PER_CLAIM = int(os.getenv("LLM_OUTPUT_TOKENS_PER_CLAIM", "120"))
+LLM_BATCH_ATTEMPTS = int(os.getenv("LLM_BATCH_ATTEMPTS", "3"))
+# Wait before each retry round: exponential from LLM_BATCH_BACKOFF seconds with
+# jitter, capped at LLM_BATCH_BACKOFF_MAX (a Retry-After from Groq wins, within the cap)
+LLM_BATCH_BACKOFF = float(os.getenv("LLM_BATCH_BACKOFF", "0.5"))
+LLM_BATCH_BACKOFF_MAX = float(os.getenv("LLM_BATCH_BACKOFF_MAX", "8"))
+LLM_BATCH_WORKERS = int(os.getenv("LLM_BATCH_WORKERS", "4"))  # batches in flight
+
+logger = logging.getLogger(__name__)
+
+# Initialize Groq Client
+client = None
+try:
+    if GROQ_API_KEY:
+        client = Groq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL)
+    else:
+        logging.warning("Groq API Key missing. AI features disabled.")
+except Exception as e:
+    logger.error(f"Groq Client Init Failed: {e}")
+
+LLM_SECONDS = histogram("llm_call_seconds", "Groq chat completion latency by call site.", ["call"])
+LLM_ERRORS = counter("llm_errors", "Groq chat completions that raised, by call site.", ["call"])
+callback_metric("llm_batch_events", "Batched verdict bookkeeping (requests, claims, retried, failed).", ["event"],
+                lambda: [((k,), v) for k, v in dict(batch_stats).items()], kind="counter")
+
+
+# Reports generated inside request handlers use the async client, so a slow
+# completion never holds a thread or the event loop. Created lazily so it binds
+# to the running loop; closed on shutdown.
+_async_client: Optional[AsyncGroq] = None
+
+
+def get_async_client() -> Optional[AsyncGroq]:
+    global _async_client
+    if client is None:
+        return None
+    if _async_client is None:
+        _async_client = AsyncGroq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL)
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+
+async def _acreate(call: str, **kwargs):
+    """Async client.chat.completions.create, timed under `call`."""
+    try:
+        with stage_timer(LLM_SECONDS, f"groq_{call}", call=call):
+            return await get_async_client().chat.completions.create(**kwargs)
+    except Exception:
+        LLM_ERRORS.inc(call=call)
+        raise
+
+
+def _create(call: str, **kwargs):
+    """client.chat.completions.create, timed under `call`."""
+    try:
+        with stage_timer(LLM_SECONDS, f"groq_{call}", call=call):
+            return client.chat.completions.create(**kwargs)
+    except Exception:
+        LLM_ERRORS.inc(call=call)
+        raise
+
+
+def safe_int_score(value: Any) -> int:
+    """Nuclear option to force any value into an integer score 0-100."""
+    try:
+        if isinstance(value, (int, float)):
+            return max(0, min(100, int(value)))
+        if isinstance(value, str):
+            numbers = re.findall(r'\d+', value)
+            if numbers:
+                return max(0, min(100, int(numbers[0])))
+        return 50
+    except:
+        return 50
+
+
+def calibrate_verdict(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Forces the score into 0-100 and into the band its verdict implies."""
+    verdict = str(result.get("verdict", "")).lower()
+    score = safe_int_score(result.get("score", 50))
+    if "false" in verdict and score > 40: score = 10
+    elif "true" in verdict and score < 60: score = 90
+    result["score"] = score
+    return result
+
+
+def parse_json_content(content: str) -> Any:
+    """Completion text as JSON; tolerates a ```json fence around it."""
+    if "```" in content:
+        content = content.split("```json")[-1].split("```")[0].strip()
+    return json.loads(content)
+
+
+def analyze_with_ai(claim: str, evidence_text: str) -> Dict[str, Any]:
+    """Single-claim verdict from Groq; `evidence_text` is the formatted search evidence."""
+    if not client:
+        return {"verdict": "Unverified", "explanation": "AI unavailable.", "score": 50}
+
+    prompt = f"""
+    You are a rigorous fact-checker using Llama 3.3.
+    Current Date: {datetime.now().strftime("%Y-%m-%d")}
+    Claim: "{claim}"
+    Evidence: {evidence_text}
+    SCORING RULE: 0-20=FALSE, 40-60=UNVERIFIED, 80-100=TRUE.
+    Return JSON: {{ "verdict": string, "explanation": string, "score": number }}
+    """
+    try:
+        completion = _create("verdict",
+            model=GROQ_MODEL,
+            messages=[{"role": "system", "content": "Output JSON only."}, {"role": "user", "content": prompt}],
+            temperature=0, response_format={"type": "json_object"}
+        )
+
+        return calibrate_verdict(parse_json_content(completion.choices[0].message.content))
+    except Exception as e:
+        return {"verdict": "Error", "explanation": str(e)[:50], "score": 50}
+
+
+# --- Batched verdicts ---
+
+batch_stats = {"requests": 0, "claims": 0, "retried": 0, "failed": 0}
+_batch_stats_lock = threading.Lock()
+
+
+def _count_batch(**events: int):
+    """Adds to batch_stats; analyze_batch_with_ai runs on several batcher threads."""
+    with _batch_stats_lock:
+        for event, amount in events.items():
+            batch_stats[event] += amount
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Llama token count (~4 characters per token); only used for packing."""
+    return len(text) // 4 + 1
+
+
+def pack_batches(items: List[Tuple[str, str]], max_size: int = LLM_BATCH_SIZE,
+                 budget: int = LLM_BATCH_TOKEN_BUDGET) -> List[List[int]]:
+    """
+    Greedily groups item indexes into batches of at most `max_size` claims and
+    `budget` estimated tokens. An item that alone exceeds the budget gets a
+    batch of its own (its evidence is trimmed when the prompt is built).
+    """
+    batches, current, used = [], [], 0
+    for i, (claim, evidence_text) in enumerate(items):
+        cost = estimate_tokens(claim) + estimate_tokens(evidence_text) + LLM_OUTPUT_TOKENS_PER_CLAIM
+        if current and (len(current) >= max_size or used + cost > budget):
+            batches.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def validate_entry(entry: Any) -> Optional[Dict[str, Any]]:
+    """A well-formed batch result entry, calibrated; None if it is unusable."""
+    if not isinstance(entry, dict):
+        return None
+    verdict, explanation = entry.get("verdict"), entry.get("explanation")
+    if not isinstance(verdict, str) or not verdict.strip() or not isinstance(explanation, str):
+        return None
+    if not isinstance(entry.get("score"), (int, float, str)):
+        return None
+    return calibrate_verdict({"verdict": verdict.strip(), "explanation": explanation, "score": entry["score"]})
+
+
+def parse_batch_content(content: str, expected: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Maps valid entries back to their ids; unknown ids, duplicates and bad entries are dropped."""
+    data = parse_json_content(content)
+    entries = data.get("results", []) if isinstance(data, dict) else data
+    results: Dict[int, Dict[str, Any]] = {}
+    wanted = set(expected)
+    for entry in entries if isinstance(entries, list) else []:
+        entry_id = entry.get("id") if isinstance(entry, dict) else None
+        if isinstance(entry_id, str) and entry_id.isdigit():
+            entry_id = int(entry_id)
+        if entry_id not in wanted or entry_id in results:
+            continue
+        result = validate_entry(entry)
+        if result is not None:
+            results[entry_id] = result
+    return results
+
+
+def _complete_batch(items: List[Tuple[str, str]], ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """One chat completion for the given item ids; returns the entries that validated."""
+    evidence_budget = max(200, (LLM_BATCH_TOKEN_BUDGET // len(ids) - LLM_OUTPUT_TOKENS_PER_CLAIM) * 4)
+    claims = [{"id": i, "claim": items[i][0], "evidence": items[i][1][:evidence_budget]} for i in ids]
+    prompt = f"""
+    You are a rigorous fact-checker using Llama 3.3.
+    Current Date: {datetime.now().strftime("%Y-%m-%d")}
+    Judge each claim below only against its own evidence.
+    SCORING RULE: 0-20=FALSE, 40-60=UNVERIFIED, 80-100=TRUE.
+    Claims: {json.dumps(claims, ensure_ascii=False)}
+    Return JSON: {{ "results": [ {{ "id": number, "verdict": string, "explanation": string, "score": number }} ] }}
+    with exactly one entry per claim id.
+    """
+    _count_batch(requests=1)
+    completion = _create("batch",
+        model=GROQ_MODEL,
+        messages=[{"role": "system", "content": "Output JSON only."}, {"role": "user", "content": prompt}],
+        temperature=0, response_format={"type": "json_object"},
+        max_tokens=LLM_OUTPUT_TOKENS_PER_CLAIM * len(ids) + 50,
+    )
+    return parse_batch_content(completion.choices[0].message.content, ids)
+
+
+def retry_delay(attempt: int, error: Optional[Exception] = None) -> float:
+    """Seconds to wait before retry round `attempt` (1-based)."""
+    delay = LLM_BATCH_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.0)
+    retry_after = getattr(getattr(error, "response", None), "headers", {}).get("retry-after")
+    try:
+        delay = max(delay, float(retry_after)) if retry_after else delay
+    except ValueError:
+        pass
+    return min(delay, LLM_BATCH_BACKOFF_MAX)
+
+
+def analyze_batch_with_ai(items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Verdicts for many (claim, evidence_text) pairs with as few completions as
+    the token budget allows. Entries that are missing or malformed in a
+    response are retried (only those) up to LLM_BATCH_ATTEMPTS times, after a
+    bounded backoff so a rate-limited Groq is not hit again at once. Blocking;
+    runs on llm_batcher's threads. Same result shape as analyze_with_ai, in
+    input order.
+    """
+    if not client:
+        return [{"verdict": "Unverified", "explanation": "AI unavailable.", "score": 50} for _ in items]
+
+    results: Dict[int, Dict[str, Any]] = {}
+    remaining = list(range(len(items)))
+    error, last_exception = "No valid result.", None
+    for attempt in range(LLM_BATCH_ATTEMPTS):
+        if attempt:
+            _count_batch(retried=len(remaining))
+            time.sleep(retry_delay(attempt, last_exception))
+            last_exception = None
+        for batch in pack_batches([items[i] for i in remaining]):
+            ids = [remaining[j] for j in batch]
+            try:
+                results.update(_complete_batch(items, ids))
+            except Exception as e:
+                error, last_exception = str(e), e
+                logger.warning(f"Batched analysis of {len(ids)} claims failed: {error[:200]}")
+        remaining = [i for i in remaining if i not in results]
+        if not remaining:
+            break
+
+    _count_batch(claims=len(items), failed=len(remaining))
+    for i in remaining:
+        results[i] = {"verdict": "Error", "explanation": error[:50], "score": 50}
+    return [results[i] for i in range(len(items))]
+
+
+# Single-claim submissions from concurrent callers are grouped into batched
+# completions on their own threads (same micro-batcher as the image detector).
+llm_batcher = BatchInferenceScheduler(analyze_batch_with_ai, batch_size=LLM_BATCH_SIZE, max_wait_ms=LLM_BATCH_WAIT_MS,
+                                      queue_size=LLM_BATCH_SIZE * LLM_BATCH_WORKERS * 64, workers=LLM_BATCH_WORKERS,
+                                      name="llm_batch")
+
+
+async def generate_forensics_report(logs: Dict[str, Any], score: int, filename: str) -> str:
+    if not client: return "AI Copilot unavailable."
+    prompt = f"""
+    As a Digital Forensics Expert, write a 2-sentence summary for "{filename}".
+    Findings:
+    - Score: {score}/100
+    - AI Detection: {logs['ai_detection']['text']} ({logs['ai_detection']['details']})
+    - Provenance: {logs['provenance']['text']}
+
+    Explain the score and suggest one next step.
+    """
+    try:
+        completion = await _acreate("forensics_report",
+            model=GROQ_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3, max_tokens=150
+        )
+        return completion.choices[0].message.content.strip()
+    except Exception: return "Analysis summary unavailable."
+
+
+async def generate_batch_forensics_report(results: List[Dict[str, Any]]) -> str:
+    """One Groq call summarizing a whole batch instead of one report per image."""
+    if not client: return "AI Copilot unavailable."
+    findings = "\n".join(
+        f"- {r['filename']}: {r['verdict']} ({r['score']}/100), AI Detection: {r['layers']['ai_detection']['text']}"
+        for r in results[:100]
+    )
+    prompt = f"""
+    As a Digital Forensics Expert, write a 3-sentence summary of this batch of {len(results)} images.
+    Findings:
+    {findings}
+
+    Point out the images that need a closer look and suggest one next step.
+    """
+    try:
+        completion = await _acreate("batch_report",
+            model=GROQ_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3, max_tokens=250
+        )
+        return completion.choices[0].message.content.strip()
+    except Exception: return "Batch summary unavailable."
+
+
+async def generate_document_report(report: Dict[str, Any], score: int, flags: List[str], images: List[Dict[str, Any]],
+                                   filename: str) -> str:
+    if not client: return "AI Copilot unavailable."
+    image_lines = "\n".join(f"- {i['name']} (page {i.get('page') or '?'}): {i['verdict']} ({i['score']}/100)"
+                            for i in images[:20]) or "- none scanned"
+    prompt = f"""
+    As a Digital Forensics Expert, write a 3-sentence summary for the {report['format'].upper()} document "{filename}".
+    Findings:
+    - Integrity Score: {score}/100
+    - Tool chain: {', '.join(report.get('tool_chain') or []) or 'unknown'}
+    - Created: {report.get('created') or 'unknown'}, Modified: {report.get('modified') or 'unknown'}
+    - Risk flags: {'; '.join(flags) or 'none'}
+    Embedded images:
+    {image_lines}
+
+    Explain what the evidence says about the document's history and suggest one next step.
+    """
+    try:
+        completion = await _acreate("document_report",
+            model=GROQ_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3, max_tokens=250
+        )
+        return completion.choices[0].message.content.strip()
+    except Exception: return "Analysis summary unavailable."
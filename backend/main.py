@@ -1,67 +1,65 @@
 import os
-import hashlib
 import json
 import logging
-import requests
-import io
-import re
-import numpy as np
-from datetime import datetime
+import time
+import asyncio
+import zipfile
+from contextlib import aclosing
 from typing import List, Dict, Any, Optional
 
-# Image Processing Imports
-from PIL import Image, ExifTags, ImageChops, ImageFilter
-from fastapi import FastAPI, HTTPException, Request, UploadFile, File
+from fastapi import FastAPI, HTTPException, Request, Response, UploadFile, File, Form, Query
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.background import BackgroundTask
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
-# NEW: Hugging Face Transformers (Local Open Source Model)
-from transformers import pipeline
-
 from dotenv import load_dotenv
-from groq import Groq
 
-from database import get_db_connection, init_db
-from models import ClaimRequest, VerificationResponse, Source, ArchiveItem
+from database import db_connection, init_db, claim_writer
+from evidence import PROVIDERS, close_http_client
+from cache import verdict_cache
+from inference import InferenceQueueFull, load_ai_detector
+from components import WARMUP_ON_BOOT, registry
+from cpu_pool import cpu_pool
+from forensics import read_exif, run_forensics, forensics_log as build_forensics_log
+from ingest import MAX_UPLOAD_BYTES, IngestedImage, MemoryProbe, UploadLimitMiddleware, UploadRejected, ingest_upload, ingest_stream, measured, reduced_image
+from image_index import PHASH_INDEX_ENABLED, find_match, hash_source, store_scan
+from archive import (ARCHIVE_PAGE_SIZE, ARCHIVE_MAX_PAGE_SIZE, ARCHIVE_SEARCH_LIMIT, InvalidCursor, archive_etag, list_claims,
+                     get_claim, build_match_query, search_claims)
+from analytics import ANALYTICS_TOP_DOMAINS, ANALYTICS_MAX_DOMAINS, EXPORT_FORMATS, ExportUnavailable, archive_stats, export_file, window_first_id
+from llm import close_async_client, generate_forensics_report, generate_batch_forensics_report, generate_document_report, llm_batcher
+from documents import (DOC_MAX_BYTES, DOC_MAX_IMAGE_BYTES, EmbeddedImage, UnsupportedDocument, analyze_document,
+                       detect_format, display_metadata, score_document)
+from wayback import TraceError, trace_cache, trace_url
+from reputation import TRUSTED_SCORE, domain_reputation, parse_host
+from verification import verify_claim_text, stream_verification
+from claim_jobs import InvalidClaimBatch, claim_jobs, parse_claims, parse_jsonl
+from metrics import MetricsMiddleware, histogram, metrics, record_stage, stage_timer
+from models import ClaimRequest, VerificationResponse, ArchiveItem, ArchiveSummary, ArchiveSearchHit
 
 # --- Configuration ---
 load_dotenv() 
 
-# APIs
-GOOGLE_FACT_CHECK_KEY = os.getenv("GOOGLE_FACT_CHECK_KEY", "")
-SERPER_API_KEY = os.getenv("SERPER_API_KEY", "")
-CLAIMBUSTER_API_KEY = os.getenv("CLAIMBUSTER_API_KEY", "")
-GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
-
-HIGH_TRUST_DOMAINS = [
-    ".gov", ".edu", ".mil", "who.int", "un.org", 
-    "reuters.com", "apnews.com", "bloomberg.com", "bbc.com", "bbc.co.uk", 
-    "npr.org", "pbs.org", "wsj.com", "nytimes.com", "washingtonpost.com", 
-    "nature.com", "sciencemag.org", "nejm.org", 
-    "snopes.com", "politifact.com", "factcheck.org", "afp.com"
-]
-
-# Initialize Groq Client
-client = None
-try:
-    if GROQ_API_KEY:
-        client = Groq(api_key=GROQ_API_KEY)
-    else:
-        logging.warning("Groq API Key missing. AI features disabled.")
-except Exception as e:
-    print(f"ERROR: Groq Client Init Failed: {e}")
-
-# --- LOAD OPEN SOURCE AI MODEL (Local CPU) ---
-print("Loading Open Source AI Detector (CPU Mode)...")
-try:
-    # Model: umm-maybe/AI-image-detector (ResNet-50 based)
-    ai_image_classifier = pipeline("image-classification", model="umm-maybe/AI-image-detector")
-    print("✅ Open Source AI Model Loaded.")
-except Exception as e:
-    print(f"⚠️ AI Model failed to load: {e}")
-    ai_image_classifier = None
+# Per-client limit on the claim verification endpoints (slowapi syntax)
+VERIFY_RATE_LIMIT = os.getenv("VERIFY_RATE_LIMIT", "10/minute")
+
+# Bulk image scanning
+SCAN_BATCH_MAX_FILES = int(os.getenv("SCAN_BATCH_MAX_FILES", "200"))
+SCAN_BATCH_MAX_BYTES = int(os.getenv("SCAN_BATCH_MAX_BYTES", str(512 * 1024 * 1024)))
+SCAN_BATCH_CONCURRENCY = int(os.getenv("SCAN_BATCH_CONCURRENCY", "4"))
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff")
+
+# --- Heavy components, loaded on first use (or at boot with WARMUP_ON_BOOT=1) ---
+db_component = registry.register("database", init_db, required=True)
+# Uploads are micro-batched onto dedicated inference threads instead of
+# calling the pipeline inline on the event loop.
+ai_detector = registry.register("ai_detector", load_ai_detector, required=WARMUP_ON_BOOT,
+                                closer=lambda scheduler: scheduler.stop())
+# Decode, EXIF, pixel forensics and hashing run in worker processes, off the event loop's GIL
+cpu_pool_component = registry.register("cpu_pool", cpu_pool.start)
 
 limiter = Limiter(key_func=get_remote_address)
 app = FastAPI(title="Veripress Journalist Tool API", version="15.2.0-Calibrated")
@@ -69,388 +67,631 @@ app = FastAPI(title="Veripress Journalist Tool API", version="15.2.0-Calibrated"
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# Oversized uploads are refused from their Content-Length, before the body is received
+# (added first, so it sits inside CORS and its errors still carry CORS headers)
+app.add_middleware(UploadLimitMiddleware, limits={
+    "/scan-image": MAX_UPLOAD_BYTES, "/scan-images": SCAN_BATCH_MAX_BYTES,
+    "/scan-document": DOC_MAX_BYTES, "/scan-document/stream": DOC_MAX_BYTES,
+})
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Server-Timing"],
 )
-
-# --- Helper Functions ---
-
-def safe_int_score(value: Any) -> int:
-    """Nuclear option to force any value into an integer score 0-100."""
-    try:
-        if isinstance(value, (int, float)):
-            return max(0, min(100, int(value)))
-        if isinstance(value, str):
-            numbers = re.findall(r'\d+', value)
-            if numbers:
-                return max(0, min(100, int(numbers[0])))
-        return 50
-    except:
-        return 50
-
-def generate_hash(text: str) -> str:
-    return hashlib.sha256(text.encode('utf-8')).hexdigest()
-
-def calculate_image_hash(image_bytes: bytes) -> str:
-    return hashlib.sha256(image_bytes).hexdigest()
-
-def check_google_fact_check(query: str) -> Optional[Dict[str, Any]]:
-    if not GOOGLE_FACT_CHECK_KEY: return None
-    url = "https://factchecktools.googleapis.com/v1alpha1/claims:search"
-    params = {"query": query, "key": GOOGLE_FACT_CHECK_KEY, "languageCode": "en"}
-    try:
-        response = requests.get(url, params=params, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            if "claims" in data and data["claims"]: return data["claims"][0]
-    except Exception: pass
-    return None
-
-def check_live_web_search(query: str) -> Optional[Dict[str, Any]]:
-    if not SERPER_API_KEY: return None
-    url = "https://google.serper.dev/search"
-    payload = json.dumps({"q": query, "num": 6, "tbs": "qdr:w"}) 
-    headers = {'X-API-KEY': SERPER_API_KEY, 'Content-Type': 'application/json'}
-    try:
-        response = requests.post(url, headers=headers, data=payload, timeout=5)
-        if response.status_code == 200: return response.json()
-    except Exception: pass
-    return None
-
-def check_claimbuster(text: str) -> Optional[Dict[str, Any]]:
-    if not CLAIMBUSTER_API_KEY: return None
-    url = f"https://api.claimbuster.org/api/v2/score/text/{text}"
-    headers = {"x-api-key": CLAIMBUSTER_API_KEY}
-    try:
-        response = requests.get(url, headers=headers, timeout=5)
-        if response.status_code == 200: return response.json()
-    except Exception: pass
-    return None
-
-def is_trusted_domain(url: str) -> bool:
-    if not url: return False
-    return any(domain in url.lower() for domain in HIGH_TRUST_DOMAINS)
-
-def analyze_with_ai(claim: str, search_results: List[Dict]) -> Dict[str, Any]:
-    if not client:
-        return {"verdict": "Unverified", "explanation": "AI unavailable.", "score": 50}
-
-    evidence_lines = []
-    for res in search_results:
-        source_name = res.get('source', 'Web')
-        url = res.get('link', '')
-        snippet = res.get('snippet', '')
-        date = res.get('date', 'Recent')
-        trust_tag = "[HIGH AUTHORITY SOURCE] " if is_trusted_domain(url) else ""
-        evidence_lines.append(f"- {trust_tag}{source_name}: {snippet} ({date})")
-
-    context_text = "\n".join(evidence_lines)
-    prompt = f"""
-    You are a rigorous fact-checker using Llama 3.3.
-    Current Date: {datetime.now().strftime("%Y-%m-%d")}
-    Claim: "{claim}"
-    Evidence: {context_text}
-    SCORING RULE: 0-20=FALSE, 40-60=UNVERIFIED, 80-100=TRUE.
-    Return JSON: {{ "verdict": string, "explanation": string, "score": number }}
-    """
-    try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "system", "content": "Output JSON only."}, {"role": "user", "content": prompt}],
-            temperature=0, response_format={"type": "json_object"} 
-        )
-        
-        content = completion.choices[0].message.content
-        if "```" in content:
-            content = content.split("```json")[-1].split("```")[0].strip()
-            
-        result = json.loads(content)
-        verdict = result.get("verdict", "").lower()
-        
-        score = safe_int_score(result.get("score", 50))
-        if "false" in verdict and score > 40: score = 10
-        elif "true" in verdict and score < 60: score = 90
-        
-        result["score"] = score
-        return result
-    except Exception as e:
-        return {"verdict": "Error", "explanation": str(e)[:50], "score": 50}
-
-def get_exif_data(image):
-    """Safely extract EXIF data converting bytes to strings."""
-    exif_data = {}
-    try:
-        info = image.getexif()
-        if info:
-            for tag, value in info.items():
-                decoded = ExifTags.TAGS.get(tag, tag)
-                if isinstance(value, bytes):
-                    try: value = value.decode('utf-8', errors='ignore').strip()
-                    except: value = str(value)
-                elif not isinstance(value, (str, int, float)):
-                    value = str(value)
-                if isinstance(value, str):
-                    value = value.replace('\x00', '')
-                exif_data[decoded] = value
-    except Exception as e:
-        logging.warning(f"EXIF Error: {e}")
-    return exif_data
-
-def generate_forensics_report(logs: Dict[str, Any], score: int, filename: str) -> str:
-    if not client: return "AI Copilot unavailable."
-    prompt = f"""
-    As a Digital Forensics Expert, write a 2-sentence summary for "{filename}".
-    Findings:
-    - Score: {score}/100
-    - AI Detection: {logs['ai_detection']['text']} ({logs['ai_detection']['details']})
-    - Provenance: {logs['provenance']['text']}
-    
-    Explain the score and suggest one next step.
-    """
-    try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3, max_tokens=150
-        )
-        return completion.choices[0].message.content.strip()
-    except: return "Analysis summary unavailable."
+# Outermost, so latency includes CORS and rate limiting
+app.add_middleware(MetricsMiddleware)
 
 # --- Endpoints ---
 
 @app.on_event("startup")
 def startup_event():
-    init_db()
+    db_component.get()
+    claim_writer.start()
+    if WARMUP_ON_BOOT:
+        registry.warm_all()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await claim_jobs.close()
+    await close_http_client()
+    await close_async_client()
+    registry.close_all()
+    cpu_pool.shutdown()
+    llm_batcher.stop()
+    claim_writer.stop()
+
+@app.get("/health/live")
+def health_live():
+    """The process is up and serving requests."""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def health_ready():
+    """200 once every required component is loaded, 503 while warming up; per-component state either way."""
+    ready = registry.ready()
+    return JSONResponse(status_code=200 if ready else 503,
+                        content={"status": "ready" if ready else "warming", "components": registry.status()})
 
 @app.post("/verify-claim", response_model=VerificationResponse)
-@limiter.limit("10/minute")
-def verify_claim(request: Request, body: ClaimRequest):
+@limiter.limit(VERIFY_RATE_LIMIT)
+async def verify_claim(request: Request, body: ClaimRequest):
+    claim_text = body.claim_text.strip()
+    if not claim_text:
+        raise HTTPException(status_code=400, detail="Empty claim.")
+    return await verify_claim_text(claim_text)
+
+@app.post("/verify-claim/stream")
+@limiter.limit(VERIFY_RATE_LIMIT)
+async def verify_claim_stream(request: Request, body: ClaimRequest):
+    """
+    Same verification as /verify-claim, streamed as NDJSON: fact-check hit,
+    each live source and the ClaimBuster score as they arrive, then the verdict.
+    """
     claim_text = body.claim_text.strip()
     if not claim_text:
         raise HTTPException(status_code=400, detail="Empty claim.")
 
-    google_result = check_google_fact_check(claim_text)
-    live_search = check_live_web_search(claim_text)
-    claimbuster_result = check_claimbuster(claim_text)
-
-    sources: List[Source] = []
-    raw_search_results = []
-    breaking_news_signals = ["dead", "killed", "died", "passed away", "shot", "assassination", "confirmed"]
-    has_breaking_news = False
-
-    if live_search and "organic" in live_search:
-        for res in live_search["organic"][:6]:
-            raw_search_results.append(res)
-            snippet = res.get('snippet', '').lower()
-            title = res.get('title', '').lower()
-            if any(sig in snippet or sig in title for sig in breaking_news_signals):
-                has_breaking_news = True
-            url = res.get('link', '')
-            name = res.get('source', 'Web')
-            if is_trusted_domain(url): name = f"✅ {name}"
-            sources.append(Source(name=f"Live: {name}", url=url, snippet=res.get('snippet')[:100]+"...", date=res.get('date', 'Recent')))
-
-    fact_check_found = False
-    if google_result and "claimReview" in google_result:
-        review = google_result["claimReview"][0]
-        review_date = review.get("reviewDate")
-        is_recent = False
-        if review_date:
+    async def stream():
+        try:
+            async with aclosing(stream_verification(claim_text)) as events:
+                async for event in events:
+                    yield json.dumps(event) + "\n"
+        except Exception as e:
+            logging.error(f"Streamed verification failed: {e}")
+            yield json.dumps({"event": "error", "detail": "Verification failed."}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+# Batch verification for wire-feed ingestion: a JSON list (or {"claims": [...]})
+# or an uploaded JSONL file becomes a background job; poll it or stream its results.
+@app.post("/verify-claims", status_code=202)
+@limiter.limit(VERIFY_RATE_LIMIT)
+async def verify_claims(request: Request, file: Optional[UploadFile] = File(None)):
+    try:
+        if file is not None:
+            claims = parse_jsonl(await file.read())
+        else:
             try:
-                d = datetime.strptime(review_date[:10], "%Y-%m-%d")
-                if (datetime.now() - d).days < 90: is_recent = True
-            except: pass
-
-        if is_recent and not has_breaking_news:
-            publisher = review.get("publisher", {}).get("name", "Unknown")
-            rating = review.get("textualRating", "Unknown")
-            sources.insert(0, Source(name=f"✅ Fact Check ({publisher})", url=review.get("url"), snippet=f"Rated: {rating}", date=review_date))
-            verdict = rating
-            explanation = f"Verified by {publisher}: {rating}."
-            score = 95 if "true" in rating.lower() else 10
-            fact_check_found = True
-
-    if not fact_check_found:
-        if raw_search_results:
-            ai_analysis = analyze_with_ai(claim_text, raw_search_results)
-            verdict = ai_analysis.get("verdict", "Unverified")
-            explanation = ai_analysis.get("explanation", "Analysis failed.")
-            score = ai_analysis.get("score", 50)
-            sources.insert(0, Source(name="🤖 AI Analyst (Llama 3.3)", url="https://groq.com", snippet="Synthesized from live data."))
+                body = await request.json()
+            except ValueError:
+                raise InvalidClaimBatch("Expected a JSON list of claims or a JSONL file upload.")
+            if isinstance(body, dict):
+                body = body.get("claims")
+            if not isinstance(body, list):
+                raise InvalidClaimBatch("Expected a JSON list of claims or {\"claims\": [...]}.")
+            claims = parse_claims(body)
+        job = claim_jobs.submit(claims)
+    except InvalidClaimBatch as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.describe()
+
+def get_claim_job(job_id: str):
+    job = claim_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@app.get("/verify-claims/{job_id}")
+def claim_job_status(job_id: str):
+    return get_claim_job(job_id).describe()
+
+@app.get("/verify-claims/{job_id}/results")
+async def claim_job_results(job_id: str):
+    """NDJSON: one line per unique claim as it completes, then a final status line."""
+    job = get_claim_job(job_id)
+
+    async def stream():
+        async for line in job.follow():
+            yield json.dumps(line) + "\n"
+        yield json.dumps({"done": True, **job.describe()}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get("/evidence/providers")
+def evidence_providers():
+    """Per-provider circuit state, quota and counters."""
+    return PROVIDERS.stats()
+
+@app.get("/reputation")
+def reputation(url: Optional[str] = None):
+    """Reputation list status; with `url`, that source's trust score."""
+    if url is None:
+        return domain_reputation.stats()
+    score = domain_reputation.score(url)
+    return {"url": url, "host": parse_host(url), "score": score, "trusted": score is not None and score >= TRUSTED_SCORE}
+
+@app.get("/cache/stats")
+def cache_stats():
+    return verdict_cache.stats()
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus text exposition: per-stage latency histograms, provider and cache counters."""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# 2. 5-LAYER FORENSICS + OPEN SOURCE AI MODEL
+FORENSIC_LAYER_SECONDS = histogram("forensic_layer_seconds", "Image scan time per forensic layer.", ["layer"])
+
+def layer_timer(layer: str):
+    return stage_timer(FORENSIC_LAYER_SECONDS, f"layer_{layer}", layer=layer)
+
+def image_layers(ingested: IngestedImage, exif: Dict[str, Any], forensics_metrics: Optional[Dict[str, Any]]) -> Dict[str, Dict]:
+    """Layer 1-4 logs (provenance, metadata, forensics, context) from the worker results."""
+    # Layer 1: Provenance (hashed while the upload streamed in)
+    provenance_log = {"status": "neutral", "label": "Provenance", "text": "Hash generated.", "details": f"SHA-256: {ingested.sha256[:16]}..."}
+
+    # Layer 2: Metadata
+    metadata_log = {"status": "warning", "label": "Metadata", "text": "Missing EXIF.", "details": f"Format: {ingested.format}. Likely stripped."}
+
+    # Layer 3: Forensics (ELA, block noise, JPEG grid, clone hints)
+    forensics_log = build_forensics_log(forensics_metrics)
+
+    # Layer 4: Context
+    date_original = exif.get("DateTimeOriginal")
+    context_log = {"status": "neutral", "label": "Context", "text": "No Timeline.", "details": "No timestamp found."}
+    if date_original:
+        context_log = {"status": "success", "label": "Context", "text": "Consistent.", "details": f"Date: {date_original}"}
+
+    return {"provenance": provenance_log, "metadata": metadata_log, "forensics": forensics_log, "context": context_log}
+
+async def detect_ai_image(image):
+    """Layer 5: calibrated AI detection. Raises InferenceQueueFull when saturated."""
+    ai_score = 0
+    ai_label = "No AI Pattern"
+    
+    # First scan in a cold process loads the model on a worker thread
+    ai_scheduler = ai_detector.get() if ai_detector.loaded else await run_in_threadpool(ai_detector.get)
+    if ai_scheduler:
+        try:
+            predictions = await ai_scheduler.predict(image)
+            
+            # Find specific 'artificial' or 'fake' score (More accurate than top_prediction)
+            for p in predictions:
+                if p['label'].lower() in ['artificial', 'ai', 'generated', 'fake']:
+                    ai_score = p['score'] * 100
+                    break
+            
+            if ai_score > 80:
+                ai_label = "AI Generated"
+            elif ai_score > 50:
+                 ai_label = "Suspicious"
+            else:
+                ai_label = "Authentic"
+
+        except InferenceQueueFull:
+            raise
+        except Exception as e:
+            logging.error(f"Local AI Model Error: {e}")
+            ai_label = "AI Check Failed"
+    return ai_score, ai_label
+
+def score_image(exif: Dict[str, Any], layers: Dict[str, Dict], ai_score: float, ai_label: str):
+    ai_log = {
+        "status": "danger" if ai_score > 80 else "success",
+        "label": "AI Detection",
+        "text": f"{ai_label}",
+        "details": f"AI Confidence: {int(ai_score)}%"
+    }
+    metadata_log = layers["metadata"]
+
+    # --- FINAL SCORING LOGIC ---
+    final_score = 50
+    verdict = "Unverified"
+
+    # 1. Priority: Camera Metadata (If present, trust it unless AI is 99% sure)
+    has_camera_data = bool(exif.get("Model") or exif.get("Make"))
+    
+    if has_camera_data:
+        if ai_score > 98: # Only override metadata if AI is absolutely certain
+            final_score = 10
+            verdict = "Metadata Spoofed"
+            metadata_log["status"] = "danger" 
         else:
-            verdict = "Unverified"
-            explanation = "No data found."
-            score = 50
+            final_score = 95
+            verdict = "Authentic"
+            metadata_log = {"status": "success", "label": "Metadata", "text": "Verified Camera", "details": f"Source: {exif.get('Model', 'Unknown')}"}
     
-    if claimbuster_result and "results" in claimbuster_result:
-        cb_score = claimbuster_result["results"][0]["score"]
-        sources.append(Source(name="ClaimBuster", url="https://claimbuster.org", snippet=f"Check-worthiness: {cb_score:.2f}"))
+    # 2. If no metadata, rely on AI score
+    else:
+        if ai_score > 80: # Threshold raised to avoid false positives on real photos
+            final_score = max(0, 100 - int(ai_score))
+            verdict = "AI Generated"
+        elif ai_score > 50:
+            final_score = 40
+            verdict = "Suspicious"
+        else:
+            final_score = 80
+            verdict = "Web / Authentic"
+
+    logs = {
+        "provenance": layers["provenance"],
+        "metadata": metadata_log,
+        "forensics": layers["forensics"],
+        "ai_detection": ai_log,
+        "context": layers["context"],
+        "credibility": {
+            "status": "success" if final_score > 80 else ("danger" if final_score < 40 else "warning"),
+            "label": "Credibility",
+            "text": f"{final_score}/100",
+            "details": "Forensic Verification Score"
+        }
+    }
+    return final_score, verdict, logs
 
-    claim_hash = generate_hash(claim_text)
-    timestamp = datetime.utcnow().isoformat()
-    
+async def run_measured(probe: MemoryProbe, fn, *args):
+    """fn(*args) in the CPU pool, with the worker's memory recorded on `probe`."""
+    result, memory = await cpu_pool.run(measured, fn, *args)
+    probe.add(memory)
+    return result
+
+async def lookup_known_image(ingested: IngestedImage, probe: MemoryProbe):
+    """Perceptual hashes of the upload plus the closest prior scan, if any."""
     try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        sources_json = json.dumps([s.model_dump() for s in sources])
-        c.execute('''INSERT INTO claims (claim_text, verdict, explanation, sources, credibility_score, hash, created_at)
-                     VALUES (?, ?, ?, ?, ?, ?, ?)''', 
-                     (claim_text, verdict, explanation, sources_json, score, claim_hash, timestamp))
-        claim_id = c.lastrowid
-        c.execute('INSERT INTO archive (claim_id, hash, archived_at) VALUES (?, ?, ?)', (claim_id, claim_hash, timestamp))
-        conn.commit()
+        hashes = await run_measured(probe, hash_source, ingested.source(), ingested.sha256)
+        return hashes, await run_in_threadpool(find_match, hashes)
     except Exception as e:
-        logging.error(f"DB Error: {e}")
-    finally:
-        conn.close()
-    
-    return VerificationResponse(
-        verdict=verdict,
-        explanation=explanation,
-        sources=sources,
-        credibility_score=score,
-        hash=claim_hash,
-        created_at=timestamp
-    )
+        logging.warning(f"Image index lookup skipped: {e}")
+        return None, None
+
+async def timed_layer(layer: str, job):
+    with layer_timer(layer):
+        return await job
+
+async def scan_ingested(ingested: IngestedImage, filename: str, with_summary: bool = True, heatmap: bool = False) -> Dict[str, Any]:
+    probe = MemoryProbe()
+    await run_in_threadpool(ingested.validate)
+    if not cpu_pool_component.loaded:  # first scan in a cold process starts the workers
+        await run_in_threadpool(cpu_pool_component.get)
+
+    hashes = None
+    if PHASH_INDEX_ENABLED:
+        hashes, match = await lookup_known_image(ingested, probe)
+        cached_metrics = (match or {}).get("result", {}).get("layers", {}).get("forensics", {}).get("metrics") or {}
+        if match and (not heatmap or "heatmap" in cached_metrics):
+            # A re-encoded or resized copy of an image we already analyzed
+            cached = match.pop("result")
+            return {**cached, "filename": filename, "match": match,
+                    "ingest": {**ingested.describe(), "memory": probe.report()}}
+
+    # The independent layers run side by side: EXIF and pixel forensics in
+    # worker processes, AI detection on the inference threads
+    async def ai_detection():
+        classifier_image = await run_measured(probe, reduced_image, ingested.source())
+        with layer_timer("ai_detection"):
+            return await detect_ai_image(classifier_image)
+
+    source = ingested.source()
+    exif, forensics_metrics, (ai_score, ai_label) = await asyncio.gather(
+        timed_layer("metadata", run_measured(probe, read_exif, source)),
+        timed_layer("forensics", run_measured(probe, run_forensics, source, heatmap)),
+        ai_detection())
+    layers = image_layers(ingested, exif, forensics_metrics)
+    final_score, verdict, logs = score_image(exif, layers, ai_score, ai_label)
+
+    ai_summary = None
+    if with_summary:
+        ai_summary = await generate_forensics_report(logs, final_score, filename)
+
+    result = {
+        "score": final_score,
+        "verdict": verdict,
+        "layers": logs,
+        "ai_summary": ai_summary,
+        "filename": filename,
+        "match": None
+    }
+    if hashes:
+        await run_in_threadpool(store_scan, hashes, result)
+
+    memory = probe.report()
+    logging.info(f"Scanned {filename}: {ingested.size / 2 ** 20:.1f} MB, {ingested.width}x{ingested.height}, "
+                 f"worker peak RSS {memory['rss_peak_mb']} MB (+{memory['peak_delta_mb']} MB over {memory['jobs']} jobs)")
+    return {**result, "ingest": {**ingested.describe(), "memory": memory}}
 
-# 2. 5-LAYER FORENSICS + OPEN SOURCE AI MODEL
 @app.post("/scan-image")
-async def scan_image(file: UploadFile = File(...)):
+async def scan_image(file: UploadFile = File(...), heatmap: bool = False):
+    ingested = None
     try:
-        content_bytes = await file.read()
-        image = Image.open(io.BytesIO(content_bytes))
-        
-        # Layer 1: Provenance
-        file_hash = calculate_image_hash(content_bytes)
-        provenance_log = {"status": "neutral", "label": "Provenance", "text": "Hash generated.", "details": f"SHA-256: {file_hash[:16]}..."}
-
-        # Layer 2: Metadata
-        exif = get_exif_data(image)
-        metadata_log = {"status": "warning", "label": "Metadata", "text": "Missing EXIF.", "details": f"Format: {image.format}. Likely stripped."}
-        
-        # Layer 3: Forensics
-        try:
-            gray = image.convert('L')
-            edges = gray.filter(ImageFilter.FIND_EDGES)
-            edge_hist = edges.histogram()
-            noise_level = float(np.var(edge_hist)) if edge_hist else 0.0
-        except: noise_level = 0.0
-        
-        forensics_log = {"status": "success", "label": "Forensics", "text": "Noise Analyzed.", "details": f"Noise Variance: {int(noise_level)}"}
-
-        # Layer 4: Context
-        date_original = exif.get("DateTimeOriginal")
-        context_log = {"status": "neutral", "label": "Context", "text": "No Timeline.", "details": "No timestamp found."}
-        if date_original:
-            context_log = {"status": "success", "label": "Context", "text": "Consistent.", "details": f"Date: {date_original}"}
-
-        # --- LAYER 5: CALIBRATED AI DETECTION ---
-        ai_score = 0
-        ai_label = "No AI Pattern"
-        
-        if ai_image_classifier:
-            try:
-                predictions = ai_image_classifier(image)
-                
-                # Find specific 'artificial' or 'fake' score (More accurate than top_prediction)
-                for p in predictions:
-                    if p['label'].lower() in ['artificial', 'ai', 'generated', 'fake']:
-                        ai_score = p['score'] * 100
-                        break
-                
-                if ai_score > 80:
-                    ai_label = "AI Generated"
-                elif ai_score > 50:
-                     ai_label = "Suspicious"
-                else:
-                    ai_label = "Authentic"
+        ingested = await ingest_upload(file)
+        return await scan_ingested(ingested, file.filename, heatmap=heatmap)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except InferenceQueueFull:
+        raise HTTPException(status_code=503, detail="AI detector is saturated, retry shortly.")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Scan Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if ingested: ingested.close()
+
+async def expand_upload(file: UploadFile, budget: int) -> List[tuple]:
+    """
+    Streams one upload to disk-backed storage and returns (filename, IngestedImage)
+    pairs, unpacking zip archives member by member. `budget` is the number of
+    bytes the batch may still consume.
+    """
+    name = file.filename or "upload"
+    upload = await ingest_upload(file, max_bytes=budget)
+    with upload.raw() as raw:
+        if not (name.lower().endswith(".zip") or zipfile.is_zipfile(raw)):
+            return [(name, upload)]
+    items = []
+    try:
+        budget -= upload.size
+        with upload.raw() as raw, zipfile.ZipFile(raw) as archive:
+            for member in archive.infolist():
+                if member.is_dir() or not member.filename.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                # Check declared sizes before inflating to stay safe from zip bombs
+                if member.file_size > budget:
+                    raise UploadRejected(f"Batch exceeds {SCAN_BATCH_MAX_BYTES // (1024 * 1024)} MB uncompressed.")
+                with archive.open(member) as stream:
+                    item = await run_in_threadpool(ingest_stream, stream, budget)
+                budget -= item.size
+                items.append((f"{name}/{member.filename}", item))
+        return items
+    except BaseException:
+        for _, item in items: item.close()
+        raise
+    finally:
+        upload.close()
 
+@app.post("/scan-images")
+async def scan_images(files: List[UploadFile] = File(...), summary: str = Form("batch")):
+    """
+    Scans many images (or zip archives of images) and streams one NDJSON line per
+    image as soon as it finishes. `summary` is "none", "each" (one Groq report per
+    image) or "batch" (a single Groq report in the final line).
+    """
+    if summary not in ("none", "each", "batch"):
+        raise HTTPException(status_code=400, detail="summary must be 'none', 'each' or 'batch'.")
+
+    items: List[tuple] = []
+    try:
+        for f in files:
+            items.extend(await expand_upload(f, SCAN_BATCH_MAX_BYTES - sum(item.size for _, item in items)))
+            if len(items) > SCAN_BATCH_MAX_FILES:
+                raise UploadRejected(f"At most {SCAN_BATCH_MAX_FILES} images per batch.")
+        if not items:
+            raise UploadRejected("No images found in upload.", status_code=400)
+    except (UploadRejected, zipfile.BadZipFile) as e:
+        for _, item in items: item.close()
+        raise HTTPException(status_code=getattr(e, "status_code", 400), detail=getattr(e, "detail", str(e)))
+
+    async def scan_one(index: int, filename: str, ingested: IngestedImage, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await scan_ingested(ingested, filename, with_summary=(summary == "each"))
+                return {"type": "result", "index": index, **result}
             except Exception as e:
-                logging.error(f"Local AI Model Error: {e}")
-                ai_label = "AI Check Failed"
-
-        ai_log = {
-            "status": "danger" if ai_score > 80 else "success",
-            "label": "AI Detection",
-            "text": f"{ai_label}",
-            "details": f"AI Confidence: {int(ai_score)}%"
-        }
+                logging.error(f"Batch Scan Error ({filename}): {e}")
+                detail = getattr(e, "detail", None) or str(e) or type(e).__name__
+                return {"type": "error", "index": index, "filename": filename, "detail": detail}
+            finally:
+                ingested.close()
+
+    async def stream():
+        semaphore = asyncio.Semaphore(SCAN_BATCH_CONCURRENCY)
+        tasks = [asyncio.create_task(scan_one(i, name, item, semaphore)) for i, (name, item) in enumerate(items)]
+        scanned = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                event = await next_done
+                if event["type"] == "result": scanned.append(event)
+                yield json.dumps(event) + "\n"
+
+            done = {"type": "done", "count": len(items), "scanned": len(scanned), "failed": len(items) - len(scanned)}
+            if summary == "batch" and scanned:
+                done["ai_summary"] = await generate_batch_forensics_report(scanned)
+            yield json.dumps(done) + "\n"
+        finally:
+            for task in tasks: task.cancel()
+            for _, item in items: item.close()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+# 3. DOCUMENT FORENSICS (PDF / DOCX)
+DOCUMENT_SECONDS = histogram("document_scan_seconds", "Document scan time by stage (structure pass, whole scan).", ["stage"])
+
+async def scan_embedded_image(image: EmbeddedImage) -> Dict[str, Any]:
+    """Runs the image layers on one embedded image, streamed out of the document."""
+    ingested = None
+    try:
+        stream = await run_in_threadpool(image.open)
+        try:
+            ingested = await run_in_threadpool(ingest_stream, stream, DOC_MAX_IMAGE_BYTES)
+        finally:
+            stream.close()
+        result = await scan_ingested(ingested, image.name, with_summary=False)
+        return {"type": "image", **image.describe(), "score": result["score"], "verdict": result["verdict"],
+                "layers": result["layers"], "match": result["match"]}
+    except Exception as e:
+        detail = getattr(e, "detail", None) or str(e) or type(e).__name__
+        logging.warning(f"Embedded image {image.name} not scanned: {detail}")
+        return {"type": "image_error", **image.describe(), "detail": detail}
+    finally:
+        if ingested: ingested.close()
 
-        # --- FINAL SCORING LOGIC ---
-        final_score = 50
-        verdict = "Unverified"
-
-        # 1. Priority: Camera Metadata (If present, trust it unless AI is 99% sure)
-        has_camera_data = bool(exif.get("Model") or exif.get("Make"))
-        
-        if has_camera_data:
-            if ai_score > 98: # Only override metadata if AI is absolutely certain
-                final_score = 10
-                verdict = "Metadata Spoofed"
-                metadata_log["status"] = "danger" 
-            else:
-                final_score = 95
-                verdict = "Authentic"
-                metadata_log = {"status": "success", "label": "Metadata", "text": "Verified Camera", "details": f"Source: {exif.get('Model', 'Unknown')}"}
-        
-        # 2. If no metadata, rely on AI score
-        else:
-            if ai_score > 80: # Threshold raised to avoid false positives on real photos
-                final_score = max(0, 100 - int(ai_score))
-                verdict = "AI Generated"
-            elif ai_score > 50:
-                final_score = 40
-                verdict = "Suspicious"
-            else:
-                final_score = 80
-                verdict = "Web / Authentic"
-
-        logs = {
-            "provenance": provenance_log,
-            "metadata": metadata_log,
-            "forensics": forensics_log,
-            "ai_detection": ai_log,
-            "context": context_log,
-            "credibility": {
-                "status": "success" if final_score > 80 else ("danger" if final_score < 40 else "warning"),
-                "label": "Credibility",
-                "text": f"{final_score}/100",
-                "details": "Forensic Verification Score"
-            }
-        }
+async def document_events(ingested: IngestedImage, filename: str):
+    """
+    Scan events for an uploaded document: progress and revisions from the
+    structure pass, each embedded image as soon as its scan finishes (images
+    are scanned while the pass continues), then the final result.
+    """
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(SCAN_BATCH_CONCURRENCY)
+    pending, images, report = set(), [], None
 
-        ai_summary = generate_forensics_report(logs, final_score, file.filename)
+    async def scan_one(image: EmbeddedImage):
+        async with semaphore:
+            return await scan_embedded_image(image)
 
-        return {
-            "score": final_score,
-            "verdict": verdict,
-            "layers": logs,
-            "ai_summary": ai_summary,
-            "filename": file.filename
-        }
+    try:
+        async for event in iterate_in_threadpool(analyze_document(ingested.raw, ingested.size)):
+            if isinstance(event, EmbeddedImage):
+                pending.add(asyncio.create_task(scan_one(event)))
+            elif event["type"] == "document":
+                report = {k: v for k, v in event.items() if k != "type"}
+                record_stage(DOCUMENT_SECONDS, time.perf_counter() - start, "document_structure", stage="structure")
+            else:
+                yield event
+            for task in [t for t in pending if t.done()]:
+                pending.discard(task)
+                images.append(task.result())
+                yield images[-1]
+        for next_done in asyncio.as_completed(pending):
+            images.append(await next_done)
+            yield images[-1]
+        pending.clear()
+
+        scanned = [image for image in images if image["type"] == "image"]
+        score, flags = score_document(report, scanned)
+        ai_analysis = await generate_document_report(report, score, flags, scanned, filename)
+        record_stage(DOCUMENT_SECONDS, time.perf_counter() - start, stage="total")
+        yield {"type": "result", "filename": filename, "format": report["format"], "integrity_score": score,
+               "risk_flags": flags, "metadata": display_metadata(report), "ai_analysis": ai_analysis,
+               "images": images, "report": report, "sha256": ingested.sha256, "bytes": ingested.size}
+    finally:
+        for task in pending: task.cancel()
 
+async def ingest_document(file: UploadFile) -> IngestedImage:
+    """Spools the upload to disk (never held whole in memory) and checks it is a PDF or DOCX."""
+    try:
+        ingested = await ingest_upload(file, max_bytes=DOC_MAX_BYTES)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    try:
+        await run_in_threadpool(detect_format, ingested.raw)
+    except UnsupportedDocument as e:
+        ingested.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    return ingested
+
+@app.post("/scan-document")
+async def scan_document(file: UploadFile = File(...)):
+    """PDF/DOCX forensics in one JSON body; /scan-document/stream reports progress as it goes."""
+    ingested = await ingest_document(file)
+    try:
+        result = None
+        async for event in document_events(ingested, file.filename):
+            if event["type"] == "result":
+                result = event
+        return result
     except Exception as e:
-        logging.error(f"Scan Error: {e}")
+        logging.error(f"Document Scan Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        ingested.close()
 
-@app.get("/archive", response_model=List[ArchiveItem])
-def get_archive():
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute('SELECT * FROM claims ORDER BY created_at DESC LIMIT 50')
-    rows = c.fetchall()
-    conn.close()
-    archive = []
-    for row in rows:
-        sources_data = json.loads(row["sources"]) if row["sources"] else []
-        sources_objs = [Source(**s) for s in sources_data]
-        archive.append(ArchiveItem(
-            id=row["id"], claim_text=row["claim_text"], verdict=row["verdict"],
-            explanation=row["explanation"], sources=sources_objs,
-            credibility_score=row["credibility_score"], hash=row["hash"], created_at=row["created_at"]
-        ))
-    return archive
\ No newline at end of file
+@app.post("/scan-document/stream")
+async def scan_document_stream(file: UploadFile = File(...)):
+    """
+    Same scan as NDJSON: progress and revision events from the structure
+    pass, one line per embedded image as it is scanned, then the result
+    line (same body as /scan-document).
+    """
+    ingested = await ingest_document(file)
+
+    async def stream():
+        try:
+            async for event in document_events(ingested, file.filename):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logging.error(f"Document Scan Error: {e}")
+            yield json.dumps({"type": "error", "detail": str(e) or type(e).__name__}) + "\n"
+        finally:
+            ingested.close()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+# 4. ARCHIVE TRACER (Wayback snapshots)
+@app.post("/trace-archive")
+async def trace_archive(url: str = Form(...)):
+    """Snapshot history of a URL: content changes between captures and whether the page was deleted."""
+    try:
+        return await trace_url(url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TraceError as e:
+        logging.error(f"Archive Trace Error: {e}")
+        raise HTTPException(status_code=502, detail=str(e))
+
+@app.get("/trace-archive/cache")
+def trace_archive_cache():
+    return trace_cache.stats()
+
+@app.get("/archive", response_model=List[ArchiveSummary])
+def get_archive(request: Request, response: Response, limit: int = Query(ARCHIVE_PAGE_SIZE, ge=1, le=ARCHIVE_MAX_PAGE_SIZE),
+                cursor: Optional[str] = None, verdict: Optional[str] = None,
+                min_score: Optional[int] = Query(None, ge=0, le=100), max_score: Optional[int] = Query(None, ge=0, le=100)):
+    """
+    Newest-first archive page. The body stays a plain list; the next page's
+    cursor is returned in the X-Next-Cursor header (absent on the last page).
+    """
+    with db_connection() as conn:
+        etag = archive_etag(conn, limit, cursor, verdict, min_score, max_score)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        try:
+            items, next_cursor = list_claims(conn, limit, cursor, verdict, min_score, max_score)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+# Declared before /archive/{claim_id} so "search" is not parsed as an id
+@app.get("/archive/search", response_model=List[ArchiveSearchHit])
+def search_archive(q: str = Query(..., min_length=1, max_length=500), limit: int = Query(ARCHIVE_SEARCH_LIMIT, ge=1, le=ARCHIVE_MAX_PAGE_SIZE),
+                   verdict: Optional[str] = None):
+    """BM25-ranked full-text search over archived claims; the last word is matched as a prefix."""
+    match = build_match_query(q)
+    if match is None:
+        raise HTTPException(status_code=400, detail="Search query has no searchable words.")
+    with db_connection() as conn:
+        return search_claims(conn, match, limit, verdict)
+
+@app.get("/archive/{claim_id}", response_model=ArchiveItem)
+def get_archive_item(claim_id: int):
+    item = get_claim(claim_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Archive record not found.")
+    return ArchiveItem(**item)
+
+# 5. ARCHIVE ANALYTICS (Dashboard)
+@app.get("/analytics")
+def get_analytics(request: Request, response: Response, days: Optional[int] = Query(None, ge=1, le=3650),
+                  top: int = Query(ANALYTICS_TOP_DOMAINS, ge=1, le=ANALYTICS_MAX_DOMAINS)):
+    """Verdict distribution overall and per cited source domain, aggregated in SQL."""
+    with db_connection() as conn:
+        etag = archive_etag(conn, "analytics", days, top, window_first_id(conn, days))
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        stats = archive_stats(conn, days, top)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return stats
+
+@app.get("/analytics/export")
+def export_analytics(format: str = Query("parquet", pattern=f"^({'|'.join(EXPORT_FORMATS)})$"),
+                     days: Optional[int] = Query(None, ge=1, le=3650)):
+    """
+    The archive as one row per cited source, for offline analysis: Parquet by
+    default, or format=arrow / format=csv. The columnar formats are written
+    with pyarrow and return 501 on an install without it.
+    """
+    try:
+        with db_connection() as conn:
+            path, _ = export_file(conn, format, days)
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"veripress-archive-{time.strftime('%Y%m%d')}.{extension}"
+    return FileResponse(path, media_type=media_type, filename=filename, background=BackgroundTask(os.unlink, path))
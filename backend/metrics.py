@@ -0,0 +1,242 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# --- Configuration ---
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Adds a Server-Timing header (per-stage durations) to every response.
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+METRICS_PREFIX = "veripress_"
+
+# Seconds; covers sub-millisecond cache hits up to provider/Groq timeouts
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+logger = logging.getLogger(__name__)
+
+
+class _Timings(list):
+    """(name, seconds) stages of one request; closed once the headers are sent."""
+    open = True
+
+
+# Stage timings of the request being served, for the Server-Timing header.
+# Copied into threadpool calls by run_in_threadpool, so blocking stages show up
+# too. Background tasks spawned by the request inherit it until it is closed.
+_request_timings: ContextVar[Optional[_Timings]] = ContextVar("request_timings", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = METRICS_PREFIX + name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}_total{_labels(self.labelnames, key)} {value}" for key, value in values]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    """Gauge or counter read at scrape time from state another component already keeps."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], collect: Callable[[], Iterable[Tuple[Sequence[str], float]]],
+                 kind: str = "gauge"):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self) -> List[str]:
+        suffix = "_total" if self.kind == "counter" else ""
+        try:
+            return [f"{self.name}{suffix}{_labels(self.labelnames, [str(v) for v in key])} {value}"
+                    for key, value in self.collect()]
+        except Exception as e:
+            logger.warning(f"Metric {self.name} collection failed: {e}")
+            return []
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        # Re-registration (module reload in tests/benchmarks) returns the existing metric
+        return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return metrics.register(Counter(name, help, labelnames))
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return metrics.register(Histogram(name, help, labelnames, buckets))
+
+
+def callback_metric(name: str, help: str, labelnames: Sequence[str], collect, kind: str = "gauge") -> CallbackMetric:
+    return metrics.register(CallbackMetric(name, help, labelnames, collect, kind))
+
+
+def record_stage(metric: Histogram, seconds: float, timing_name: Optional[str] = None, **labels):
+    """Observes `seconds` and adds it to the current request's Server-Timing entries."""
+    metric.observe(seconds, **labels)
+    timings = _request_timings.get()
+    if timings is not None and timings.open and timing_name:
+        timings.append((timing_name, seconds))
+
+
+@contextmanager
+def stage_timer(metric: Histogram, timing_name: Optional[str] = None, **labels):
+    """Times the block into `metric` (with `labels`), whether or not it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(metric, time.perf_counter() - start, timing_name, **labels)
+
+
+# --- HTTP layer ---
+
+HTTP_SECONDS = histogram("http_request_seconds", "Request latency by route (time to response headers for streams).",
+                         ["method", "route", "status"])
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: request latency per route template and, when
+    SERVER_TIMING is on, a Server-Timing header listing the stages that ran
+    before the response started (streamed bodies report what preceded the
+    first chunk).
+    """
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+        self._routes: Dict[Any, str] = {}
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        route = self._routes.get(endpoint)
+        if route is None:
+            app = scope.get("app")
+            for candidate in getattr(getattr(app, "router", None), "routes", []):
+                if getattr(candidate, "endpoint", None) is endpoint:
+                    route = candidate.path
+                    break
+            route = self._routes[endpoint] = route or "unmatched"
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = _Timings()
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - start
+                HTTP_SECONDS.observe(elapsed, method=scope["method"], route=self._route(scope), status=message["status"])
+                if self.server_timing:
+                    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings]
+                    entries.append(f"total;dur={elapsed * 1000:.1f}")
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"server-timing", ", ".join(entries).encode())]}
+                timings.open = False
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
@@ -6,12 +6,32 @@ from datetime import datetime
 class ClaimRequest(BaseModel):
     claim_text: str
 
+# Sources the pipeline adds itself (the AI verdict, the ClaimBuster score)
+# rather than evidence it cites; they are not counted as source domains.
+AI_ANALYST_URL = "https://groq.com"
+CLAIMBUSTER_SOURCE_URL = "https://claimbuster.org"
+INTERNAL_SOURCE_URLS = frozenset({AI_ANALYST_URL, CLAIMBUSTER_SOURCE_URL})
+
 # Model for individual source items
 class Source(BaseModel):
     name: str
     url: str
     snippet: Optional[str] = None
 
+# List projection for the archive feed (sources are only returned by /archive/{id})
+class ArchiveSummary(BaseModel):
+    id: int
+    claim_text: str
+    verdict: str
+    credibility_score: int
+    hash: str
+    created_at: str
+
+# Full-text archive match; `snippet` highlights matched terms with <mark>
+class ArchiveSearchHit(ArchiveSummary):
+    snippet: Optional[str] = None
+    score: float
+
 # Response model for the verification result
 class VerificationResponse(BaseModel):
     verdict: str
@@ -20,6 +40,8 @@ class VerificationResponse(BaseModel):
     credibility_score: int
     hash: str
     created_at: str
+    cached: bool = False
+    related: List[ArchiveSearchHit] = []  # Prior archived verdicts on similar claims
 
 # Model for retrieving archived items
 class ArchiveItem(BaseModel):
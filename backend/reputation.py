@@ -0,0 +1,200 @@
+import os
+import re
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# --- Configuration ---
+REPUTATION_FILE = os.getenv("REPUTATION_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "trusted_domains.txt"))
+REPUTATION_RELOAD_SECONDS = float(os.getenv("REPUTATION_RELOAD_SECONDS", "5"))  # how often the file's mtime is checked
+TRUSTED_SCORE = int(os.getenv("TRUSTED_SCORE", "80"))  # minimum score of a high-authority source
+
+BREAKING_NEWS_SIGNALS = ["dead", "killed", "died", "passed away", "shot", "assassination", "confirmed"]
+
+# Used when the reputation file is missing or unreadable at startup.
+DEFAULT_DOMAINS = {
+    "gov": 95, "edu": 80, "mil": 95, "who.int": 95, "un.org": 95,
+    "reuters.com": 95, "apnews.com": 95, "bloomberg.com": 90, "bbc.com": 90, "bbc.co.uk": 90,
+    "npr.org": 90, "pbs.org": 90, "wsj.com": 90, "nytimes.com": 90, "washingtonpost.com": 90,
+    "nature.com": 90, "sciencemag.org": 90, "nejm.org": 90,
+    "snopes.com": 85, "politifact.com": 85, "factcheck.org": 85, "afp.com": 95,
+}
+
+logger = logging.getLogger(__name__)
+
+_SCORE = ""  # trie key holding a node's score; never a valid DNS label
+
+
+# [scheme:]//[userinfo@]host — the scheme and "//" are optional ("reuters.com/x").
+# As in browsers, userinfo runs to the last "@" of the authority, and "\" reads
+# as "/" and ends it: "https://evil.com\@reuters.com" is evil.com.
+_HOST = re.compile(r"(?:(?:[a-z][a-z0-9+.-]*:)?[/\\]{2})?(?:[^/\\?#]*@)?(\[[^\]/\\?#]*\]|[^:/\\?#@\s]*)", re.IGNORECASE)
+
+
+def parse_host(url: str) -> Optional[str]:
+    """Lower-cased hostname of a URL (scheme optional), without port, credentials or trailing dot."""
+    if not url:
+        return None
+    host = _HOST.match(url.strip()).group(1).strip("[]").rstrip(".").lower()
+    return host or None
+
+
+class SuffixTrie:
+    """Domain suffixes keyed label by label from the TLD down; the longest match wins."""
+
+    def __init__(self, entries: Iterable[Tuple[str, int]] = ()):
+        self.root: Dict[str, Any] = {}
+        self.size = 0
+        for suffix, score in entries:
+            self.add(suffix, score)
+
+    def add(self, suffix: str, score: int):
+        node = self.root
+        for label in reversed(suffix.lower().strip(".").split(".")):
+            node = node.setdefault(label, {})
+        if _SCORE not in node:
+            self.size += 1
+        node[_SCORE] = score
+
+    def lookup(self, host: str) -> Optional[int]:
+        node, score = self.root, None
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            score = node.get(_SCORE, score)
+        return score
+
+
+def parse_reputation_file(path: str) -> List[Tuple[str, int]]:
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split()
+            try:
+                score = int(parts[1]) if len(parts) > 1 else 100
+            except ValueError:
+                logger.warning(f"{path}:{lineno}: bad score {parts[1]!r}, entry skipped")
+                continue
+            entries.append((parts[0], max(0, min(100, score))))
+    return entries
+
+
+class DomainReputation:
+    """
+    Trust score lookup for source URLs, backed by a reloadable suffix trie.
+
+    The list file is re-read when its mtime changes (checked at most every
+    `reload_seconds`, on lookup). A reload builds a new trie and swaps it in,
+    so lookups never see a half-loaded list; a file that cannot be read keeps
+    the previous list, and malformed lines are skipped with a warning.
+    """
+
+    def __init__(self, path: Optional[str] = REPUTATION_FILE, reload_seconds: float = REPUTATION_RELOAD_SECONDS):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._trie = SuffixTrie(DEFAULT_DOMAINS.items())
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        self.loaded_at: Optional[float] = None
+        self.reloads = 0
+        self.reload()
+
+    def reload(self) -> bool:
+        """Loads the list file if it changed since the last load. True if a new list was swapped in."""
+        if not self.path:
+            return False
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime
+                if mtime == self._mtime:
+                    return False
+                trie = SuffixTrie(parse_reputation_file(self.path))
+            except OSError as e:
+                if self._mtime is None:
+                    logger.warning(f"Reputation list {self.path} unavailable ({e}); using {len(DEFAULT_DOMAINS)} built-in domains")
+                    self._mtime = -1
+                return False
+            self._trie, self._mtime = trie, mtime
+            self.loaded_at = time.time()
+            self.reloads += 1
+        logger.info(f"Loaded {trie.size} reputation entries from {self.path}")
+        return True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked >= self.reload_seconds:
+            self._checked = now
+            self.reload()
+
+    def score(self, url: str) -> Optional[int]:
+        """Trust score of the URL's host, None if no listed suffix matches."""
+        self._maybe_reload()
+        host = parse_host(url)
+        if host is None:
+            return None
+        return self._trie.lookup(host)
+
+    def is_trusted(self, url: str) -> bool:
+        score = self.score(url)
+        return score is not None and score >= TRUSTED_SCORE
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "entries": self._trie.size, "reloads": self.reloads,
+                "loaded_at": self.loaded_at}
+
+
+def trie_regex(keywords: Iterable[str]) -> str:
+    """
+    Alternation of `keywords` factored by common prefix ("d(?:ead|ied)"), so
+    the regex engine branches once per character instead of retrying every
+    keyword at every position. Spaces inside a keyword match any whitespace.
+    """
+    trie: Dict[str, Any] = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[""] = None  # a keyword ends here
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [(r"\s+" if ch == " " else re.escape(ch)) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if "" in node else group
+
+    return build(trie)
+
+
+class SignalMatcher:
+    """
+    Whole-word, case-insensitive keyword/phrase search with one compiled,
+    prefix-factored regex: one pass over the text however long the list is,
+    and "deadline" or "screenshot" no longer count as "dead" or "shot".
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = sorted({" ".join(k.lower().split()) for k in keywords} - {""})
+        # Texts are lower-cased before matching, which is cheaper than re.IGNORECASE
+        self._pattern = re.compile(rf"\b(?:{trie_regex(self.keywords)})\b")
+
+    def search(self, *texts: str) -> Optional[str]:
+        """First keyword found in the texts (searched as one), or None."""
+        match = self._pattern.search("\n".join(t for t in texts if t).lower())
+        return " ".join(match.group(0).split()) if match else None
+
+
+domain_reputation = DomainReputation()
+breaking_news = SignalMatcher(BREAKING_NEWS_SIGNALS)
+
+
+def is_trusted_domain(url: str) -> bool:
+    return domain_reputation.is_trusted(url)
@@ -0,0 +1,40 @@
+"""
+Shared setup for the backend tests.
+
+    cd backend && python -m pytest tests
+
+The app runs offline: evidence providers are the in-process stubs, the image
+classifier is the benchmark suite's transformers stand-in, and every test
+that touches SQLite gets a database of its own.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.join(BACKEND, "benchmarks", "stand_ins"))
+
+# Set before the backend modules read their configuration at import
+os.environ.update({"ATLAS_DB": os.path.join(tempfile.mkdtemp(), "atlas.db"), "EVIDENCE_OFFLINE": "1"})
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Points the connection pool at a fresh, empty database file."""
+    import database
+
+    path = str(tmp_path / "atlas.db")
+    monkeypatch.setattr(database, "DB_NAME", path)
+    return path
+
+
+@pytest.fixture
+def db(db_path):
+    """A fresh database migrated to the latest schema."""
+    import database
+
+    database.init_db()
+    return db_path
@@ -0,0 +1,71 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+import main
+from verification import claim_key
+
+VERDICTS = ("True", "False", "Unverified")
+
+
+@pytest.fixture
+def archive(db):
+    """Claims in scrambled insertion order, several sharing a created_at."""
+    records = []
+    for i in range(23):
+        created_at = f"2024-03-{1 + (i * 7) % 10:02d}T12:00:00"
+        text = f"Archived claim {i}"
+        records.append({"claim_text": text, "verdict": VERDICTS[i % 3], "explanation": "", "credibility_score": (i * 13) % 101,
+                        "hash": claim_key(text), "created_at": created_at, "sources": []})
+    with database.db_connection() as conn, conn:
+        database.insert_claims(conn, records)
+    with database.db_connection() as conn:
+        return [dict(row) for row in conn.execute("SELECT id, verdict, created_at FROM claims ORDER BY created_at DESC, id DESC")]
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def walk(client, **params):
+    """Every row of the archive, following X-Next-Cursor page by page."""
+    rows, pages, cursor = [], 0, None
+    while True:
+        response = client.get("/archive", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        rows.extend(response.json())
+        pages += 1
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return rows, pages
+
+
+def test_cursor_pages_cover_the_archive_once_in_order(archive, client):
+    rows, pages = walk(client, limit=5)
+    assert [row["id"] for row in rows] == [row["id"] for row in archive]
+    assert pages == 5
+
+
+def test_cursor_with_filters(archive, client):
+    rows, _ = walk(client, limit=3, verdict="False", min_score=20)
+    with database.db_connection() as conn:
+        expected = [row[0] for row in conn.execute(
+            "SELECT id FROM claims WHERE verdict = 'False' AND credibility_score >= 20 ORDER BY created_at DESC, id DESC")]
+    assert [row["id"] for row in rows] == expected
+
+
+def test_last_page_has_no_cursor(archive, client):
+    response = client.get("/archive", params={"limit": len(archive)})
+    assert len(response.json()) == len(archive)
+    assert "x-next-cursor" not in response.headers
+
+
+def test_malformed_cursor_is_rejected(archive, client):
+    assert client.get("/archive", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_etag_revalidation(archive, client):
+    first = client.get("/archive", params={"limit": 5})
+    assert client.get("/archive", params={"limit": 5}, headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+    assert client.get("/archive", params={"limit": 6}, headers={"If-None-Match": first.headers["etag"]}).status_code == 200
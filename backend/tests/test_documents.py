@@ -0,0 +1,234 @@
+import io
+import zipfile
+import zlib
+
+import pytest
+from PIL import Image
+
+from documents import EmbeddedImage, UnsupportedDocument, analyze_document, detect_format, score_document
+
+
+class PDFWriter:
+    """Builds small PDFs in memory: classic xref tables, incremental updates, object and xref streams."""
+
+    def __init__(self):
+        self.out = io.BytesIO()
+        self.offsets = {}
+        self.out.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def obj(self, num, body, stream=None):
+        self.offsets[num] = self.out.tell()
+        self.out.write(b"%d 0 obj\n" % num + body)
+        if stream is not None:
+            self.out.write(b"\nstream\n" + stream + b"\nendstream")
+        self.out.write(b"\nendobj\n")
+
+    def finish(self, root, info, nums=None, prev=None):
+        """Classic xref table and trailer for `nums` (default: every object written so far)."""
+        xref = self.out.tell()
+        self.out.write(b"xref\n")
+        for num in sorted(nums if nums is not None else self.offsets):
+            self.out.write(b"%d 1\n%010d 00000 n \n" % (num, self.offsets[num]))
+        extra = b" /Prev %d" % prev if prev is not None else b""
+        self.out.write(b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R%s >>\nstartxref\n%d\n%%%%EOF\n"
+                       % (max(self.offsets) + 1, root, info, extra, xref))
+        return xref
+
+    def object_stream(self, num, objects):
+        """Stores {number: body} compressed in object stream `num`."""
+        table, bodies = [], b""
+        for obj_num, body in objects.items():
+            table.append(b"%d %d" % (obj_num, len(bodies)))
+            bodies += body + b"\n"
+        head = b" ".join(table) + b"\n"
+        data = zlib.compress(head + bodies)
+        self.obj(num, b"<< /Type /ObjStm /N %d /First %d /Filter /FlateDecode /Length %d >>" % (len(objects), len(head), len(data)),
+                 data)
+
+    def finish_xref_stream(self, num, root, info, compressed):
+        """Cross-reference stream (no trailer keyword); `compressed` maps object number -> (stream, index)."""
+        size = max([num, *self.offsets, *compressed]) + 1
+        self.offsets[num] = self.out.tell()
+        rows = b""
+        for n in range(size):
+            if n in compressed:
+                rows += bytes([2]) + compressed[n][0].to_bytes(4, "big") + compressed[n][1].to_bytes(2, "big")
+            elif n in self.offsets:
+                rows += bytes([1]) + self.offsets[n].to_bytes(4, "big") + b"\x00\x00"
+            else:
+                rows += bytes([0]) + b"\x00" * 6
+        data = zlib.compress(rows)
+        xref = self.out.tell()
+        self.obj(num, b"<< /Type /XRef /Size %d /W [1 4 2] /Root %d 0 R /Info %d 0 R /Filter /FlateDecode /Length %d >>"
+                 % (size, root, info, len(data)), data)
+        self.out.write(b"startxref\n%d\n%%%%EOF\n" % xref)
+
+    def getvalue(self):
+        return self.out.getvalue()
+
+
+def jpeg(size=(96, 80)):
+    out = io.BytesIO()
+    Image.new("RGB", size, (200, 40, 40)).save(out, "JPEG")
+    return out.getvalue()
+
+
+def scan(data):
+    """(embedded images, final report) of a document held in memory."""
+    events = list(analyze_document(lambda: io.BytesIO(data), len(data)))
+    assert events[-1]["type"] == "document"
+    return [e for e in events if isinstance(e, EmbeddedImage)], events[-1]
+
+
+def page_tree(w, pages, first=10, resources=b""):
+    """Writes the catalog (1), page tree (2), Info (3) and one page per `pages` entry from object `first` on."""
+    kids = b" ".join(b"%d 0 R" % (first + i) for i in range(pages))
+    w.obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    w.obj(2, b"<< /Type /Pages /Kids [%s] /Count %d %s >>" % (kids, pages, resources))
+    for i in range(pages):
+        w.obj(first + i, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >>")
+
+
+def single_page_pdf():
+    w = PDFWriter()
+    image = jpeg()
+    w.obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    w.obj(2, b"<< /Type /Pages /Kids [4 0 R] /Count 1 >>")
+    w.obj(3, b"<< /Title (Budget memo) /Producer (Writer 1.0) /CreationDate (D:20240301101500Z) "
+             b"/ModDate (D:20240301110000Z) >>")
+    w.obj(4, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+             b"/Resources << /Font << /F1 5 0 R >> /XObject << /Im1 6 0 R >> >> >>")
+    w.obj(5, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    w.obj(6, b"<< /Type /XObject /Subtype /Image /Width 96 /Height 80 /ColorSpace /DeviceRGB "
+             b"/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>" % len(image), image)
+    w.finish(root=1, info=3)
+    return w.getvalue()
+
+
+def multi_page_pdf(pages=3):
+    w = PDFWriter()
+    page_tree(w, pages, resources=b"/Resources << /Font << /F1 5 0 R >> >>")
+    w.obj(3, b"<< /Producer (Writer 1.0) >>")
+    w.obj(5, b"<< /Type /Font /Subtype /TrueType /BaseFont /ABCDEF+Calibri /FontDescriptor 6 0 R >>")
+    w.obj(6, b"<< /Type /FontDescriptor /FontName /ABCDEF+Calibri /FontFile2 7 0 R >>")
+    w.obj(7, b"<< /Length 4 >>", b"font")
+    w.finish(root=1, info=3)
+    return w.getvalue()
+
+
+def incremental_update_pdf():
+    w = PDFWriter()
+    page_tree(w, 2)
+    w.obj(3, b"<< /Author (Desk A) /Producer (Writer 1.0) /CreationDate (D:20240301101500Z) >>")
+    prev = w.finish(root=1, info=3)
+    # Second revision: a page is replaced and the Info dictionary rewritten
+    w.obj(11, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Annots [] >>")
+    w.obj(3, b"<< /Author (Desk A) /Producer (Other Editor 9) /CreationDate (D:20240301101500Z) "
+             b"/ModDate (D:20240302090000Z) >>")
+    w.finish(root=1, info=3, nums=[3, 11], prev=prev)
+    return w.getvalue()
+
+
+def object_stream_pdf():
+    w = PDFWriter()
+    w.object_stream(8, {
+        1: b"<< /Type /Catalog /Pages 2 0 R /OpenAction << /S /JavaScript /JS (app.alert(1)) >> >>",
+        2: b"<< /Type /Pages /Kids [4 0 R 5 0 R] /Count 2 >>",
+        4: b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >>",
+        5: b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >>",
+    })
+    w.obj(3, b"<< /Producer (Stream Writer 2.1) /CreationDate (D:20240301101500Z) >>")
+    w.finish_xref_stream(9, root=1, info=3, compressed={1: (8, 0), 2: (8, 1), 4: (8, 2), 5: (8, 3)})
+    return w.getvalue()
+
+
+def docx():
+    w = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml", '<?xml version="1.0"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>')
+        z.writestr("docProps/core.xml", (
+            '<?xml version="1.0"?><cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/">'
+            '<dc:title>Memo</dc:title><dc:creator>Desk A</dc:creator><cp:lastModifiedBy>Desk B</cp:lastModifiedBy>'
+            '<cp:revision>3</cp:revision><dcterms:created>2024-03-01T10:00:00Z</dcterms:created>'
+            '<dcterms:modified>2024-03-02T09:00:00Z</dcterms:modified></cp:coreProperties>'))
+        z.writestr("docProps/app.xml", (
+            '<?xml version="1.0"?><Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+            '<Template>Normal.dotm</Template><TotalTime>12</TotalTime><Pages>2</Pages>'
+            '<Application>Microsoft Office Word</Application><AppVersion>16.0000</AppVersion></Properties>'))
+        z.writestr("word/document.xml", (
+            f'<?xml version="1.0"?><w:document xmlns:w="{w}"><w:body>'
+            '<w:p w:rsidR="00A1"><w:r><w:t>First paragraph.</w:t></w:r></w:p>'
+            '<w:p w:rsidR="00B2"><w:ins w:author="Desk B" w:date="2024-03-02T08:00:00Z"><w:r><w:t>added</w:t></w:r></w:ins>'
+            '<w:del w:author="Desk C" w:date="2024-03-02T08:30:00Z"><w:r><w:delText>removed</w:delText></w:r></w:del></w:p>'
+            '</w:body></w:document>'))
+        z.writestr("word/media/image1.jpeg", jpeg())
+    return out.getvalue()
+
+
+def test_single_page_pdf():
+    images, report = scan(single_page_pdf())
+    assert report["format"] == "pdf"
+    assert report["pages"] == 1
+    assert len(report["revisions"]) == 1 and report["incremental_updates"] == 0
+    assert report["info"]["Title"] == "Budget memo"
+    assert report["created"].startswith("2024-03-01T10:15:00")
+    assert report["fonts"]["names"] == ["Helvetica"] and report["fonts"]["not_embedded"] == ["Helvetica"]
+    assert report["findings"] == []
+
+    assert [(image.name, image.width, image.height) for image in images] == [("page1-obj6.jpg", 96, 80)]
+    with images[0].open() as f:
+        assert Image.open(f).size == (96, 80)
+
+
+def test_multi_page_pdf_inherits_resources():
+    _, report = scan(multi_page_pdf(3))
+    assert report["pages"] == 3 and report["pages_inspected"] == 3
+    assert report["fonts"] == {"count": 1, "embedded": 1, "not_embedded": [], "split_subsets": [], "names": ["Calibri"]}
+
+
+def test_incremental_update_keeps_each_revision():
+    _, report = scan(incremental_update_pdf())
+    assert len(report["revisions"]) == 2
+    assert report["incremental_updates"] == 1
+    assert report["revisions"][0]["info"]["Producer"] == "Writer 1.0"
+    assert report["revisions"][1]["info"]["Producer"] == "Other Editor 9"
+    assert report["info"]["Producer"] == "Other Editor 9"
+    assert report["tool_chain"] == ["Writer 1.0", "Other Editor 9"]
+    assert report["pages"] == 2
+    findings = [text for text, _ in report["findings"]]
+    assert "Edited after creation: 1 incremental update(s)" in findings
+    assert "Metadata rewritten in a later revision: Producer" in findings
+
+
+def test_object_streams_and_xref_stream():
+    _, report = scan(object_stream_pdf())
+    assert report["revisions"][0]["xref"] == "stream"
+    assert report["info"]["Producer"] == "Stream Writer 2.1"
+    assert report["pages"] == 2 and report["pages_inspected"] == 2
+    # Active content hidden inside the compressed object stream is still found
+    assert report["active_content"]["JavaScript"] == 1
+    findings = [text for text, _ in report["findings"]]
+    assert "Contains JavaScript" in findings
+    assert "Action runs automatically when the file is opened" in findings
+    score, flags = score_document(report, [])
+    assert score < 100 and "Contains JavaScript" in flags
+
+
+def test_docx():
+    images, report = scan(docx())
+    assert report["format"] == "docx"
+    assert report["pages"] == 2 and report["revision"] == 3
+    assert report["tracked_changes"] == {"ins": 1, "del": 1}
+    assert report["change_authors"] == {"Desk B": 1, "Desk C": 1}
+    assert report["paragraphs"] == 2 and report["paragraph_sessions"] == 2
+    assert report["tool_chain"] == ["Microsoft Office Word 16.0000"]
+    assert [image.name for image in images] == ["word/media/image1.jpeg"]
+    findings = [text for text, _ in report["findings"]]
+    assert "Last modified by a different author (Desk B) than the creator (Desk A)" in findings
+
+
+def test_unsupported_upload():
+    with pytest.raises(UnsupportedDocument):
+        detect_format(lambda: io.BytesIO(b"GIF89a not a document"))
@@ -0,0 +1,163 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import evidence
+from evidence import CircuitBreaker, EvidenceProvider, ProviderError, TokenBucket
+
+
+class Clock:
+    """Stands in for time.monotonic inside evidence.py; tests move it by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(evidence, "time", SimpleNamespace(monotonic=clock, perf_counter=time.perf_counter))
+    return clock
+
+
+class ScriptedProvider(EvidenceProvider):
+    """Answers from a list of outcomes: an exception is raised, anything else returned."""
+
+    name = "scripted"
+
+    def __init__(self, outcomes, **settings):
+        super().__init__()
+        self.outcomes = list(outcomes)
+        self.retries, self.backoff = 0, 0
+        self.breaker = CircuitBreaker(settings.get("threshold", 2), settings.get("reset", 30))
+        self.bucket = TokenBucket(settings.get("rate", 1000), settings.get("burst", 1000))
+        self.cache.ttl = 0
+        self.fetched = 0
+
+    async def fetch(self, query):
+        self.fetched += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def lookup(provider, query="claim", **kwargs):
+    return asyncio.run(provider.lookup(query, **kwargs))
+
+
+# --- Circuit breaker ---
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_success()  # a success resets the count
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+
+def test_breaker_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 29.9
+    assert breaker.state == "open"
+    clock.now += 0.1
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # the trial is in flight
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_breaker_failed_trial_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now += 29
+    assert breaker.state == "open"
+    clock.now += 1
+    assert breaker.allow()
+
+
+# --- Quota ---
+
+def test_bucket_spends_burst_then_refills_at_rate(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    clock.now += 0.5
+    assert bucket.try_acquire() and not bucket.try_acquire()
+    clock.now += 60
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]  # never banks more than burst
+
+
+def test_bucket_acquire_waits_for_a_token():
+    bucket = TokenBucket(rate=50, burst=1)
+    assert bucket.try_acquire()
+    start = time.monotonic()
+    assert asyncio.run(bucket.acquire(timeout=1))
+    assert 0.01 <= time.monotonic() - start < 0.5
+    assert not asyncio.run(bucket.acquire(timeout=0.001))
+
+
+# --- lookup() ---
+
+def test_lookup_opens_circuit_and_short_circuits(clock):
+    provider = ScriptedProvider([ProviderError("503"), ProviderError("503"), {"ok": 1}], threshold=2, reset=30)
+    assert lookup(provider) is None
+    assert lookup(provider) is None
+    assert provider.breaker.state == "open"
+    assert lookup(provider) is None
+    assert provider.fetched == 2
+    assert provider.counters["failures"] == 2 and provider.counters["short_circuited"] == 1
+
+    clock.now += 30  # half-open: the trial call goes through and closes the circuit
+    assert lookup(provider) == {"ok": 1}
+    assert provider.breaker.state == "closed"
+    assert provider.stats()["circuit"] == "closed"
+
+
+def test_lookup_retries_retryable_errors_only(clock):
+    provider = ScriptedProvider([ProviderError("timeout"), {"ok": 1}])
+    provider.retries = 1
+    assert lookup(provider) == {"ok": 1}
+    assert provider.counters["retries"] == 1
+
+    provider = ScriptedProvider([ProviderError("bad request", retryable=False), {"ok": 1}])
+    provider.retries = 1
+    assert lookup(provider) is None
+    assert provider.fetched == 1 and provider.counters["failures"] == 1
+
+
+def test_lookup_is_throttled_by_quota(clock):
+    provider = ScriptedProvider([{"n": 1}, {"n": 2}, {"n": 3}], rate=1, burst=2)
+    assert lookup(provider, "a") == {"n": 1}
+    assert lookup(provider, "b") == {"n": 2}
+    assert lookup(provider, "c") is None
+    assert provider.counters["throttled"] == 1 and provider.fetched == 2
+    clock.now += 1
+    assert lookup(provider, "c") == {"n": 3}
+
+
+def test_lookup_serves_repeats_from_cache(clock):
+    provider = ScriptedProvider([{"n": 1}])
+    provider.cache.ttl = 60
+    assert lookup(provider) == {"n": 1}
+    assert lookup(provider) == {"n": 1}
+    assert provider.fetched == 1 and provider.counters["cache_hits"] == 1
+    clock.now += 60
+    provider.outcomes.append({"n": 2})
+    assert lookup(provider) == {"n": 2}
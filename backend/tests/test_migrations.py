@@ -0,0 +1,98 @@
+import hashlib
+import json
+import sqlite3
+
+import database
+from archive import get_claim, search_claims
+from verification import claim_key
+
+# The schema the first release created, before PRAGMA user_version was used
+BASELINE_SCHEMA = '''
+    CREATE TABLE claims (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        claim_text TEXT NOT NULL,
+        verdict TEXT NOT NULL,
+        explanation TEXT,
+        sources TEXT,  -- Stored as a JSON string
+        credibility_score INTEGER,
+        hash TEXT NOT NULL,
+        created_at TEXT
+    );
+    CREATE TABLE archive (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        claim_id INTEGER,
+        hash TEXT NOT NULL,
+        archived_at TEXT,
+        FOREIGN KEY(claim_id) REFERENCES claims(id)
+    );
+'''
+
+BASELINE_CLAIMS = [
+    ("The Moon landing, was FILMED in a studio!", "False", 5, "2024-03-01T10:00:00", [
+        {"name": "Reuters", "url": "https://www.reuters.com/fact-check/moon", "snippet": "No, it was not."},
+        {"name": "AP", "url": "https://apnews.com/article/moon", "snippet": "Footage is authentic."},
+        {"name": "AI Analyst", "url": "https://groq.com", "snippet": "Consistent with the evidence."},
+    ]),
+    ("Council approves new bridge budget", "True", 90, "2024-03-02T09:30:00", [
+        {"name": "Local News", "url": "https://news.example.org/bridge", "snippet": "Vote passed 7-2."},
+        {"name": "ClaimBuster", "url": "https://claimbuster.org", "snippet": "Check-worthiness 0.61"},
+    ]),
+    ("Claim saved without sources", "Unverified", 50, "2024-03-03T08:00:00", []),
+]
+
+
+def write_baseline_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    for text, verdict, score, created_at, sources in BASELINE_CLAIMS:
+        raw_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        claim_id = conn.execute(
+            "INSERT INTO claims (claim_text, verdict, explanation, sources, credibility_score, hash, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (text, verdict, "Baseline row.", json.dumps(sources), score, raw_hash, created_at)).lastrowid
+        conn.execute("INSERT INTO archive (claim_id, hash, archived_at) VALUES (?, ?, ?)", (claim_id, raw_hash, created_at))
+    conn.commit()
+    conn.close()
+
+
+def columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def test_baseline_database_migrates_to_latest(db_path):
+    write_baseline_db(db_path)
+    database.init_db(force=True)
+
+    with database.db_connection() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == database.MIGRATIONS[-1][0]
+        assert "sources" not in columns(conn, "claims")
+        assert "expires_at" in columns(conn, "claims")
+        assert "hash" not in columns(conn, "archive")
+        assert conn.execute("SELECT COUNT(*) FROM archive").fetchone()[0] == len(BASELINE_CLAIMS)
+
+        # Sources moved out of the JSON blobs, in citation order; the
+        # pipeline's own entries are kept but not counted as domains
+        domains = {row[0] for row in conn.execute("SELECT name FROM domains")}
+        assert domains == {"reuters.com", "apnews.com", "news.example.org"}
+        assert conn.execute("SELECT COUNT(*) FROM sources WHERE domain_id IS NULL").fetchone()[0] == 2
+
+        # Cache keys are re-derived from the normalized text
+        for text, hash_ in conn.execute("SELECT claim_text, hash FROM claims"):
+            assert hash_ == claim_key(text)
+
+        # Existing rows are in the full-text index
+        hits = search_claims(conn, "bridge", 10, None)
+        assert [hit["claim_text"] for hit in hits] == ["Council approves new bridge budget"]
+
+    item = get_claim(1)
+    assert [source["name"] for source in item["sources"]] == ["Reuters", "AP", "AI Analyst"]
+    assert item["sources"][0]["url"] == "https://www.reuters.com/fact-check/moon"
+
+
+def test_migrations_are_idempotent(db):
+    with database.db_connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.execute("PRAGMA user_version = 0")
+    database.init_db(force=True)
+    with database.db_connection() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == version
@@ -0,0 +1,354 @@
+import os
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from concurrent.futures import Future
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from database import DB_ROWS, DB_WRITE_SECONDS, db_connection, insert_claims, claim_writer
+from evidence import PROVIDERS, iter_evidence
+from cache import verdict_cache, normalize_claim, verdict_ttl, expiry_timestamp
+from archive import find_related_claims
+from llm import analyze_with_ai, llm_batcher
+from reputation import breaking_news, is_trusted_domain
+from models import AI_ANALYST_URL, CLAIMBUSTER_SOURCE_URL, VerificationResponse, Source
+from metrics import stage_timer
+
+# --- Configuration ---
+# Process-wide caps shared by /verify-claim and batch jobs, so a large batch
+# cannot starve interactive requests of provider or Groq capacity.
+EVIDENCE_CONCURRENCY = int(os.getenv("EVIDENCE_CONCURRENCY", "32"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+# Evidence the verdict is decided from (ClaimBuster only adds a score)
+VERDICT_PROVIDERS = frozenset({"google", "live_search"})
+
+logger = logging.getLogger(__name__)
+
+_evidence_slots: Optional[asyncio.Semaphore] = None
+_llm_slots: Optional[asyncio.Semaphore] = None
+
+
+def evidence_slots() -> asyncio.Semaphore:
+    global _evidence_slots
+    if _evidence_slots is None:
+        _evidence_slots = asyncio.Semaphore(EVIDENCE_CONCURRENCY)
+    return _evidence_slots
+
+
+def llm_slots() -> asyncio.Semaphore:
+    global _llm_slots
+    if _llm_slots is None:
+        _llm_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+    return _llm_slots
+
+
+def generate_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def claim_key(claim_text: str) -> str:
+    """Verdict cache / dedupe key: hash of the normalized claim."""
+    return generate_hash(normalize_claim(claim_text))
+
+
+def format_evidence(search_results: List[Dict]) -> str:
+    """Search results as the evidence block of an LLM prompt, trusted outlets tagged."""
+    evidence_lines = []
+    for res in search_results:
+        source_name = res.get('source', 'Web')
+        url = res.get('link', '')
+        snippet = res.get('snippet', '')
+        date = res.get('date', 'Recent')
+        trust_tag = "[HIGH AUTHORITY SOURCE] " if is_trusted_domain(url) else ""
+        evidence_lines.append(f"- {trust_tag}{source_name}: {snippet} ({date})")
+    return "\n".join(evidence_lines)
+
+
+def verification_record(response: VerificationResponse, claim_text: str, expires_at: Optional[str]) -> Dict[str, Any]:
+    """Row for database.insert_claims / ClaimWriter."""
+    return {
+        "claim_text": claim_text, "verdict": response.verdict, "explanation": response.explanation,
+        "sources": [s.model_dump() for s in response.sources], "credibility_score": response.credibility_score,
+        "hash": response.hash, "created_at": response.created_at, "expires_at": expires_at,
+    }
+
+
+def save_verifications(records: List[Dict[str, Any]]) -> List[int]:
+    """Bulk insert in a single transaction (batch jobs). Blocking."""
+    with stage_timer(DB_WRITE_SECONDS, writer="bulk"), db_connection() as conn:
+        with conn:
+            ids = insert_claims(conn, records)
+    DB_ROWS.inc(len(ids), writer="bulk")
+    return ids
+
+
+async def lookup_related(claim_text: str) -> List[Dict[str, Any]]:
+    try:
+        return await run_in_threadpool(find_related_claims, claim_text)
+    except Exception as e:
+        logging.warning(f"Related-claim search failed: {e}")
+        return []
+
+
+def live_source(res: Dict[str, Any]) -> Source:
+    url = res.get('link', '')
+    name = res.get('source', 'Web')
+    if is_trusted_domain(url): name = f"✅ {name}"
+    return Source(name=f"Live: {name}", url=url, snippet=res.get('snippet')[:100]+"...", date=res.get('date', 'Recent'))
+
+
+def uses_fact_check(review: Optional[Dict[str, Any]], has_breaking_news: bool) -> bool:
+    """A recent fact check decides the verdict, unless live results carry breaking news."""
+    return review is not None and is_recent_review(review) and not has_breaking_news
+
+
+def fact_check_source(review: Dict[str, Any]) -> Source:
+    publisher = review.get("publisher", {}).get("name", "Unknown")
+    return Source(name=f"✅ Fact Check ({publisher})", url=review.get("url"),
+                  snippet=f"Rated: {review.get('textualRating', 'Unknown')}", date=review.get("reviewDate"))
+
+
+def _abandon(task: Optional[asyncio.Future]):
+    """Cancels an unfinished task; a finished one has its exception retrieved so it is never reported as unhandled."""
+    if task is None:
+        return
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
+
+
+def is_recent_review(review: Dict[str, Any]) -> bool:
+    review_date = review.get("reviewDate")
+    if review_date:
+        try:
+            d = datetime.strptime(review_date[:10], "%Y-%m-%d")
+            return (datetime.now() - d).days < 90
+        except: pass
+    return False
+
+
+async def stream_analysis(claim_text: str, claim_hash: str, with_related: bool = True, quota_wait: float = 0,
+                          batched: bool = False) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Evidence lookups plus verdict for one claim, without persisting it, as a
+    stream of (stage, payload) events in the order the stages finish:
+    "fact_check" (Source, only for a review the verdict will use, so sent once
+    the live results are in too), "source" (Source, once per live result),
+    "claimbuster" (score) and finally "result" with
+    (response, database record, cache TTL in seconds).
+    With `batched`, the Groq verdict is packed with other pending claims into
+    one completion (llm.llm_batcher).
+    """
+    # Prior archived verdicts are looked up locally while the providers are queried.
+    related_task = asyncio.ensure_future(lookup_related(claim_text)) if with_related else None
+
+    live_sources: List[Source] = []
+    raw_search_results = []
+    has_breaking_news = False
+    review = None
+    claimbuster_source = None
+    finished = set()
+    ai_task = None
+    fact_check_sent = False
+    # The verdict depends on these lookups; unconfigured providers and open
+    # circuits are never queried (see iter_evidence), so they are not waited for.
+    verdict_inputs = {name for name in PROVIDERS.names() if name in VERDICT_PROVIDERS and PROVIDERS[name].healthy()}
+
+    async def ai_verdict() -> Dict[str, Any]:
+        if batched:
+            return await llm_batcher.predict((claim_text, format_evidence(raw_search_results)))
+        async with llm_slots():
+            return await run_in_threadpool(analyze_with_ai, claim_text, format_evidence(raw_search_results))
+
+    try:
+        # All three lookups share one pooled client and one overall deadline.
+        async with evidence_slots():
+            async for name, result in iter_evidence(claim_text, quota_wait=quota_wait):
+                finished.add(name)
+                if name == "live_search" and result and "organic" in result:
+                    for res in result["organic"][:6]:
+                        raw_search_results.append(res)
+                        if not has_breaking_news and breaking_news.search(res.get('snippet', ''), res.get('title', '')):
+                            has_breaking_news = True
+                        source = live_source(res)
+                        live_sources.append(source)
+                        yield "source", source
+                elif name == "google" and result and "claimReview" in result:
+                    review = result["claimReview"][0]
+                elif name == "claimbuster" and result and "results" in result:
+                    cb_score = result["results"][0]["score"]
+                    claimbuster_source = Source(name="ClaimBuster", url=CLAIMBUSTER_SOURCE_URL, snippet=f"Check-worthiness: {cb_score:.2f}")
+                    yield "claimbuster", cb_score
+                # Once the fact check and the live results are in, whether the review
+                # decides the verdict is settled: announce it, or start the AI
+                # analysis without waiting for ClaimBuster.
+                if verdict_inputs <= finished:
+                    if uses_fact_check(review, has_breaking_news):
+                        if not fact_check_sent:
+                            fact_check_sent = True
+                            yield "fact_check", fact_check_source(review)
+                    elif ai_task is None and raw_search_results:
+                        ai_task = asyncio.ensure_future(ai_verdict())
+
+        sources: List[Source] = list(live_sources)
+        fact_check_found = False
+        if uses_fact_check(review, has_breaking_news):
+            if not fact_check_sent:  # a verdict input missed the deadline
+                yield "fact_check", fact_check_source(review)
+            publisher = review.get("publisher", {}).get("name", "Unknown")
+            rating = review.get("textualRating", "Unknown")
+            sources.insert(0, fact_check_source(review))
+            verdict = rating
+            explanation = f"Verified by {publisher}: {rating}."
+            score = 95 if "true" in rating.lower() else 10
+            fact_check_found = True
+
+        if not fact_check_found:
+            if raw_search_results:
+                ai_analysis = await (ai_task or ai_verdict())
+                verdict = ai_analysis.get("verdict", "Unverified")
+                explanation = ai_analysis.get("explanation", "Analysis failed.")
+                score = ai_analysis.get("score", 50)
+                sources.insert(0, Source(name="🤖 AI Analyst (Llama 3.3)", url=AI_ANALYST_URL, snippet="Synthesized from live data."))
+            else:
+                verdict = "Unverified"
+                explanation = "No data found."
+                score = 50
+
+        if claimbuster_source:
+            sources.append(claimbuster_source)
+
+        timestamp = datetime.utcnow().isoformat()
+        ttl = verdict_ttl(verdict, has_breaking_news, fact_check_found)
+
+        response = VerificationResponse(
+            verdict=verdict,
+            explanation=explanation,
+            sources=sources,
+            credibility_score=score,
+            hash=claim_hash,
+            created_at=timestamp,
+            related=await related_task if related_task else [],
+        )
+        yield "result", (response, verification_record(response, claim_text, expiry_timestamp(timestamp, ttl)), ttl)
+    finally:
+        # A closed stream (client gone, consumer stopped early) stops the work
+        # it started instead of leaving it to run for nobody.
+        for task in (related_task, ai_task):
+            _abandon(task)
+
+
+async def analyze_claim(claim_text: str, claim_hash: str, with_related: bool = True, quota_wait: float = 0,
+                        batched: bool = False) -> Tuple[VerificationResponse, Dict[str, Any], int]:
+    """stream_analysis without the intermediate events: (response, database record, cache TTL)."""
+    async with aclosing(stream_analysis(claim_text, claim_hash, with_related, quota_wait, batched)) as events:
+        async for stage, payload in events:
+            if stage == "result":
+                return payload
+    raise RuntimeError("Verification ended without a result.")
+
+
+def cache_verdict(response: VerificationResponse, ttl: int):
+    verdict_cache.put(response.hash, response.model_dump(exclude={"cached", "related"}), ttl)
+
+
+def _log_write_error(future: Future):
+    if future.exception() is not None:
+        logging.error(f"DB Error: {future.exception()}")
+
+
+def save_in_background(record: Dict[str, Any]):
+    """Hands the row to the group-commit writer without waiting for the commit."""
+    claim_writer.submit(record).add_done_callback(_log_write_error)
+
+
+def finish_verification(response: VerificationResponse, record: Dict[str, Any], ttl: int):
+    # The verdict cache is filled first, so repeats are answered from memory
+    # while the row is still waiting for its commit.
+    cache_verdict(response, ttl)
+    save_in_background(record)
+
+
+async def run_verification(claim_text: str, claim_hash: str) -> VerificationResponse:
+    response, record, ttl = await analyze_claim(claim_text, claim_hash)
+    finish_verification(response, record, ttl)
+    return response
+
+
+# Identical claims that arrive while one is being verified share its result.
+_inflight_verifications: Dict[str, asyncio.Future] = {}
+
+
+async def cached_verdict(claim_hash: str) -> Optional[VerificationResponse]:
+    """A fresh stored verdict, or the result of an identical verification already in flight."""
+    cached = await run_in_threadpool(verdict_cache.get, claim_hash)
+    if cached:
+        return VerificationResponse(**cached, cached=True)
+    pending = _inflight_verifications.get(claim_hash)
+    if pending:
+        try:
+            result = await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise
+            return None  # the streaming client that owned it went away
+        return result.model_copy(update={"cached": True})
+    return None
+
+
+async def verify_claim_text(claim_text: str) -> VerificationResponse:
+    """Cached verdict if one is fresh, else a (deduplicated) new verification."""
+    claim_hash = claim_key(claim_text)
+    cached = await cached_verdict(claim_hash)
+    if cached:
+        return cached
+
+    task = asyncio.ensure_future(run_verification(claim_text, claim_hash))
+    _inflight_verifications[claim_hash] = task
+    try:
+        return await asyncio.shield(task)
+    finally:
+        _inflight_verifications.pop(claim_hash, None)
+
+
+async def stream_verification(claim_text: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    verify_claim_text as NDJSON-ready events, each sent as soon as its stage
+    finishes: {"event": "fact_check" | "source", "source": ...},
+    {"event": "claimbuster", "score": ...}, then {"event": "verdict", ...response}.
+    Cached and in-flight claims go straight to the verdict.
+    """
+    claim_hash = claim_key(claim_text)
+    cached = await cached_verdict(claim_hash)
+    if cached:
+        yield {"event": "verdict", **cached.model_dump()}
+        return
+
+    # Concurrent non-streaming requests for the same claim wait on this future.
+    inflight: asyncio.Future = asyncio.get_running_loop().create_future()
+    _inflight_verifications[claim_hash] = inflight
+    try:
+        async with aclosing(stream_analysis(claim_text, claim_hash)) as events:
+            async for stage, payload in events:
+                if stage == "result":
+                    response, record, ttl = payload
+                    finish_verification(response, record, ttl)
+                    inflight.set_result(response)
+                    yield {"event": "verdict", **response.model_dump()}
+                elif stage == "claimbuster":
+                    yield {"event": stage, "score": payload}
+                else:
+                    yield {"event": stage, "source": payload.model_dump()}
+    except Exception as e:
+        if not inflight.done():
+            inflight.set_exception(e)
+        raise
+    finally:
+        if not inflight.done():
+            inflight.cancel()
+        _inflight_verifications.pop(claim_hash, None)
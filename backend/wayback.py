@@ -0,0 +1,397 @@
+import os
+import re
+import html
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from evidence import get_http_client
+from metrics import callback_metric, histogram, record_stage
+
+# --- Configuration ---
+# Wayback-compatible endpoints; point them at a local stand-in for tests and benchmarks.
+WAYBACK_CDX_URL = os.getenv("WAYBACK_CDX_URL", "https://web.archive.org/cdx/search/cdx")
+WAYBACK_SNAPSHOT_URL = os.getenv("WAYBACK_SNAPSHOT_URL", "https://web.archive.org/web")
+
+TRACE_MAX_SNAPSHOTS = int(os.getenv("TRACE_MAX_SNAPSHOTS", "12"))   # distinct versions fetched per trace
+TRACE_CDX_LIMIT = int(os.getenv("TRACE_CDX_LIMIT", "2000"))         # newest captures read from the index
+TRACE_CONCURRENCY = int(os.getenv("TRACE_CONCURRENCY", "4"))        # snapshot fetches in flight per trace
+TRACE_TIMEOUT = float(os.getenv("TRACE_TIMEOUT", "20"))
+TRACE_MAX_BODY_BYTES = int(os.getenv("TRACE_MAX_BODY_BYTES", str(5 * 1024 * 1024)))
+
+# Snapshot bodies never change, so they are cached without expiry; the CDX
+# index gains captures over time, so its cached copy expires.
+TRACE_CACHE_DIR = os.getenv("TRACE_CACHE_DIR", "trace_cache")
+TRACE_CACHE_MAX_BYTES = int(os.getenv("TRACE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+TRACE_CDX_TTL = float(os.getenv("TRACE_CDX_TTL", "3600"))
+
+logger = logging.getLogger(__name__)
+
+TRACE_SECONDS = histogram("trace_fetch_seconds", "Archive fetches by kind (cdx, snapshot) and source (cache, network).",
+                          ["kind", "source"])
+
+
+class TraceError(Exception):
+    """The archive could not be queried (unreachable, error status, unreadable index)."""
+
+
+# --- Disk cache ---
+
+class DiskCache:
+    """
+    LRU cache of byte blobs in a directory, bounded by total size. Each entry
+    is one file named by the key's hash, with an expiry header line (0 = never).
+    Recency lives in memory, seeded from file mtimes at startup, and hits touch
+    the file so the order survives restarts. Writes go through a temp file and
+    os.replace, so concurrent readers never see a partial entry.
+    """
+
+    def __init__(self, directory: str = TRACE_CACHE_DIR, max_bytes: int = TRACE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # file name -> size, oldest first
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._loaded = False
+
+    def _load(self):
+        """Indexes existing entries (on first use, so importing this module does no I/O)."""
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".bin"):
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self.size += size
+        self._loaded = True
+
+    @staticmethod
+    def _name(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest() + ".bin"
+
+    def get(self, key: str) -> Optional[bytes]:
+        name = self._name(key)
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            self._load()
+            if name not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(name)
+        try:
+            with open(path, "rb") as f:
+                expires = float(f.readline())
+                if expires and expires <= time.time():
+                    value = None
+                else:
+                    value = f.read()
+            if value is not None:
+                os.utime(path)
+        except (OSError, ValueError):
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                self._forget(name)
+                return None
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: bytes, ttl: float = 0):
+        name = self._name(key)
+        path = os.path.join(self.directory, name)
+        expires = time.time() + ttl if ttl > 0 else 0
+        data = f"{expires}\n".encode() + value
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._load()
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp, "wb") as f:
+                f.write(data)
+            os.replace(temp, path)
+        except OSError as e:
+            logger.warning(f"Trace cache write failed: {e}")
+            try: os.remove(temp)
+            except OSError: pass
+            return
+        with self._lock:
+            self.size += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            while self.size > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._forget(oldest)
+                self.evictions += 1
+
+    def _forget(self, name: str):
+        """Drops an entry and its file. Caller holds the lock."""
+        self.size -= self._entries.pop(name, 0)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {"directory": self.directory, "entries": len(self._entries), "bytes": self.size, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0}
+
+
+trace_cache = DiskCache()
+
+callback_metric("trace_cache_lookups", "Archive trace disk cache lookups by result.", ["result"],
+                lambda: [(("hit",), trace_cache.hits), (("miss",), trace_cache.misses)], kind="counter")
+callback_metric("trace_cache_bytes", "Bytes held by the archive trace disk cache.", [], lambda: [((), trace_cache.size)])
+
+
+# --- Archive access ---
+
+def normalize_trace_url(url: str) -> str:
+    """Validates a URL to trace; a bare host ("example.com/page") gets http://."""
+    url = (url or "").strip()
+    if not url:
+        raise ValueError("A URL is required.")
+    if "://" not in url:
+        url = "http://" + url
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname or " " in url:
+        raise ValueError("Only http(s) URLs can be traced.")
+    return url
+
+
+def parse_timestamp(timestamp: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(timestamp[:14].ljust(14, "0"), "%Y%m%d%H%M%S")
+    except ValueError:
+        return None
+
+
+def snapshot_url(timestamp: str, url: str, raw: bool = False) -> str:
+    """Public replay URL of a capture; `raw` asks for the original bytes without the archive's toolbar."""
+    return f"{WAYBACK_SNAPSHOT_URL}/{timestamp}{'id_' if raw else ''}/{url}"
+
+
+async def _get(url: str, params: Optional[Dict[str, Any]] = None) -> bytes:
+    try:
+        async with get_http_client().stream("GET", url, params=params, timeout=TRACE_TIMEOUT, follow_redirects=True) as response:
+            if response.status_code >= 400:
+                raise TraceError(f"HTTP {response.status_code} from {urlsplit(url).netloc}")
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) >= TRACE_MAX_BODY_BYTES:
+                    break
+            return bytes(body[:TRACE_MAX_BODY_BYTES])
+    except httpx.HTTPError as e:
+        raise TraceError(f"Archive unreachable: {e!r}")
+
+
+async def cached_fetch(kind: str, key: str, url: str, params: Optional[Dict[str, Any]] = None, ttl: float = 0,
+                       counts: Optional[Counter] = None) -> bytes:
+    """`url` through the disk cache; `counts` tallies cache_hits and archive_requests for the caller."""
+    start = time.perf_counter()
+    counts = counts if counts is not None else Counter()
+    value = await asyncio.to_thread(trace_cache.get, key)
+    if value is not None:
+        counts["cache_hits"] += 1
+        record_stage(TRACE_SECONDS, time.perf_counter() - start, kind=kind, source="cache")
+        return value
+    counts["archive_requests"] += 1
+    value = await _get(url, params)
+    record_stage(TRACE_SECONDS, time.perf_counter() - start, f"trace_{kind}", kind=kind, source="network")
+    await asyncio.to_thread(trace_cache.put, key, value, ttl)
+    return value
+
+
+async def query_cdx(url: str, counts: Optional[Counter] = None) -> List[Dict[str, str]]:
+    """
+    The newest TRACE_CDX_LIMIT captures of `url`, oldest first, with adjacent
+    identical captures collapsed (collapse=digest), so every row is a distinct
+    version or a status change. A page with a longer history is truncated at
+    the old end (a negative CDX limit keeps the last N rows), so the latest
+    status is always current.
+    """
+    params = {"url": url, "output": "json", "fl": "timestamp,original,statuscode,digest,length",
+              "collapse": "digest", "limit": str(-TRACE_CDX_LIMIT)}
+    body = await cached_fetch("cdx", f"cdx:{url}", WAYBACK_CDX_URL, params, TRACE_CDX_TTL, counts)
+    if not body.strip():
+        return []
+    try:
+        rows = json.loads(body)
+    except ValueError:
+        raise TraceError("Archive index returned an unreadable response.")
+    if not rows:
+        return []
+    header, captures = rows[0], rows[1:]
+    return [dict(zip(header, row)) for row in captures]
+
+
+def sample_captures(captures: List[Dict[str, str]], limit: int = TRACE_MAX_SNAPSHOTS) -> List[Dict[str, str]]:
+    """
+    At most `limit` captures spread evenly over the history. The first and
+    last captures and every status change (a page going 404) are always kept.
+    """
+    if len(captures) <= limit:
+        return captures
+    keep = {0, len(captures) - 1}
+    for i in range(1, len(captures)):
+        if _status_class(captures[i]) != _status_class(captures[i - 1]):
+            keep.update((i - 1, i))
+    keep = sorted(keep)[:limit]
+    remaining = limit - len(keep)
+    if remaining > 0:
+        step = len(captures) / (remaining + 1)
+        keep = sorted(set(keep) | {int(step * (n + 1)) for n in range(remaining)})
+    return [captures[i] for i in keep[:limit]]
+
+
+def _status_class(capture: Dict[str, str]) -> str:
+    status = capture.get("statuscode") or ""
+    if status.startswith("2"):
+        return "ok"
+    if status.startswith("3"):
+        return "redirect"
+    if status in ("404", "410"):
+        return "gone"
+    return "other" if status and status != "-" else "ok"  # "-" is how CDX lists revisits of unknown status
+
+
+# --- Content diffing ---
+
+_DROP_BLOCKS = re.compile(rb"<(script|style|noscript|template|svg|title)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_BREAKS = re.compile(rb"<(?:br|/?p|/?div|/?h[1-6]|/?li|/?tr|/?section|/?article|/?header|/?footer)\b[^>]*>", re.IGNORECASE)
+_TAGS = re.compile(rb"<[^>]*>")
+_TITLE = re.compile(rb"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_SPACES = re.compile(r"[ \t\r\f\v\xa0]+")
+
+
+def page_text(body: bytes) -> Tuple[Optional[str], List[str]]:
+    """Title and visible text lines of an HTML page (plain text passes through)."""
+    title = _TITLE.search(body)
+    title_text = _SPACES.sub(" ", html.unescape(title.group(1).decode("utf-8", "replace"))).strip() if title else None
+    text = _TAGS.sub(b" ", _BREAKS.sub(b"\n", _DROP_BLOCKS.sub(b" ", body)))
+    lines = [_SPACES.sub(" ", line).strip() for line in html.unescape(text.decode("utf-8", "replace")).split("\n")]
+    return title_text or None, [line for line in lines if line]
+
+
+def diff_lines(before: List[str], after: List[str], samples: int = 5) -> Dict[str, Any]:
+    """Line-level change between two versions: similarity and a few added/removed lines."""
+    old, new = Counter(before), Counter(after)
+    common = sum((old & new).values())
+    total = len(before) + len(after)
+    added = [line for line in dict.fromkeys(after) if line not in old]
+    removed = [line for line in dict.fromkeys(before) if line not in new]
+    return {"similarity": round(2 * common / total, 3) if total else 1.0,
+            "lines_added": sum((new - old).values()), "lines_removed": sum((old - new).values()),
+            "added": [line[:200] for line in added[:samples]], "removed": [line[:200] for line in removed[:samples]]}
+
+
+# --- Tracing ---
+
+async def fetch_snapshot(capture: Dict[str, str], counts: Optional[Counter] = None) -> bytes:
+    timestamp, original = capture["timestamp"], capture["original"]
+    return await cached_fetch("snapshot", f"snapshot:{timestamp}:{original}", snapshot_url(timestamp, original, raw=True),
+                              counts=counts)
+
+
+def build_timeline(captures: List[Dict[str, str]], bodies: List[Optional[bytes]]) -> List[Dict[str, Any]]:
+    timeline, previous_lines, previous_class = [], None, None
+    for capture, body in zip(captures, bodies):
+        status_class = _status_class(capture)
+        moment = parse_timestamp(capture["timestamp"])
+        entry = {"timestamp": capture["timestamp"], "date": moment.isoformat() if moment else None,
+                 "status": capture.get("statuscode"), "url": snapshot_url(capture["timestamp"], capture["original"])}
+        if status_class == "gone":
+            entry["change"] = "deleted" if previous_class in ("ok", "redirect") else "missing"
+        elif status_class == "redirect":
+            entry["change"] = "redirected"
+        elif body is None:
+            entry["change"] = "unavailable"
+        else:
+            title, lines = page_text(body)
+            entry.update(title=title, lines=len(lines))
+            if previous_class == "gone":
+                entry["change"] = "restored"
+            elif previous_lines is None:
+                entry["change"] = "first_seen"
+            else:
+                entry.update(diff_lines(previous_lines, lines))
+                entry["change"] = "changed" if entry["similarity"] < 1.0 else "unchanged"
+            previous_lines = lines
+        previous_class = status_class
+        timeline.append(entry)
+    return timeline
+
+
+async def trace_url(url: str) -> Dict[str, Any]:
+    """
+    Snapshot history of `url`: the CDX index is read (collapsed to distinct
+    versions), up to TRACE_MAX_SNAPSHOTS captures are fetched concurrently
+    (TRACE_CONCURRENCY at a time) and consecutive versions are diffed.
+    Index responses and snapshot bodies are served from the disk cache when
+    present, so repeating a trace costs almost no archive requests.
+    """
+    url = normalize_trace_url(url)
+    counts: Counter = Counter()
+    captures = await query_cdx(url, counts)
+    if not captures:
+        return {"url": url, "archive": {"found": False, "timestamp": None, "url": None, "captures": 0, "truncated": False},
+                "timeline": [], "deleted": False,
+                "cache": {"hits": counts["cache_hits"], "archive_requests": counts["archive_requests"]}}
+
+    sampled = sample_captures(captures)
+    semaphore = asyncio.Semaphore(TRACE_CONCURRENCY)
+
+    async def fetch_one(capture: Dict[str, str]) -> Optional[bytes]:
+        if _status_class(capture) != "ok":
+            return None
+        async with semaphore:
+            try:
+                return await fetch_snapshot(capture, counts)
+            except TraceError as e:
+                logger.warning(f"Snapshot {capture['timestamp']} of {url} unavailable: {e}")
+                return None
+
+    bodies = await asyncio.gather(*(fetch_one(capture) for capture in sampled))
+    timeline = await asyncio.to_thread(build_timeline, sampled, bodies)
+
+    ok = [entry for entry in timeline if entry["change"] not in ("deleted", "missing", "redirected", "unavailable")]
+    latest = ok[-1] if ok else None
+    last_class = _status_class(captures[-1])
+    return {
+        "url": url,
+        "archive": {
+            "found": latest is not None,
+            "timestamp": latest["date"] if latest else None,
+            "url": latest["url"] if latest else None,
+            "captures": len(captures),
+            # Older captures exist beyond TRACE_CDX_LIMIT; first_seen is then not the first capture
+            "truncated": len(captures) >= TRACE_CDX_LIMIT,
+            "first_seen": timeline[0]["date"],
+            "last_seen": timeline[-1]["date"],
+        },
+        "deleted": last_class == "gone",
+        "changes": sum(entry["change"] == "changed" for entry in timeline),
+        "snapshots_compared": len(sampled),
+        "timeline": timeline,
+        "cache": {"hits": counts["cache_hits"], "archive_requests": counts["archive_requests"]},
+    }
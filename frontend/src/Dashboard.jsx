@@ -1,6 +1,92 @@
 import { Link, useLocation } from 'react-router-dom';
 import { useState, useEffect } from 'react';
-import { Search, ShieldCheck, FileText, Database, UserCircle, LogOut, Scan, ArrowRight, FileSearch, Video } from 'lucide-react';
+import { Search, ShieldCheck, FileText, Database, UserCircle, LogOut, Scan, ArrowRight, FileSearch, Video, BarChart3, Download } from 'lucide-react';
+
+const API = 'http://127.0.0.1:8000';
+const VERDICT_COLORS = { true: 'bg-emerald-700', false: 'bg-[#591c2e]', misleading: 'bg-amber-600', unverified: 'bg-[#1a2526]/30' };
+const verdictColor = (verdict) => VERDICT_COLORS[String(verdict).toLowerCase()] || 'bg-[#1a2526]/60';
+
+// Stacked bar of claim counts per verdict
+function VerdictBar({ counts, total }) {
+  return (
+    <div className="flex h-2 w-full rounded-full overflow-hidden bg-[#1a2526]/5">
+      {Object.entries(counts).map(([verdict, n]) => (
+        <div key={verdict} className={verdictColor(verdict)} style={{ width: `${(n / total) * 100}%` }} title={`${verdict}: ${n}`}></div>
+      ))}
+    </div>
+  );
+}
+
+function ArchiveInsights() {
+  const [days, setDays] = useState(30);
+  const [stats, setStats] = useState(null);
+  const [error, setError] = useState(null);
+
+  useEffect(() => {
+    const controller = new AbortController();
+    setError(null);
+    fetch(`${API}/analytics?top=8${days ? `&days=${days}` : ''}`, { signal: controller.signal })
+      .then((res) => { if (!res.ok) throw new Error(`HTTP ${res.status}`); return res.json(); })
+      .then(setStats)
+      .catch((err) => { if (err.name !== 'AbortError') setError('Archive statistics are unavailable.'); });
+    return () => controller.abort();
+  }, [days]);
+
+  const exportUrl = (format) => `${API}/analytics/export?format=${format}${days ? `&days=${days}` : ''}`;
+  const verdictCounts = Object.fromEntries((stats?.verdicts || []).map((v) => [v.verdict, v.claims]));
+
+  return (
+    <section className="mt-12 bg-white border border-[#1a2526]/10 rounded-xl p-8">
+      <div className="flex flex-wrap justify-between items-center gap-4 mb-8">
+        <div className="flex items-center gap-3">
+          <div className="w-10 h-10 bg-[#1a2526]/5 rounded-lg flex items-center justify-center"><BarChart3 className="w-5 h-5" /></div>
+          <div><h3 className="text-xl font-bold font-serif">Archive Insights</h3><p className="text-sm text-[#1a2526]/60">Verdicts across the archive and the sources they cite.</p></div>
+        </div>
+        <div className="flex items-center gap-2 text-xs font-bold uppercase tracking-widest">
+          {[[30, '30 days'], [365, '1 year'], [null, 'All time']].map(([value, label]) => (
+            <button key={label} onClick={() => setDays(value)} className={`px-3 py-2 rounded ${days === value ? 'bg-[#1a2526] text-white' : 'bg-[#1a2526]/5 hover:bg-[#1a2526]/10'}`}>{label}</button>
+          ))}
+          {[['parquet', 'Parquet'], ['csv', 'CSV']].filter(([format]) => stats?.export_formats?.includes(format)).map(([format, label]) => (
+            <a key={format} href={exportUrl(format)} className="flex items-center gap-1 px-3 py-2 rounded border border-[#1a2526]/20 hover:border-[#591c2e] hover:text-[#591c2e]"><Download className="w-3 h-3" />{label}</a>
+          ))}
+        </div>
+      </div>
+
+      {error && <p className="text-sm text-[#591c2e]">{error}</p>}
+      {!error && !stats && <p className="text-sm text-[#1a2526]/40">Loading statistics…</p>}
+      {stats && stats.claims === 0 && <p className="text-sm text-[#1a2526]/60">No claims archived in this period.</p>}
+      {stats && stats.claims > 0 && (
+        <div className="grid lg:grid-cols-3 gap-10">
+          <div>
+            <div className="text-xs font-bold uppercase tracking-widest opacity-40 mb-3">Verdicts</div>
+            <div className="text-3xl font-serif font-bold mb-4">{stats.claims.toLocaleString()} <span className="text-sm font-sans font-normal text-[#1a2526]/60">claims</span></div>
+            <VerdictBar counts={verdictCounts} total={stats.claims} />
+            <ul className="mt-4 space-y-2 text-sm">
+              {stats.verdicts.map((v) => (
+                <li key={v.verdict} className="flex items-center justify-between">
+                  <span className="flex items-center gap-2"><span className={`w-2 h-2 rounded-full ${verdictColor(v.verdict)}`}></span>{v.verdict}</span>
+                  <span className="text-[#1a2526]/60">{v.claims.toLocaleString()} · avg score {v.avg_credibility ?? '–'}</span>
+                </li>
+              ))}
+            </ul>
+          </div>
+          <div className="lg:col-span-2">
+            <div className="text-xs font-bold uppercase tracking-widest opacity-40 mb-3">Most cited domains <span className="normal-case tracking-normal">({stats.domains_cited.toLocaleString()} in total)</span></div>
+            <ul className="space-y-3">
+              {stats.domains.map((d) => (
+                <li key={d.domain} className="grid grid-cols-[minmax(0,12rem)_1fr_auto] items-center gap-4 text-sm">
+                  <span className="truncate font-medium" title={d.domain}>{d.domain}</span>
+                  <VerdictBar counts={d.verdicts} total={d.claims} />
+                  <span className="text-[#1a2526]/60 whitespace-nowrap">{d.claims.toLocaleString()} claims</span>
+                </li>
+              ))}
+            </ul>
+          </div>
+        </div>
+      )}
+    </section>
+  );
+}
 
 export default function Dashboard() {
   const location = useLocation();
@@ -121,6 +207,8 @@ export default function Dashboard() {
           </div>
 
         </div>
+
+        <ArchiveInsights />
       </main>
     </div>
   );
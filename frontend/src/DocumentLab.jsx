@@ -50,22 +50,52 @@ export default function DocumentLab() {
   );
 }
 
+function progressLabel(progress) {
+  if (!progress) return "Processing...";
+  if (progress.stage === 'pages') return `Reading page ${progress.pages}...`;
+  if (progress.total) return `${progress.stage} ${Math.round((100 * progress.bytes) / progress.total)}%`;
+  return `${progress.stage}...`;
+}
+
 function DocumentScanner() {
   const [file, setFile] = useState(null);
   const [result, setResult] = useState(null);
   const [loading, setLoading] = useState(false);
+  // Streamed in before the result: latest progress event and embedded-image verdicts
+  const [progress, setProgress] = useState(null);
+  const [images, setImages] = useState([]);
+
+  const handleEvent = (event) => {
+    if (event.type === 'progress') setProgress(event);
+    else if (event.type === 'image' || event.type === 'image_error') setImages((prev) => [...prev, event]);
+    else if (event.type === 'result') setResult(event);
+    else if (event.type === 'error') throw new Error(event.detail);
+  };
 
   const handleScan = async () => {
     if (!file) return;
     setLoading(true);
+    setProgress(null);
+    setImages([]);
     const formData = new FormData();
     formData.append('file', file);
 
     try {
-      const res = await fetch('http://127.0.0.1:8000/scan-document', { method: 'POST', body: formData });
+      // NDJSON stream: progress, each embedded image as it is scanned, then the result
+      const res = await fetch('http://127.0.0.1:8000/scan-document/stream', { method: 'POST', body: formData });
       if (!res.ok) throw new Error("Backend error");
-      const data = await res.json();
-      setResult(data);
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter((line) => line.trim()).forEach((line) => handleEvent(JSON.parse(line)));
+      }
+      if (buffer.trim()) handleEvent(JSON.parse(buffer));
     } catch (e) {
       alert("Error: Could not scan document. Is the backend running?");
     }
@@ -84,9 +114,10 @@ function DocumentScanner() {
             </div>
             {file && (
                 <button onClick={handleScan} disabled={loading} className="mt-6 w-full bg-[#1a2526] text-white py-4 rounded-xl font-bold uppercase tracking-widest hover:bg-black transition-colors">
-                  {loading ? "Processing..." : "Start Forensic Scan"}
+                  {loading ? progressLabel(progress) : "Start Forensic Scan"}
                 </button>
             )}
+            {loading && images.length > 0 && <EmbeddedImages images={images} />}
         </div>
       ) : (
         <div className="space-y-6">
@@ -107,6 +138,13 @@ function DocumentScanner() {
            <div className="bg-slate-50 p-4 rounded-xl border border-slate-200 font-mono text-sm">
               {Object.entries(result.metadata).map(([k,v]) => <div key={k} className="flex justify-between border-b border-slate-200 last:border-0 py-2"><span className="font-bold opacity-50">{k}</span><span>{String(v)}</span></div>)}
            </div>
+           {result.report?.tool_chain?.length > 0 && (
+              <div className="text-xs font-mono">
+                 <span className="font-bold uppercase opacity-60 mr-2">Tool chain</span>
+                 {result.report.tool_chain.join(' → ')}
+              </div>
+           )}
+           {result.images.length > 0 && <EmbeddedImages images={result.images} />}
            <div className="bg-[#1a2526] text-white p-6 rounded-xl">
               <h4 className="text-[#591c2e] font-bold text-xs uppercase mb-2">AI Analysis</h4>
               <p className="opacity-90">"{result.ai_analysis}"</p>
@@ -117,6 +155,22 @@ function DocumentScanner() {
   );
 }
 
+function EmbeddedImages({ images }) {
+  return (
+    <div className="mt-6 text-left border border-gray-200 rounded-xl p-4">
+      <div className="text-xs font-bold uppercase opacity-60 mb-2">Embedded Images ({images.length})</div>
+      {images.map((image, i) => (
+        <div key={i} className="flex justify-between text-xs font-mono border-b border-gray-100 last:border-0 py-1">
+          <span className="opacity-70">{image.page ? `p.${image.page} ` : ''}{image.name} ({image.width}×{image.height})</span>
+          {image.type === 'image'
+            ? <span className={image.score < 40 ? 'text-red-600 font-bold' : 'text-emerald-700'}>{image.score} · {image.verdict}</span>
+            : <span className="text-amber-700">not scanned</span>}
+        </div>
+      ))}
+    </div>
+  );
+}
+
 function ArchiveTracer() {
   const [url, setUrl] = useState('');
   const [data, setData] = useState(null);
@@ -129,8 +183,10 @@ function ArchiveTracer() {
     formData.append('url', url);
     try {
       const res = await fetch('http://127.0.0.1:8000/trace-archive', { method: 'POST', body: formData });
-      setData(await res.json());
-    } catch (e) { alert("API Error"); }
+      const body = await res.json();
+      if (!res.ok) throw new Error(body.detail || "Backend error");
+      setData(body);
+    } catch (e) { alert(`API Error: ${e.message}`); }
     setLoading(false);
   };
 
@@ -148,6 +204,26 @@ function ArchiveTracer() {
                    <a href={data.archive.url} target="_blank" className="underline">View</a>
                 </div>
             ) : <div className="text-amber-800 font-bold">❌ No public snapshots found.</div>}
+            {data.deleted && <div className="mt-2 text-red-700 text-sm font-bold flex gap-2"><AlertTriangle className="w-4 h-4"/> Page has since been deleted</div>}
+            {data.timeline.length > 0 && (
+              <div className="mt-4 border-t pt-4 space-y-2">
+                <div className="text-xs font-bold uppercase opacity-60">
+                  {data.archive.captures} captures · {data.changes} content changes
+                </div>
+                {data.timeline.map((entry) => (
+                  <div key={entry.timestamp} className="text-xs font-mono border-b border-gray-100 last:border-0 pb-2">
+                    <div className="flex justify-between">
+                      <a href={entry.url} target="_blank" className="underline">{entry.date}</a>
+                      <span className={entry.change === 'deleted' ? 'text-red-700 font-bold' : 'opacity-70'}>
+                        {entry.change}{entry.similarity != null && ` (${Math.round(entry.similarity * 100)}% same)`}
+                      </span>
+                    </div>
+                    {entry.added?.map((line, i) => <div key={`a${i}`} className="text-emerald-700 truncate">+ {line}</div>)}
+                    {entry.removed?.map((line, i) => <div key={`r${i}`} className="text-red-700 truncate">- {line}</div>)}
+                  </div>
+                ))}
+              </div>
+            )}
          </div>
        )}
     </div>
@@ -5,24 +5,83 @@ import {
 } from 'lucide-react';
 import { Link } from 'react-router-dom';
 
+const EMPTY_PARTIAL = { sources: [], factCheck: null, claimbuster: null };
+
+function SourceList({ sources }) {
+  return (
+    <div className="grid gap-4">
+      {sources.map((source, idx) => (
+        <a 
+          key={idx}
+          href={source.url}
+          target="_blank"
+          rel="noopener noreferrer"
+          className="group flex items-start justify-between border-b border-[#1a2526]/20 pb-4 hover:bg-[#1a2526]/5 transition-colors p-2"
+        >
+          <div className="pr-4">
+            <div className="font-sans font-bold text-sm mb-1 group-hover:text-[#591c2e] transition-colors">
+              {source.name.replace('✅', '').replace('Live:', '').trim()}
+              {source.name.includes('✅') && <span className="ml-2 text-[10px] text-[#591c2e] border border-[#591c2e] px-1">OFFICIEL</span>}
+            </div>
+            <div className="font-serif text-sm text-[#1a2526]/70 line-clamp-2">
+              {source.snippet}
+            </div>
+          </div>
+          <ArrowRight className="w-4 h-4 opacity-0 group-hover:opacity-100 transition-opacity self-center text-[#591c2e]" />
+        </a>
+      ))}
+    </div>
+  );
+}
+
 export default function FactChecker() {
   const [claim, setClaim] = useState('');
   const [loading, setLoading] = useState(false);
   const [result, setResult] = useState(null);
+  // Evidence streamed in before the verdict: shown while the analysis finishes
+  const [partial, setPartial] = useState(EMPTY_PARTIAL);
+
+  const handleEvent = (event) => {
+    if (event.event === 'source') {
+      setPartial((p) => ({ ...p, sources: [...p.sources, event.source] }));
+    } else if (event.event === 'fact_check') {
+      setPartial((p) => ({ ...p, factCheck: event.source }));
+    } else if (event.event === 'claimbuster') {
+      setPartial((p) => ({ ...p, claimbuster: event.score }));
+    } else if (event.event === 'verdict') {
+      setResult(event);
+    } else if (event.event === 'error') {
+      console.error("Error:", event.detail);
+    }
+  };
 
   const handleVerify = async () => {
     if (!claim) return;
     setLoading(true);
     setResult(null);
+    setPartial(EMPTY_PARTIAL);
 
     try {
-      const response = await fetch('http://127.0.0.1:8000/verify-claim', {
+      // NDJSON stream: one event per line, as each stage of the check completes
+      const response = await fetch('http://127.0.0.1:8000/verify-claim/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ claim_text: claim }),
       });
-      const data = await response.json();
-      setResult(data);
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter((line) => line.trim()).forEach((line) => handleEvent(JSON.parse(line)));
+      }
+      if (buffer.trim()) handleEvent(JSON.parse(buffer));
     } catch (error) {
       console.error("Error:", error);
     } finally {
@@ -30,6 +89,8 @@ export default function FactChecker() {
     }
   };
 
+  const pendingSources = partial.factCheck ? [partial.factCheck, ...partial.sources] : partial.sources;
+
   return (
     <div className="min-h-screen font-serif text-[#1a2526] bg-[#FDFBF7] flex flex-col">
       {/* Navigation Back */}
@@ -74,6 +135,23 @@ export default function FactChecker() {
           </div>
         </div>
 
+        {/* Evidence arriving before the verdict */}
+        {loading && !result && (pendingSources.length > 0 || partial.claimbuster !== null) && (
+          <div className="border-t border-[#1a2526] pt-8">
+            <div className="flex justify-between items-end mb-6">
+              <span className="font-sans text-xs font-bold uppercase bg-[#1a2526] text-white px-2 py-1 flex items-center gap-2">
+                <Loader2 className="w-3 h-3 animate-spin" /> Analyse en cours
+              </span>
+              {partial.claimbuster !== null && (
+                <div className="text-right font-sans text-xs text-[#1a2526]/60 uppercase tracking-wider">
+                  ClaimBuster : {partial.claimbuster.toFixed(2)}
+                </div>
+              )}
+            </div>
+            <SourceList sources={pendingSources} />
+          </div>
+        )}
+
         {/* Results Section */}
         <AnimatePresence>
           {result && !loading && (
@@ -111,28 +189,7 @@ export default function FactChecker() {
                   <Newspaper className="w-4 h-4" /> Sources Citées
                 </h4>
                 
-                <div className="grid gap-4">
-                  {result.sources.map((source, idx) => (
-                    <a 
-                      key={idx}
-                      href={source.url}
-                      target="_blank"
-                      rel="noopener noreferrer"
-                      className="group flex items-start justify-between border-b border-[#1a2526]/20 pb-4 hover:bg-[#1a2526]/5 transition-colors p-2"
-                    >
-                      <div className="pr-4">
-                        <div className="font-sans font-bold text-sm mb-1 group-hover:text-[#591c2e] transition-colors">
-                          {source.name.replace('✅', '').replace('Live:', '').trim()}
-                          {source.name.includes('✅') && <span className="ml-2 text-[10px] text-[#591c2e] border border-[#591c2e] px-1">OFFICIEL</span>}
-                        </div>
-                        <div className="font-serif text-sm text-[#1a2526]/70 line-clamp-2">
-                          {source.snippet}
-                        </div>
-                      </div>
-                      <ArrowRight className="w-4 h-4 opacity-0 group-hover:opacity-100 transition-opacity self-center text-[#591c2e]" />
-                    </a>
-                  ))}
-                </div>
+                <SourceList sources={result.sources} />
               </div>
             </motion.div>
           )}